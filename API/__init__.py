@@ -6,3 +6,5 @@ driver_bp = Blueprint('driver_bp', __name__)
 order_bp = Blueprint('order_bp', __name__)
 garment_bp = Blueprint('garment_bp', __name__)
 hamper_bp = Blueprint('hamper_bp', __name__)
+async_bp = Blueprint('async_bp', __name__)
+import_bp = Blueprint('import_bp', __name__)
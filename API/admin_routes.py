@@ -1,25 +1,25 @@
-from app import db
-import firebase_admin
-from config import Config
+import json
+from storage import db, auth
 from flasgger import swag_from
 from models.hamper import Hamper
-from flask import request, jsonify
+from models.user import AdminUser
+from flask import request, jsonify, Response, stream_with_context
 from . import admin_bp, user_bp, hamper_bp
-from firebase_admin import credentials, initialize_app, auth
-from utils.id_generator import generate_admin_id, generate_garment_id
+from utils.user_index import resolve_user_uid, resolve_user_uids
+from utils.profiles import fetch_user_profile, fetch_user_profiles
+from utils.batch_reads import MAX_BATCH_IDS, batch_ids, batch_response
+from utils.authentication import authenticate, require_auth, require_owner
+from utils.unit_of_work import immediate_writes
+from utils.dispatch import DEFAULT_MAX_STOPS, dispatch
 
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS)
-    initialize_app(cred)
-    
 # ****************************************** Admin Routes ******************************************
 
 # Admin Registration
 @admin_bp.route('/admin_register', methods=['POST'])
 @swag_from({
     'tags': ['Admin'],
-    'summary': 'Register a new admin',
+    'summary': 'Admin-only: Register a new admin (the first admin is created with `flask create-admin`)',
     'parameters': [
         {
             'name': 'body',
@@ -41,11 +41,14 @@ if not firebase_admin._apps:
         201: {
             'description': 'Admin created successfully'
         },
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
         400: {
             'description': 'Error occurred during admin creation'
         }
     }
 })
+@require_auth('admin')
 def register_admin():
     data = request.get_json()
     email = data.get('email')
@@ -54,17 +57,8 @@ def register_admin():
     phone_number = data.get('phone_number')
 
     try:
-        user_record = auth.create_user(email=email, password=password)
-        admin_id = generate_admin_id()  # Generate sequential AdminID
-        admin_data = {
-            'admin_id': admin_id,
-            'email': email,
-            'full_name': full_name,
-            'phone_number': phone_number,
-            'role': 'admin'
-        }
-        db.collection('admins').document(user_record.uid).set(admin_data)
-        return jsonify({'message': 'Admin created successfully', 'uid': user_record.uid, 'admin_id': admin_id}), 201
+        uid, admin_id = AdminUser.register(email, password, full_name, phone_number)
+        return jsonify({'message': 'Admin created successfully', 'uid': uid, 'admin_id': admin_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -74,6 +68,13 @@ def register_admin():
     'tags': ['Admin'],
     'summary': 'Login an admin',
     'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'required': False,
+            'type': 'string',
+            'description': 'Bearer <Firebase ID token>; when present the body is ignored'
+        },
         {
             'name': 'body',
             'in': 'body',
@@ -98,6 +99,13 @@ def register_admin():
     }
 })
 def login_admin():
+    # A Firebase ID token is verified locally, with no Auth or profile lookups
+    claims = authenticate()
+    if claims:
+        if claims['role'] != 'admin':
+            return jsonify({'error': 'Admin profile not found.'}), 404
+        return jsonify({'message': f"Admin {claims['email']} logged in successfully", 'uid': claims['uid']}), 200
+
     data = request.get_json()
     email = data.get('email')
 
@@ -110,58 +118,126 @@ def login_admin():
         else:
             return jsonify({'error': 'Admin profile not found.'}), 404
 
-    except firebase_admin.auth.AuthError as e:
-        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 400
     
 #****************************************** Admin user routes******************************************
 
 
+DEFAULT_USERS_PAGE_SIZE = 100
+MAX_USERS_PAGE_SIZE = 1000
+
+
+def infer_role(user_data):
+    """Fills in 'role' from the user_id prefix when the document has none."""
+    if 'role' not in user_data:
+        user_id = user_data.get('user_id', 'unknown')
+        if user_id.startswith('USER'):
+            user_data['role'] = 'customer'
+        elif user_id.startswith('DRIVER'):
+            user_data['role'] = 'driver'
+        elif user_id.startswith('ADMIN'):
+            user_data['role'] = 'admin'
+        else:
+            user_data['role'] = 'unknown'
+    return user_data
+
+
 @user_bp.route('/get_all_users', methods=['GET'])
 @swag_from({
     'tags': ['Admin'],
-    'summary': 'Admin-only: Retrieve all users from the database',
+    'summary': 'Admin-only: Retrieve users from the database, one page at a time',
+    'parameters': [
+        {
+            'name': 'page_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': f'Number of users per page (default {DEFAULT_USERS_PAGE_SIZE}, max {MAX_USERS_PAGE_SIZE})'
+        },
+        {
+            'name': 'start_after',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'next_page_token returned by the previous page'
+        },
+        {
+            'name': 'fields',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Comma-separated list of fields to return (e.g., user_id,email)'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': "Set to 'ndjson' to stream every user as newline-delimited JSON"
+        }
+    ],
     'responses': {
-        200: {'description': 'List of all users'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        200: {'description': 'A page of users and the token for the next page'},
         400: {'description': 'Error retrieving users'}
     }
 })
+@require_auth('admin')
 def get_all_users():
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    start_after = request.args.get('start_after')
+
     try:
-        # Fetch all documents in the 'users' collection
-        users = db.collection('users').stream()
+        page_size = int(request.args.get('page_size', DEFAULT_USERS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'page_size must be an integer.'}), 400
+
+    if page_size <= 0 or page_size > MAX_USERS_PAGE_SIZE:
+        return jsonify({'error': f'page_size must be between 1 and {MAX_USERS_PAGE_SIZE}.'}), 400
+
+    # Only infer roles when they are part of the requested projection
+    infer_roles = not fields or 'role' in fields
+    # user_id is only read for role inference; it is dropped again unless requested
+    helper_fields = {'user_id'} - set(fields) if fields and infer_roles else set()
+    query = db.collection('users').order_by('__name__')
+    if fields:
+        query = query.select(sorted(set(fields) | helper_fields))
+
+    def serialize(user):
+        user_data = user.to_dict()
+        if infer_roles:
+            infer_role(user_data)
+        for field in helper_fields:
+            user_data.pop(field, None)
+        return user_data
+
+    if request.args.get('format') == 'ndjson':
+        if start_after:
+            query = query.start_after({'__name__': start_after})
+
+        def generate():
+            # Yield each document as it arrives instead of buffering the collection
+            for user in query.stream():
+                yield json.dumps(serialize(user), default=str) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        if start_after:
+            query = query.start_after({'__name__': start_after})
 
         user_list = []
-        for user in users:
-            user_data = user.to_dict()
-            print(f"Fetched User: {user_data}")  # Debugging
-
-            # If role doesn't exist, infer role from user_id pattern or assign 'unknown'
-            user_id = user_data.get('user_id', 'unknown')
-            
-            # Infer role from user_id prefix if role is missing
-            if 'role' not in user_data:
-                if user_id.startswith('USER'):
-                    user_data['role'] = 'customer'
-                elif user_id.startswith('DRIVER'):
-                    user_data['role'] = 'driver'
-                elif user_id.startswith('ADMIN'):
-                    user_data['role'] = 'admin'
-                else:
-                    user_data['role'] = 'unknown'
-
-            # Add user to the list
-            user_list.append(user_data)
-
-        # Debug if no users found
-        if not user_list:
-            print("No users found.")  # Debugging
-
-        return jsonify({'users': user_list}), 200
+        last_doc_id = None
+        for user in query.limit(page_size).stream():
+            user_list.append(serialize(user))
+            last_doc_id = user.id
+
+        next_page_token = last_doc_id if len(user_list) == page_size else None
+        return jsonify({'users': user_list, 'next_page_token': next_page_token}), 200
 
     except Exception as e:
-        print(f"Error: {e}")  # Debugging
         return jsonify({'error': str(e)}), 400
 
 # Endpoint to get user by user_id
@@ -179,25 +255,69 @@ def get_all_users():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'User data retrieved successfully'},
         404: {'description': 'User not found'},
         400: {'description': 'Error retrieving user'}
     }
 })
+@require_owner('user_id', 'user')
 def get_user_by_id(user_id):
     try:
-        # Query by the 'user_id' field instead of document ID
-        user_query = db.collection('users').where('user_id', '==', user_id).stream()
-        user_data = [user.to_dict() for user in user_query]
+        # Resolve the document ID through the user_id index, then fetch the (cached) profile
+        user_doc_id = resolve_user_uid(user_id)
+        user_data = fetch_user_profile(user_doc_id)
 
-        if user_data:
-            return jsonify(user_data[0]), 200
+        if user_data is not None:
+            return jsonify(user_data), 200
         else:
             return jsonify({'error': 'User not found.'}), 404
 
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# Endpoint to get many users by user_id in one request
+@user_bp.route('/get_users', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': f'Admin-only: Retrieve up to {MAX_BATCH_IDS} users by user_id in one request',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'user_ids': {'type': 'array', 'items': {'type': 'string'}, 'description': 'Custom User IDs (e.g., USER0001)'}
+                },
+                'required': ['user_ids']
+            }
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        200: {'description': 'Users keyed by user_id (null when not found) and the list of IDs not found'},
+        400: {'description': 'Invalid ID list or error retrieving users'}
+    }
+})
+@require_auth('admin')
+def get_users_by_ids():
+    try:
+        user_ids = batch_ids(request.get_json(silent=True), 'user_ids')
+
+        # One get_all for the uncached index entries, one for the uncached profiles
+        uids = resolve_user_uids(user_ids)
+        profiles = fetch_user_profiles(sorted({uid for uid in uids.values() if uid}))
+        users = {user_id: profiles.get(uids.get(user_id)) for user_id in user_ids}
+
+        return jsonify(batch_response(user_ids, users, 'users')), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 #********************************************* Admin Hamper routes *******************************************
 
 @hamper_bp.route('/create_hamper', methods=['POST'])
@@ -210,7 +330,7 @@ def get_user_by_id(user_id):
             'in': 'header',
             'required': True,
             'type': 'string',
-            'description': 'Admin user ID for authentication (e.g., ADMIN0001)'
+            'description': 'Bearer <Firebase ID token> of an admin account'
         },
         {
             'name': 'body',
@@ -226,37 +346,80 @@ def get_user_by_id(user_id):
     ],
     'responses': {
         201: {'description': 'Hamper(s) created and saved successfully'},
+        401: {'description': 'Missing or invalid ID token'},
+        207: {'description': 'Some hamper chunks failed to commit; see failed_chunks'},
         403: {'description': 'Access denied. Admins only.'},
         400: {'description': 'Invalid input or error creating hamper'}
     }
 })
+@require_auth('admin')
+@immediate_writes
 def create_hamper():
     data = request.get_json()
     quantity = data.get('quantity', 1)
 
-    # Check if Authorization header is present and starts with ADMIN
-    admin_id = request.headers.get('Authorization')
-
-    if not admin_id or not admin_id.startswith('ADMIN'):
-        return jsonify({'error': 'Access denied. Only admins can perform this action.'}), 403
-
     if quantity <= 0:
         return jsonify({'error': 'Quantity must be greater than 0.'}), 400
 
     try:
-        hampers = []
+        # Allocate every ID up front and commit the hampers in chunks of 500
+        hampers, failed_chunks = Hamper.create_bulk(quantity)
 
-        for _ in range(quantity):
-            # Generate a new hamper with a unique garment ID and save it
-            garment_id = generate_garment_id()
-            hamper = Hamper(quantity=1)
-            db.collection('hampers').document(garment_id).set(hamper.to_dict())
-            hampers.append(hamper.to_dict())
+        if failed_chunks and not hampers:
+            return jsonify({'error': 'Failed to create hampers.', 'failed_chunks': failed_chunks}), 400
 
-        return jsonify({
-            'message': f'{quantity} hamper(s) created successfully.',
+        response = {
+            'message': f'{len(hampers)} hamper(s) created successfully.',
             'hampers': hampers
-        }), 201
+        }
+        if failed_chunks:
+            response['failed_chunks'] = failed_chunks
+            return jsonify(response), 207
+
+        return jsonify(response), 201
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+#********************************************* Admin dispatch routes *******************************************
+
+@admin_bp.route('/dispatch', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Admin-only: Assign pending orders and hampers to available drivers, grouped by ZIP code',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': False,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'max_stops': {'type': 'integer', 'description': f'Pending stops to consider (default {DEFAULT_MAX_STOPS})'},
+                    'dry_run': {'type': 'boolean', 'description': 'Return the plan without writing it'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {'description': 'Dispatch summary'},
+        207: {'description': 'Some assignment chunks failed to commit; see failed_chunks'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        400: {'description': 'Invalid input or error during dispatch'}
+    }
+})
+@require_auth('admin')
+@immediate_writes
+def dispatch_deliveries():
+    data = request.get_json(silent=True) or {}
+    max_stops = data.get('max_stops', DEFAULT_MAX_STOPS)
+
+    if not isinstance(max_stops, int) or max_stops <= 0:
+        return jsonify({'error': 'max_stops must be a positive integer.'}), 400
+
+    try:
+        summary = dispatch(max_stops=max_stops, dry_run=bool(data.get('dry_run')))
+        return jsonify(summary), 207 if summary['failed_chunks'] else 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
@@ -0,0 +1,192 @@
+import asyncio
+from flasgger import swag_from
+from flask import request, jsonify
+from . import async_bp
+from storage import auth, get_async_db
+from utils.async_runner import run_async
+from utils.id_generator import generate_user_id, generate_driver_id
+from utils.user_index import USER_INDEX_COLLECTION, resolve_user_uid_async
+from utils.authentication import require_auth, require_owner, set_role_claim
+from utils.cart import add_to_cart
+from utils.garment_catalog import get_garment_async
+
+# ****************************************** Async Routes ******************************************
+# Async variants of the multi-lookup endpoints. Request data is read in the Flask thread;
+# the coroutine runs on the worker's shared loop and fans out independent lookups with
+# asyncio.gather. Blocking SDK calls (Auth, ID allocation) run in the loop's thread pool.
+
+
+async def _order_garment(user_id, garment_id, quantity):
+    adb = get_async_db()
+
+    # The user lookup and the garment fetch (usually a catalog cache hit) do not depend on each other
+    firestore_user_id, garment_data = await asyncio.gather(
+        resolve_user_uid_async(user_id),
+        get_garment_async(adb, garment_id),
+    )
+
+    if not firestore_user_id:
+        return {'error': 'User not found.'}, 404
+    if garment_data is None:
+        return {'error': 'Garment not found.'}, 404
+
+    garment_data['quantity'] = quantity
+    garment_data['total_price'] = garment_data['price'] * quantity
+
+    # The cart line and its summary are updated in one (blocking) transaction
+    summary = await asyncio.to_thread(add_to_cart, firestore_user_id, garment_id, garment_data)
+    return {'message': 'Garment added to cart successfully.', 'cart': summary}, 200
+
+
+@async_bp.route('/order_garment', methods=['POST'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'Add a garment to the user’s cart (async: user and garment are looked up concurrently)',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'user_id': {'type': 'string'},
+                    'garment_id': {'type': 'string'},
+                    'quantity': {'type': 'integer'}
+                },
+                'required': ['user_id', 'garment_id']
+            }
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
+        200: {'description': 'Garment added to cart successfully'},
+        404: {'description': 'User or garment not found'},
+        400: {'description': 'Error adding garment to cart'}
+    }
+})
+@require_owner('user_id', 'user')
+def order_garment_async():
+    data = request.get_json()
+    user_id = data.get('user_id')
+    garment_id = data.get('garment_id')
+    quantity = data.get('quantity', 1)
+
+    if not user_id or not garment_id:
+        return jsonify({'error': 'user_id and garment_id are required.'}), 400
+
+    try:
+        body, status = run_async(_order_garment(user_id, garment_id, quantity))
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+async def _register_account(collection, id_field, generate_id, email, password, profile):
+    # Creating the Auth user and allocating the public ID are independent round trips
+    user_record, public_id = await asyncio.gather(
+        asyncio.to_thread(auth.create_user, email=email, password=password),
+        asyncio.to_thread(generate_id),
+    )
+
+    adb = get_async_db()
+    profile = dict(profile, **{id_field: public_id, 'email': email})
+    batch = adb.batch()
+    batch.set(adb.collection(collection).document(user_record.uid), profile)
+    if collection == 'users':
+        batch.create(adb.collection(USER_INDEX_COLLECTION).document(public_id), {'uid': user_record.uid})
+    await batch.commit()
+    await asyncio.to_thread(set_role_claim, user_record.uid, profile['role'], public_id)
+    return user_record.uid, public_id
+
+
+@async_bp.route('/user_register', methods=['POST'])
+@swag_from({
+    'tags': ['User'],
+    'summary': 'Register a new user (async: Auth account and user ID are created concurrently)',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'email': {'type': 'string'},
+                    'password': {'type': 'string'},
+                    'full_name': {'type': 'string'},
+                    'phone_number': {'type': 'string'}
+                },
+                'required': ['email', 'password', 'full_name', 'phone_number']
+            }
+        }
+    ],
+    'responses': {
+        201: {'description': 'User account created successfully'},
+        400: {'description': 'Error occurred during user registration'}
+    }
+})
+def register_user_async():
+    data = request.get_json()
+    profile = {
+        'full_name': data.get('full_name'),
+        'phone_number': data.get('phone_number'),
+        'role': 'user'
+    }
+
+    try:
+        uid, user_id = run_async(_register_account(
+            'users', 'user_id', generate_user_id, data.get('email'), data.get('password'), profile))
+        return jsonify({'message': 'User account created successfully', 'uid': uid, 'user_id': user_id}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@async_bp.route('/driver_register', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Admin-only: Register a new driver (async: Auth account and driver ID are created concurrently)',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'email': {'type': 'string'},
+                    'password': {'type': 'string'},
+                    'full_name': {'type': 'string'},
+                    'phone_number': {'type': 'string'},
+                    'vehicle_type': {'type': 'string'},
+                    'license_plate': {'type': 'string'}
+                },
+                'required': ['email', 'password', 'full_name', 'phone_number', 'vehicle_type', 'license_plate']
+            }
+        }
+    ],
+    'responses': {
+        201: {'description': 'Driver account created successfully'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        400: {'description': 'Error occurred during driver registration'}
+    }
+})
+@require_auth('admin')
+def register_driver_async():
+    data = request.get_json()
+    profile = {
+        'full_name': data.get('full_name'),
+        'phone_number': data.get('phone_number'),
+        'vehicle_type': data.get('vehicle_type'),
+        'license_plate': data.get('license_plate'),
+        'role': 'driver'
+    }
+
+    try:
+        uid, driver_id = run_async(_register_account(
+            'drivers', 'driver_id', generate_driver_id, data.get('email'), data.get('password'), profile))
+        return jsonify({'message': 'Driver account created successfully', 'uid': uid, 'driver_id': driver_id}), 201
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
@@ -1,9 +1,16 @@
-from app import db
+from storage import db, auth
 from . import driver_bp
 from flasgger import swag_from
-from firebase_admin import auth
 from flask import request, jsonify
 from utils.id_generator import generate_driver_id
+from utils.authentication import authenticate, require_auth, require_owner, set_role_claim
+from utils.pagination import PAGE_PARAMETERS, page_args
+from utils.zip_centroids import CentroidsUnavailable
+from utils.profiles import fetch_driver_profile, fetch_driver_profiles
+from utils.batch_reads import MAX_BATCH_IDS, batch_ids, batch_response
+from utils.status_stream import StreamUnavailable, stream_response
+from utils.unit_of_work import immediate_writes
+from models.user import DriverUser
 
 # ****************************************** Driver Routes ******************************************
 # Endpoint to register a new driver
@@ -32,9 +39,12 @@ from utils.id_generator import generate_driver_id
     ],
     'responses': {
         201: {'description': 'Driver account created successfully'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
         400: {'description': 'Error occurred during driver registration'}
     }
 })
+@require_auth('admin')
 def register_driver():
     data = request.get_json()
     email = data.get('email')
@@ -57,6 +67,7 @@ def register_driver():
             'role': 'driver'
         }
         db.collection('drivers').document(user_record.uid).set(driver_data)
+        set_role_claim(user_record.uid, 'driver', driver_id)
         return jsonify({'message': 'Driver account created successfully', 'uid': user_record.uid, 'driver_id': driver_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -76,28 +87,180 @@ def register_driver():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Drivers may only access their own account.'},
         200: {'description': 'Driver profile retrieved successfully'},
         404: {'description': 'Driver not found'}
     }
 })
+@require_owner('driver_id', 'driver')
 def get_driver_profile(driver_id):
     try:
-        doc = db.collection('drivers').document(driver_id).get()
-        if doc.exists:
-            driver_data = doc.to_dict()
-            user_record = auth.get_user(driver_data['uid'])
-            return jsonify(user_record), 200
+        driver_data = fetch_driver_profile(driver_id)
+        if driver_data is not None:
+            # The profile already holds the account details; no Auth lookup needed
+            driver_data['uid'] = driver_id
+            return jsonify(driver_data), 200
         else:
             return jsonify({'error': 'Driver not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+# Endpoint to retrieve many driver profiles in one request
+@driver_bp.route('/get_drivers', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': f'Admin-only: Retrieve up to {MAX_BATCH_IDS} driver profiles by ID in one request',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'driver_ids': {'type': 'array', 'items': {'type': 'string'}, 'description': 'Driver IDs, as accepted by /driver/<driver_id>'}
+                },
+                'required': ['driver_ids']
+            }
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        200: {'description': 'Drivers keyed by ID (null when not found) and the list of IDs not found'},
+        400: {'description': 'Invalid ID list or error retrieving drivers'}
+    }
+})
+@require_auth('admin')
+def get_driver_profiles():
+    try:
+        driver_ids = batch_ids(request.get_json(silent=True), 'driver_ids')
+
+        # Cached profiles are served locally; the rest are read with one get_all
+        drivers = fetch_driver_profiles(driver_ids)
+        for driver_id, driver_data in drivers.items():
+            if driver_data is not None:
+                driver_data['uid'] = driver_id
+
+        return jsonify(batch_response(driver_ids, drivers, 'drivers')), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Endpoint to list a driver's assigned deliveries, newest first, one page at a time
+@driver_bp.route('/driver/<driver_id>/deliveries', methods=['GET'])
+@swag_from({
+    'tags': ['Driver'],
+    'summary': 'List a driver’s assigned deliveries, newest first, one page at a time',
+    'parameters': [
+        {
+            'name': 'driver_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Public driver ID (e.g. DRIVER0001)'
+        }
+    ] + PAGE_PARAMETERS,
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Drivers may only access their own account.'},
+        200: {'description': 'A page of deliveries and the token for the next page'},
+        400: {'description': 'Invalid page arguments or error listing deliveries'}
+    }
+})
+@require_owner('driver_id', 'driver')
+def list_driver_deliveries(driver_id):
+    try:
+        page_size, page_token = page_args(request.args)
+        deliveries, next_page_token = DriverUser(driver_id, None).view_assigned_deliveries(page_size, page_token)
+        return jsonify({'deliveries': deliveries, 'next_page_token': next_page_token}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Endpoint to return a driver's active deliveries in driving order
+@driver_bp.route('/driver/<driver_id>/route', methods=['GET'])
+@swag_from({
+    'tags': ['Driver'],
+    'summary': 'Sequence a driver’s assigned deliveries into a driving route',
+    'parameters': [
+        {
+            'name': 'driver_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Public driver ID (e.g. DRIVER0001)'
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Drivers may only access their own account.'},
+        200: {'description': 'Deliveries in driving order with the route length in km'},
+        404: {'description': 'Driver not found'},
+        503: {'description': 'ZIP centroid table has not been built'},
+        400: {'description': 'Error sequencing the route'}
+    }
+})
+@require_owner('driver_id', 'driver')
+def get_driver_route(driver_id):
+    try:
+        route = DriverUser(driver_id, None).view_route()
+        if route is None:
+            return jsonify({'error': 'Driver not found'}), 404
+        return jsonify(route), 200
+
+    except CentroidsUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Endpoint to push status changes of a driver's deliveries
+@driver_bp.route('/driver/<driver_id>/stream', methods=['GET'])
+@swag_from({
+    'tags': ['Driver'],
+    'summary': 'Stream status changes of a driver’s deliveries (Server-Sent Events)',
+    'description': 'Sends a "snapshot" event with every active delivery, then a "status" event per change. '
+                   'A later "snapshot" replaces the client’s state; deliveries missing from it have finished.',
+    'produces': ['text/event-stream'],
+    'parameters': [
+        {
+            'name': 'driver_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Public driver ID (e.g. DRIVER0001)'
+        }
+    ],
+    'responses': {
+        200: {'description': 'An event stream'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Drivers may only stream their own deliveries'},
+        503: {'description': 'Status listeners unavailable or too many streams; retry later'}
+    }
+})
+@require_owner('driver_id', 'driver')
+@immediate_writes
+def stream_driver_deliveries(driver_id):
+    try:
+        return stream_response([('driver_id', driver_id)])
+
+    except StreamUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+
 # Endpoint to login a driver
 @driver_bp.route('/driver_login', methods=['POST'])
 @swag_from({
     'tags': ['Driver'],
     'summary': 'Login a driver',
     'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'required': False,
+            'type': 'string',
+            'description': 'Bearer <Firebase ID token>; when present the body is ignored'
+        },
         {
             'name': 'body',
             'in': 'body',
@@ -118,6 +281,13 @@ def get_driver_profile(driver_id):
     }
 })
 def login_driver():
+    # A Firebase ID token is verified locally, with no Auth or profile lookups
+    claims = authenticate()
+    if claims:
+        if claims['role'] != 'driver':
+            return jsonify({'error': 'Driver profile not found.'}), 404
+        return jsonify({'message': f"Driver {claims['email']} logged in successfully", 'uid': claims['uid']}), 200
+
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
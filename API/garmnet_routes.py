@@ -1,10 +1,16 @@
-from firebase import db
+from storage import db
 from flasgger import swag_from
 from flask import request, jsonify
 from . import garment_bp, hamper_bp
-from models.garment import Hamper, Garment
+from models.garment import Garment
+from models.hamper import Hamper
 from utils.garment_prices import GARMENT_PRICE_MAP
 from utils.id_generator import generate_garment_id
+from utils.authentication import require_auth, require_owner
+from utils.unit_of_work import immediate_writes
+from utils.pricing import get_pricing_engine
+from utils.garment_catalog import get_garments, invalidate_garment
+from utils.batch_reads import MAX_BATCH_IDS, batch_ids, batch_response
 
 ######################################## Create a Dry Cleaning Garment ########################################
 
@@ -18,7 +24,7 @@ from utils.id_generator import generate_garment_id
             'in': 'header',
             'required': True,
             'type': 'string',
-            'description': 'Admin user ID for authentication (e.g., ADMIN0001)'
+            'description': 'Bearer <Firebase ID token> of an admin account'
         },
         {
             'name': 'body',
@@ -35,20 +41,16 @@ from utils.id_generator import generate_garment_id
     ],
     'responses': {
         201: {'description': 'Garment created and saved successfully'},
+        401: {'description': 'Missing or invalid ID token'},
         403: {'description': 'Access denied. Admins only.'},
         400: {'description': 'Invalid input or error creating garment'}
     }
 })
+@require_auth('admin')
 def create_dry_cleaning_garment():
     data = request.get_json()
     garment_name = data.get('name')
 
-    # Check if Authorization header is present and starts with ADMIN
-    admin_id = request.headers.get('Authorization')
-
-    if not admin_id or not admin_id.startswith('ADMIN'):
-        return jsonify({'error': 'Access denied. Only admins can perform this action.'}), 403
-
     try:
         garment_id = generate_garment_id()
         # Validate garment name
@@ -58,6 +60,7 @@ def create_dry_cleaning_garment():
         # Save to 'garments' collection with garment_id
         garment = Garment(name=garment_name, garment_id=garment_id)
         db.collection('garments').document(garment_id).set(garment.to_dict())
+        invalidate_garment(garment_id)
 
         return jsonify({
             'message': 'Dry cleaning garment created successfully',
@@ -67,6 +70,46 @@ def create_dry_cleaning_garment():
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+######################################## Get Many Garments ########################################
+
+@garment_bp.route('/get_garments', methods=['POST'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': f'Admin-only: Retrieve up to {MAX_BATCH_IDS} garments by garment_id in one request',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'garment_ids': {'type': 'array', 'items': {'type': 'string'}, 'description': 'Garment IDs'}
+                },
+                'required': ['garment_ids']
+            }
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
+        200: {'description': 'Garments keyed by garment_id (null when not found) and the list of IDs not found'},
+        400: {'description': 'Invalid ID list or error retrieving garments'}
+    }
+})
+@require_auth('admin')
+def get_garments_by_ids():
+    try:
+        garment_ids = batch_ids(request.get_json(silent=True), 'garment_ids')
+
+        # Catalog cache hits first; the misses are read with one get_all
+        garments = get_garments(garment_ids)
+
+        return jsonify(batch_response(garment_ids, garments, 'garments')), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 ######################################## Order a Hamper ########################################
 
 @hamper_bp.route('/order_hamper', methods=['POST'])
@@ -89,10 +132,15 @@ def create_dry_cleaning_garment():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         201: {'description': 'Hamper ordered successfully'},
+        207: {'description': 'Some hamper chunks failed to commit; see failed_chunks'},
         400: {'description': 'Invalid input or error ordering hamper'}
     }
 })
+@require_owner('customer_id', 'user')
+@immediate_writes
 def order_hamper():
     data = request.get_json()
     customer_id = data.get('customer_id')
@@ -102,16 +150,21 @@ def order_hamper():
         return jsonify({'error': 'Invalid customer ID or quantity'}), 400
 
     try:
-        hampers = []
-        for _ in range(quantity):
-            # Corrected Hamper initialization
-            hamper = Hamper(customer_id=customer_id, quantity=1)
-            hamper.save_hamper_to_db()
-            hampers.append(hamper.to_dict())
-        return jsonify({
-            'message': f'{quantity} hamper(s) ordered successfully',
+        # Allocate every ID up front and commit the hampers in chunks of 500
+        hampers, failed_chunks = Hamper.create_bulk(quantity, customer_id=customer_id)
+
+        if failed_chunks and not hampers:
+            return jsonify({'error': 'Failed to order hampers.', 'failed_chunks': failed_chunks}), 400
+
+        response = {
+            'message': f'{len(hampers)} hamper(s) ordered successfully',
             'hampers': hampers
-        }), 201
+        }
+        if failed_chunks:
+            response['failed_chunks'] = failed_chunks
+            return jsonify(response), 207
+
+        return jsonify(response), 201
 
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -139,11 +192,14 @@ def order_hamper():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Admins only.'},
         200: {'description': 'Hamper price updated successfully'},
         400: {'description': 'Invalid input or error updating price'},
         404: {'description': 'Hamper not found'}
     }
 })
+@require_auth('admin')
 def update_hamper_price():
     data = request.get_json()
     hamper_id = data.get('hamper_id')
@@ -158,13 +214,12 @@ def update_hamper_price():
         if not hamper_doc.exists:
             return jsonify({'error': 'Hamper not found'}), 404
 
-        # Base price is $10, additional $2 per lb over 10 lbs
-        base_price = 10.0
-        extra_price = 2.0 * max(0, weight - 10)
-        updated_price = base_price + extra_price
+        # Base price plus the per-lb weight tiers (see utils/pricing.py)
+        updated_price = get_pricing_engine().hamper_price(weight)
 
         # Update the hamper price in Firestore
         db.collection('garments').document(hamper_id).update({'price': updated_price})
+        invalidate_garment(hamper_id)
 
         return jsonify({
             'message': 'Hamper price updated successfully',
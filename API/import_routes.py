@@ -0,0 +1,94 @@
+import json
+from flasgger import swag_from
+from flask import request, jsonify, Response, stream_with_context
+from . import import_bp
+from utils.authentication import require_auth
+from utils.unit_of_work import immediate_writes
+from utils.user_import import parse_rows, run_import, start_or_resume_job
+
+# ****************************************** Import Routes ******************************************
+
+# Admin-only: bulk import customer or driver accounts from a CSV or NDJSON upload
+@import_bp.route('/import_accounts', methods=['POST'])
+@swag_from({
+    'tags': ['Admin'],
+    'summary': 'Admin-only: Bulk import customer or driver accounts (CSV or NDJSON)',
+    'description': (
+        'Each row carries the /user_register fields (email, password, full_name, phone_number) '
+        'and, for drivers, the /driver_register fields (vehicle_type, license_plate). '
+        'Results stream back as NDJSON: a job line, one line per row and a summary line. '
+        'If the summary status is "failed", re-send the same file with job_id to resume.'
+    ),
+    'consumes': ['multipart/form-data', 'text/csv', 'application/x-ndjson'],
+    'parameters': [
+        {
+            'name': 'role',
+            'in': 'query',
+            'required': True,
+            'type': 'string',
+            'enum': ['user', 'driver'],
+            'description': 'Account type to create'
+        },
+        {
+            'name': 'format',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'enum': ['csv', 'ndjson'],
+            'description': 'Upload format; defaults from the Content-Type or file extension'
+        },
+        {
+            'name': 'job_id',
+            'in': 'query',
+            'required': False,
+            'type': 'string',
+            'description': 'Resume a previous import, skipping the rows it already committed'
+        },
+        {
+            'name': 'file',
+            'in': 'formData',
+            'required': False,
+            'type': 'file',
+            'description': 'The upload; alternatively send it as the raw request body'
+        }
+    ],
+    'responses': {
+        200: {'description': 'NDJSON stream of per-row results and a summary'},
+        400: {'description': 'Missing upload, unknown role or job'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Caller is not an admin'}
+    }
+})
+@require_auth('admin')
+@immediate_writes
+def import_accounts():
+    role = request.args.get('role', 'user')
+    job_id = request.args.get('job_id')
+    data_format = request.args.get('format')
+
+    upload = request.files.get('file')
+    if upload is not None:
+        payload = upload.read()
+        data_format = data_format or ('csv' if (upload.filename or '').lower().endswith('.csv') else 'ndjson')
+    else:
+        payload = request.get_data()
+        data_format = data_format or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+
+    if not payload:
+        return jsonify({'error': 'Upload a CSV or NDJSON file.'}), 400
+    if data_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format must be csv or ndjson.'}), 400
+
+    try:
+        payload = payload.decode('utf-8-sig')
+        resumed = bool(job_id)
+        job_id, job = start_or_resume_job(job_id, role)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        yield json.dumps({'job_id': job_id, 'role': role, 'resume_after_row': job['rows_done']}) + '\n'
+        for result in run_import(job_id, job, parse_rows(payload, data_format), resumed):
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -1,9 +1,17 @@
 
 from flask import Blueprint, request, jsonify
-from firebase_admin import auth
 from flasgger import swag_from
 from utils.id_generator import generate_garment_id
-from app import db
+from utils.user_index import resolve_user_uid
+from utils.pricing import HAMPER, get_pricing_engine
+from utils.cart import EmptyCartError, add_to_cart, checkout, get_cart_summary, list_cart_items, remove_from_cart
+from utils.pagination import PAGE_PARAMETERS, page_args
+from utils.garment_catalog import get_garment
+from utils.authentication import require_owner
+from utils.status_stream import StreamUnavailable, stream_response
+from utils.unit_of_work import immediate_writes
+from models.user import CustomerUser
+from storage import db
 from . import order_bp
 
 
@@ -28,11 +36,14 @@ from . import order_bp
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'Garment added to cart successfully'},
         404: {'description': 'Garment not found'},
         400: {'description': 'Error adding garment to cart'}
     }
 })
+@require_owner('user_id', 'user')
 def order_garment():
     data = request.get_json()
     user_id = data.get('user_id')
@@ -41,20 +52,16 @@ def order_garment():
 
     try:
         # Step 1: Find the Firestore Document ID for the given user_id
-        user_query = db.collection('users').where('user_id', '==', user_id).limit(1).stream()
-        user_doc = next(user_query, None)
+        firestore_user_id = resolve_user_uid(user_id)
 
-        if not user_doc:
+        if not firestore_user_id:
             return jsonify({'error': 'User not found.'}), 404
 
-        firestore_user_id = user_doc.id  # Get the Firestore-generated document ID
-
-        # Step 2: Fetch the garment details
-        garment_doc = db.collection('garments').document(garment_id).get()
-        if not garment_doc.exists:
+        # Step 2: Fetch the garment details (from this worker's catalog cache when it has them)
+        garment_data = get_garment(garment_id) if garment_id else None
+        if garment_data is None:
             return jsonify({'error': 'Garment not found.'}), 404
 
-        garment_data = garment_doc.to_dict()
         garment_data['quantity'] = quantity
         garment_data['total_price'] = garment_data['price'] * quantity
         
@@ -63,10 +70,10 @@ def order_garment():
             garment_id = generate_garment_id()
             db.collection('garments').document(garment_id).set(garment_data)
 
-        # Step 4: Add the garment to the user's cart
-        db.collection('users').document(firestore_user_id).collection('cart_items').document(garment_id).set(garment_data)
+        # Step 4: Add the garment to the user's cart and update the cart summary
+        summary = add_to_cart(firestore_user_id, garment_id, garment_data)
 
-        return jsonify({'message': 'Garment added to cart successfully.'}), 200
+        return jsonify({'message': 'Garment added to cart successfully.', 'cart': summary}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -91,25 +98,30 @@ def order_garment():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'Garment removed from cart'},
-        404: {'description': 'Garment not found in cart'},
+        404: {'description': 'User not found, or garment not found in cart'},
         400: {'description': 'Error removing garment'}
     }
 })
+@require_owner('user_id', 'user')
 def remove_garment_from_cart():
     data = request.get_json()
     user_id = data.get('user_id')
     garment_id = data.get('garment_id')
 
     try:
-        # Remove garment from user's cart
-        cart_item = db.collection('users').document(user_id).collection('cart_items').document(garment_id).get()
-        if not cart_item.exists:
-            return jsonify({'error': 'Garment not found in cart.'}), 404
+        firestore_user_id = resolve_user_uid(user_id)
+        if not firestore_user_id:
+            return jsonify({'error': 'User not found.'}), 404
 
-        db.collection('users').document(user_id).collection('cart_items').document(garment_id).delete()
+        # Remove garment from user's cart and update the cart summary
+        summary = remove_from_cart(firestore_user_id, garment_id)
+        if summary is None:
+            return jsonify({'error': 'Garment not found in cart.'}), 404
 
-        return jsonify({'message': 'Garment removed from cart successfully.'}), 200
+        return jsonify({'message': 'Garment removed from cart successfully.', 'cart': summary}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -135,25 +147,295 @@ def remove_garment_from_cart():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'Garment removed from cart'},
-        404: {'description': 'Garment not found in cart'},
+        404: {'description': 'User not found, or garment not found in cart'},
         400: {'description': 'Error removing garment'}
     }
 })
+@require_owner('user_id', 'user')
 def remove_hamper_from_cart():
     data = request.get_json()
     user_id = data.get('user_id')
     hamper_id = data.get('hamper_id')
 
     try:
-        # Remove garment from user's cart
-        cart_item = db.collection('users').document(user_id).collection('cart_items').document(hamper_id).get()
-        if not cart_item.exists:
+        firestore_user_id = resolve_user_uid(user_id)
+        if not firestore_user_id:
+            return jsonify({'error': 'User not found.'}), 404
+
+        # Remove hamper from user's cart and update the cart summary
+        summary = remove_from_cart(firestore_user_id, hamper_id)
+        if summary is None:
             return jsonify({'error': 'Garment not found in cart.'}), 404
 
-        db.collection('users').document(user_id).collection('cart_items').document(hamper_id).delete()
+        return jsonify({'message': 'Garment removed from cart successfully.', 'cart': summary}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Endpoint to read the cart totals from the cart summary document
+@order_bp.route('/cart/<user_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'Get the user’s cart totals (item count, subtotal per garment, grand total)',
+    'parameters': [
+        {
+            'name': 'user_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string'
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
+        200: {'description': 'Cart summary'},
+        404: {'description': 'User not found'},
+        400: {'description': 'Error reading cart'}
+    }
+})
+@require_owner('user_id', 'user')
+def get_cart(user_id):
+    try:
+        firestore_user_id = resolve_user_uid(user_id)
+        if not firestore_user_id:
+            return jsonify({'error': 'User not found.'}), 404
+
+        return jsonify({'user_id': user_id, 'cart': get_cart_summary(firestore_user_id)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+# Endpoint to turn the user's cart into an order in a single transaction
+@order_bp.route('/checkout', methods=['POST'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'Check out the user’s cart: re-price it, create the order and clear the cart atomically',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'user_id': {'type': 'string'},
+                    'promo_code': {'type': 'string'}
+                },
+                'required': ['user_id']
+            }
+        }
+    ],
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
+        201: {'description': 'Order created from the cart'},
+        404: {'description': 'User not found'},
+        409: {'description': 'Cart is empty (e.g. it was already checked out)'},
+        400: {'description': 'Error during checkout'}
+    }
+})
+@require_owner('user_id', 'user')
+def checkout_cart():
+    data = request.get_json()
+    user_id = data.get('user_id')
+
+    try:
+        firestore_user_id = resolve_user_uid(user_id)
+        if not firestore_user_id:
+            return jsonify({'error': 'User not found.'}), 404
+
+        order = checkout(firestore_user_id, user_id, promo_code=data.get('promo_code'))
+        return jsonify({'message': 'Order created successfully.', 'order': order}), 201
+
+    except EmptyCartError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+# Endpoint to list a customer's orders, newest first, one page at a time
+@order_bp.route('/orders/<user_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'List a customer’s orders, newest first, one page at a time',
+    'parameters': [
+        {
+            'name': 'user_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string'
+        }
+    ] + PAGE_PARAMETERS,
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
+        200: {'description': 'A page of orders and the token for the next page'},
+        400: {'description': 'Invalid page arguments or error listing orders'}
+    }
+})
+@require_owner('user_id', 'user')
+def list_orders(user_id):
+    try:
+        page_size, page_token = page_args(request.args)
+        orders, next_page_token = CustomerUser(user_id, None).view_orders(page_size, page_token)
+        return jsonify({'orders': orders, 'next_page_token': next_page_token}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+
+# Endpoint to push status changes of a customer's orders, hampers and deliveries
+@order_bp.route('/orders/<user_id>/stream', methods=['GET'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'Stream status changes of a customer’s orders, hampers and deliveries (Server-Sent Events)',
+    'description': 'Sends a "snapshot" event with every active document, then a "status" event per change. '
+                   'A later "snapshot" replaces the client’s state; documents missing from it have finished.',
+    'produces': ['text/event-stream'],
+    'parameters': [
+        {
+            'name': 'user_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string'
+        }
+    ],
+    'responses': {
+        200: {'description': 'An event stream'},
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Customers may only stream their own orders'},
+        503: {'description': 'Status listeners unavailable or too many streams; retry later'}
+    }
+})
+@require_owner('user_id', 'user')
+@immediate_writes
+def stream_orders(user_id):
+    try:
+        return stream_response([('customer_id', user_id)])
 
-        return jsonify({'message': 'Garment removed from cart successfully.'}), 200
+    except StreamUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+
+# Endpoint to list the items in a user's cart, one page at a time
+@order_bp.route('/cart/<user_id>/items', methods=['GET'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'List the items in the user’s cart, one page at a time',
+    'parameters': [
+        {
+            'name': 'user_id',
+            'in': 'path',
+            'required': True,
+            'type': 'string'
+        }
+    ] + PAGE_PARAMETERS,
+    'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
+        200: {'description': 'A page of cart items and the token for the next page'},
+        404: {'description': 'User not found'},
+        400: {'description': 'Invalid page arguments or error listing the cart'}
+    }
+})
+@require_owner('user_id', 'user')
+def list_cart(user_id):
+    try:
+        page_size, page_token = page_args(request.args)
+        firestore_user_id = resolve_user_uid(user_id)
+        if not firestore_user_id:
+            return jsonify({'error': 'User not found.'}), 404
+
+        items, next_page_token = list_cart_items(firestore_user_id, page_size, page_token)
+        return jsonify({'items': items, 'next_page_token': next_page_token}), 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': str(e)}), 400
+
+
+MAX_QUOTE_LINES = 10_000
+
+# Endpoint to price cart lines and hamper weights in bulk
+@order_bp.route('/quote', methods=['POST'])
+@swag_from({
+    'tags': ['Order'],
+    'summary': 'Price up to 10,000 cart lines and hamper weights in one call',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'items': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'name': {'type': 'string'},
+                                'quantity': {'type': 'integer'},
+                                'weight': {'type': 'number', 'description': 'Hamper weight in lbs'}
+                            },
+                            'required': ['name']
+                        }
+                    },
+                    'hamper_weights': {
+                        'type': 'array',
+                        'items': {'type': 'number'},
+                        'description': 'Shorthand for one hamper line per weight'
+                    },
+                    'partner_id': {'type': 'string'},
+                    'promo_code': {'type': 'string'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {'description': 'Per-line prices and totals'},
+        400: {'description': 'Invalid lines, weights or promotion code'}
+    }
+})
+def quote():
+    data = request.get_json() or {}
+    items = data.get('items') or []
+    hamper_weights = data.get('hamper_weights') or []
+
+    if not items and not hamper_weights:
+        return jsonify({'error': 'Provide items and/or hamper_weights.'}), 400
+    if len(items) + len(hamper_weights) > MAX_QUOTE_LINES:
+        return jsonify({'error': f'A quote is limited to {MAX_QUOTE_LINES} lines.'}), 400
+
+    try:
+        names = [item['name'] for item in items] + [HAMPER] * len(hamper_weights)
+        quantities = [item.get('quantity', 1) for item in items] + [1] * len(hamper_weights)
+        weights = [item.get('weight') or 0 for item in items] + list(hamper_weights)
+
+        result = get_pricing_engine().quote(
+            names, quantities, weights, partner_id=data.get('partner_id'), promo_code=data.get('promo_code'))
+
+        lines = [
+            {'name': name, 'quantity': quantity, 'weight': weight,
+             'unit_price': unit_price, 'discount': discount, 'line_total': line_total}
+            for name, quantity, weight, unit_price, discount, line_total in zip(
+                names, quantities, weights, result['unit_prices'].tolist(),
+                result['discounts'].tolist(), result['line_totals'].tolist())
+        ]
+        unknown_items = sorted({names[i] for i in result['unknown'].nonzero()[0].tolist()})
+
+        return jsonify({
+            'lines': lines,
+            'unknown_items': unknown_items,
+            'subtotal': result['subtotal'],
+            'discount': result['discount'],
+            'total': result['total']
+        }), 200
+
+    except (KeyError, TypeError):
+        return jsonify({'error': 'Each item needs a name and a numeric quantity.'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
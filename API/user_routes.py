@@ -1,11 +1,13 @@
 import re
-from app import db
+from storage import db, auth
 from . import user_bp
 from flasgger import swag_from
-from firebase_admin import auth
 from flask import request, jsonify
 from models.user import User, CreditCard
 from utils.id_generator import generate_user_id, generate_credit_card_id
+from utils.user_index import resolve_user_uid, user_index_ref
+from utils.profiles import invalidate_user_profile
+from utils.authentication import authenticate, require_owner, set_role_claim
 
 
 # Endpoint to register a new user
@@ -53,7 +55,13 @@ def register_user():
             'phone_number': phone_number,
             'role': 'user'
         }
-        db.collection('users').document(user_record.uid).set(user_data)
+
+        # Write the profile and its user_id lookup entry atomically
+        batch = db.batch()
+        batch.set(db.collection('users').document(user_record.uid), user_data)
+        batch.create(user_index_ref(user_id), {'uid': user_record.uid})
+        batch.commit()
+        set_role_claim(user_record.uid, 'user', user_id)
         return jsonify({'message': 'User account created successfully', 'uid': user_record.uid, 'user_id': user_id}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -64,6 +72,13 @@ def register_user():
     'tags': ['User'],
     'summary': 'Login a user',
     'parameters': [
+        {
+            'name': 'Authorization',
+            'in': 'header',
+            'required': False,
+            'type': 'string',
+            'description': 'Bearer <Firebase ID token>; when present the body is ignored'
+        },
         {
             'name': 'body',
             'in': 'body',
@@ -84,6 +99,13 @@ def register_user():
     }
 })
 def login_user():
+    # A Firebase ID token is verified locally, with no Auth or profile lookups
+    claims = authenticate()
+    if claims:
+        if claims['role'] != 'user':
+            return jsonify({'error': 'User profile not found.'}), 404
+        return jsonify({'message': f"User {claims['email']} logged in successfully", 'uid': claims['uid']}), 200
+
     data = request.get_json()
     email = data.get('email')
     password = data.get('password')
@@ -130,11 +152,14 @@ def login_user():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'User profile updated successfully'},
         400: {'description': 'Invalid input or error updating profile'},
         404: {'description': 'User not found'}
     }
 })
+@require_owner('user_id', 'user')
 def update_user_info():
     data = request.get_json()
     user_id = data.get('user_id')
@@ -155,16 +180,12 @@ def update_user_info():
         return jsonify({'error': 'Invalid ZIP code format. Provide a 5-digit ZIP or ZIP+4.'}), 400
 
     try:
-        # Query user by 'user_id' instead of document ID
-        user_query = db.collection('users').where('user_id', '==', user_id).stream()
-        user_docs = [doc for doc in user_query]
+        # Resolve the Firestore document ID through the user_id index
+        user_doc_id = resolve_user_uid(user_id)
 
-        if not user_docs:
+        if not user_doc_id:
             return jsonify({'error': 'User not found.'}), 404
 
-        # Get the Firestore document ID for the matched user
-        user_doc_id = user_docs[0].id
-
         # Prepare updated data
         updated_data = {
             'full_name': full_name,
@@ -180,6 +201,7 @@ def update_user_info():
 
         # Update user document in Firestore
         db.collection('users').document(user_doc_id).update(updated_data)
+        invalidate_user_profile(user_doc_id)
 
         return jsonify({'message': f'User {user_id} profile updated successfully.'}), 200
 
@@ -210,11 +232,14 @@ def update_user_info():
         }
     ],
     'responses': {
+        401: {'description': 'Missing or invalid ID token'},
+        403: {'description': 'Access denied. Customers may only access their own account.'},
         200: {'description': 'Credit card added successfully'},
         400: {'description': 'Invalid input or error adding credit card'},
         404: {'description': 'User not found'}
     }
 })
+@require_owner('user_id', 'user')
 def add_credit_card():
     data = request.get_json()
     user_id = data.get('user_id')
@@ -232,16 +257,12 @@ def add_credit_card():
         return jsonify({'error': 'Invalid expiration date format. Use MM/YY.'}), 400
 
     try:
-        # Query user by 'user_id'
-        user_query = db.collection('users').where('user_id', '==', user_id).stream()
-        user_docs = [doc for doc in user_query]
+        # Resolve the Firestore document ID through the user_id index
+        user_doc_id = resolve_user_uid(user_id)
 
-        if not user_docs:
+        if not user_doc_id:
             return jsonify({'error': 'User not found.'}), 404
 
-        # Get the Firestore document ID
-        user_doc_id = user_docs[0].id
-
         # Generate unique credit card ID
         credit_card_id = generate_credit_card_id()
 
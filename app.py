@@ -1,14 +1,20 @@
 from flask import Flask
 from flasgger import Swagger
-from firebase import db
 from config import Config
 from API.admin_routes import admin_bp
 from API.user_routes import user_bp
 from API.driver_routes import driver_bp
 from API.garmnet_routes import garment_bp
 from API.order_routes import order_bp
+from API.async_routes import async_bp
+from API.import_routes import import_bp
 from API import hamper_bp
 from main import main_bp
+from commands import register_commands
+from main.spec_cache import install_spec_cache
+from utils.metrics import init_metrics
+from utils.request_tracer import init_request_tracer
+from utils.unit_of_work import init_unit_of_work
 import sys
 import os
 
@@ -50,6 +56,27 @@ app.register_blueprint(driver_bp, url_prefix='/api')
 app.register_blueprint(garment_bp, url_prefix='/api')
 app.register_blueprint(order_bp, url_prefix='/api')
 app.register_blueprint(hamper_bp, url_prefix='/api')
+app.register_blueprint(async_bp, url_prefix='/api/async')
+app.register_blueprint(import_bp, url_prefix='/api')
+
+# Serve the OpenAPI spec from memory instead of rebuilding it on every request
+install_spec_cache(app, swagger)
+
+# Per-route latency histograms and Firestore/Auth operation counters on /metrics
+if Config.METRICS_ENABLED:
+    init_metrics(app)
+
+# Flag requests that exceed the Firestore round-trip budget (development/staging)
+if Config.FIRESTORE_TRACE_ENABLED:
+    init_request_tracer(app)
+
+# Commit each request's writes as one batch after the view returns. Registered last
+# so its after_request hook runs first and the commit is counted against the route.
+if Config.UNIT_OF_WORK_ENABLED:
+    init_unit_of_work(app)
+
+# Register maintenance CLI commands (e.g. `flask backfill-user-index`)
+register_commands(app)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+"""
+Synthetic benchmark for the dispatch engine.
+
+Times plan_assignments() on its own (SciPy and greedy solvers) and a full dispatch()
+cycle against the in-memory backend: loading pending orders, resolving customer
+ZIP codes, assigning and committing the deliveries.
+
+    python -m benchmarks.dispatch --stops 5000 --drivers 300
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import set_backend
+from storage.memory_backend import MemoryBackend
+
+
+def synthetic_zips(count, zip_count, rng):
+    # Clustered like a metro area: a few 3-digit prefixes, many 5-digit ZIPs under each
+    pool = [f'{prefix}{rng.randrange(100):02d}' for prefix in ('786', '787', '789') for _ in range(zip_count // 3 or 1)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def seed(backend, stops, drivers, zip_count, rng):
+    from utils.dispatch import VEHICLE_CAPACITY
+
+    db = backend.client
+    vehicle_types = list(VEHICLE_CAPACITY)
+    batch = db.batch()
+
+    def flush():
+        nonlocal batch
+        if len(batch):
+            batch.commit()
+            batch = db.batch()
+
+    for i, zip_code in enumerate(synthetic_zips(stops, zip_count, rng)):
+        uid, user_id = f'bench-uid-{i}', f'BENCHUSER{i:06d}'
+        batch.set(db.collection('users').document(uid), {
+            'user_id': user_id, 'role': 'user', 'address_details': {'address': f'{i} Main St', 'zip_code': zip_code}})
+        batch.set(db.collection('user_ids').document(user_id), {'uid': uid})
+        # Half the stops are checkout orders (carry the uid), half are hampers (customer_id only)
+        if i % 2:
+            batch.set(db.collection('orders').document(f'ORDERB{i:06d}'), {'customer_id': user_id, 'uid': uid, 'status': 'pending'})
+        else:
+            batch.set(db.collection('hampers').document(f'HAMPB{i:06d}'), {'customer_id': user_id, 'status': 'pending'})
+        if len(batch) >= 450:
+            flush()
+
+    for i, zip_code in enumerate(synthetic_zips(drivers, zip_count, rng)):
+        batch.set(db.collection('drivers').document(f'bench-driver-{i}'), {
+            'driver_id': f'BENCHDRIVER{i:04d}', 'vehicle_type': rng.choice(vehicle_types), 'zip_code': zip_code, 'role': 'driver'})
+        if len(batch) >= 450:
+            flush()
+    flush()
+
+
+def time_plans(stops, drivers, zip_count, runs, rng):
+    import utils.dispatch as dispatch_module
+
+    stop_zips = synthetic_zips(stops, zip_count, rng)
+    driver_zips = synthetic_zips(drivers, zip_count, rng)
+    capacities = [rng.choice(list(dispatch_module.VEHICLE_CAPACITY.values())) for _ in range(drivers)]
+
+    solvers = {'greedy': None}
+    if dispatch_module.linear_sum_assignment is not None:
+        solvers['scipy'] = dispatch_module.linear_sum_assignment
+
+    results = {}
+    original = dispatch_module.linear_sum_assignment
+    try:
+        for name, solver in solvers.items():
+            dispatch_module.linear_sum_assignment = solver
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                plan = dispatch_module.plan_assignments(stop_zips, driver_zips, capacities)
+                timings.append((time.perf_counter() - started) * 1000.0)
+            same_zip = sum(1 for stop, driver in zip(stop_zips, plan.tolist()) if driver >= 0 and driver_zips[driver] == stop)
+            results[name] = (statistics.median(timings), int((plan >= 0).sum()), same_zip)
+    finally:
+        dispatch_module.linear_sum_assignment = original
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stops', type=int, default=5000, help='pending orders/hampers (default 5000)')
+    parser.add_argument('--drivers', type=int, default=300, help='available drivers (default 300)')
+    parser.add_argument('--zips', type=int, default=150, help='distinct ZIP codes (default 150)')
+    parser.add_argument('--runs', type=int, default=5, help='plan_assignments repetitions (default 5)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    backend = set_backend(MemoryBackend())
+    from utils.dispatch import dispatch
+
+    print(f'{args.stops} stops, {args.drivers} drivers, ~{args.zips} ZIP codes')
+    for name, (median_ms, assigned, same_zip) in time_plans(args.stops, args.drivers, args.zips, args.runs, rng).items():
+        print(f'  plan_assignments [{name:6}]  {median_ms:8.1f} ms  assigned {assigned}, same-ZIP driver {same_zip}')
+
+    seed(backend, args.stops, args.drivers, args.zips, rng)
+    backend.client.reset_op_counts()
+    started = time.perf_counter()
+    summary = dispatch(max_stops=args.stops)
+    elapsed = (time.perf_counter() - started) * 1000.0
+    ops = dict(backend.client.op_counts)
+    print(f"  dispatch() end to end      {elapsed:8.1f} ms  assigned {summary['assigned']}, "
+          f"unassigned {summary['unassigned']}, drivers used {summary['drivers_used']}")
+    print(f"  Firestore: {ops.get('query', 0)} queries, {ops.get('get_all', 0)} get_all, "
+          f"{ops.get('batch_commit', 0)} batch commits, {ops.get('documents_read', 0)} docs read, "
+          f"{ops.get('documents_written', 0)} docs written")
+
+
+if __name__ == '__main__':
+    main()
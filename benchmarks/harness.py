@@ -0,0 +1,160 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from collections import Counter
+
+# Keys in MemoryClient.op_counts that are not round trips
+_VOLUME_KEYS = ('documents_read', 'documents_written')
+
+
+class Scenario:
+    """
+    One benchmarked request shape.
+
+    `request(i, ctx)` returns (method, path, body, headers) for iteration i, where a str
+    or bytes body is sent as is and anything else as JSON;
+    `setup(ctx)` runs once before timing starts and may store state in ctx.
+    """
+
+    def __init__(self, name, request, setup=None, iterations=None, warmup=5):
+        self.name = name
+        self.request = request
+        self.setup = setup
+        self.iterations = iterations
+        self.warmup = warmup
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _issue(client, scenario, i, ctx):
+    """
+    Sends one request and reads the whole body before closing the response, so streamed
+    responses are generated inside the timing and their request context is popped here.
+    """
+    method, path, body, headers = scenario.request(i, ctx)
+    payload = {'data': body} if isinstance(body, (str, bytes)) else {'json': body}
+    with client.open(path, method=method, headers=headers or {}, **payload) as response:
+        response.get_data()
+    return response
+
+
+def _endpoint(client, response):
+    """The Flask endpoint that served the response, or None for an unmatched URL."""
+    if response is None:
+        return None
+    try:
+        endpoint, _ = client.application.url_map.bind_to_environ(response.request.environ).match(
+            method=response.request.method)
+    except Exception:
+        return None
+    return endpoint
+
+
+def uncovered_endpoints(app, results, ignore=()):
+    """Endpoints of app that no result exercised, skipping those starting with a prefix in ignore."""
+    covered = {result['endpoint'] for result in results}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()
+                   if rule.endpoint not in covered and not rule.endpoint.startswith(tuple(ignore))})
+
+
+def run_scenario(client, backend, scenario, iterations):
+    ctx = {}
+    if scenario.setup:
+        scenario.setup(ctx)
+
+    iterations = scenario.iterations or iterations
+    for i in range(scenario.warmup):
+        _issue(client, scenario, -(i + 1), ctx)
+
+    backend.client.reset_op_counts()
+    backend.auth.reset_op_counts()
+
+    latencies, statuses = [], Counter()
+    response = None
+    started = time.perf_counter()
+    for i in range(iterations):
+        request_started = time.perf_counter()
+        response = _issue(client, scenario, i, ctx)
+        latencies.append((time.perf_counter() - request_started) * 1000.0)
+        statuses[response.status_code] += 1
+    elapsed = time.perf_counter() - started
+
+    firestore_ops = dict(backend.client.op_counts)
+    auth_ops = dict(backend.auth.op_counts)
+    round_trips = sum(v for k, v in firestore_ops.items() if k not in _VOLUME_KEYS)
+
+    latencies.sort()
+    return {
+        'scenario': scenario.name,
+        'endpoint': _endpoint(client, response),
+        'requests': iterations,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3) if latencies else 0.0,
+        'requests_per_sec': round(iterations / elapsed, 1) if elapsed else 0.0,
+        'firestore_round_trips_per_request': round(round_trips / iterations, 2),
+        'documents_read_per_request': round(firestore_ops.get('documents_read', 0) / iterations, 2),
+        'documents_written_per_request': round(firestore_ops.get('documents_written', 0) / iterations, 2),
+        'auth_calls_per_request': round(sum(auth_ops.values()) / iterations, 2),
+        'firestore_ops': firestore_ops,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path, results, options):
+    payload = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'options': options,
+        'results': results,
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+    return payload
+
+
+def compare(previous_path, results):
+    """Prints p50/p95 and round-trip deltas against a previous results file."""
+    with open(previous_path) as f:
+        previous = {r['scenario']: r for r in json.load(f)['results']}
+
+    print(f"\n{'scenario':<34}{'p50 Δ%':>10}{'p95 Δ%':>10}{'round trips':>16}")
+    for result in results:
+        before = previous.get(result['scenario'])
+        if not before:
+            continue
+
+        def delta(key):
+            return (result[key] - before[key]) / before[key] * 100.0 if before[key] else 0.0
+
+        trips = f"{before['firestore_round_trips_per_request']} -> {result['firestore_round_trips_per_request']}"
+        print(f"{result['scenario']:<34}{delta('p50_ms'):>+10.1f}{delta('p95_ms'):>+10.1f}{trips:>16}")
+
+
+def print_table(results):
+    print(f"{'scenario':<34}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>10}{'fs rt/req':>11}{'auth/req':>10}  status")
+    for r in results:
+        print(
+            f"{r['scenario']:<34}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+            f"{r['requests_per_sec']:>10.1f}{r['firestore_round_trips_per_request']:>11.2f}"
+            f"{r['auth_calls_per_request']:>10.2f}  {r['status_codes']}"
+        )
@@ -0,0 +1,346 @@
+"""
+Drives every route (all but static files and the Swagger UI pages) through the Flask
+test client against the in-memory storage backend and records latency, throughput and
+Firestore/Auth calls per request. A full run lists any route no scenario reached, so
+a new route comes with its scenario.
+
+    python -m benchmarks.routes --output bench_results.json
+    python -m benchmarks.routes --compare bench_results.json --only order_
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import set_backend
+from storage.memory_backend import MemoryBackend
+from benchmarks.harness import Scenario, compare, print_table, run_scenario, uncovered_endpoints, write_results
+
+SCALE_USERS = 10_000
+# Endpoints that are not benchmarked: static files and the Swagger UI
+UNBENCHMARKED_ENDPOINTS = ('static', 'flasgger.static', 'flasgger.apidocs', 'flasgger.oauth_redirect', 'flasgger.<lambda>')
+
+
+def seed_users(backend, count, prefix='SEED'):
+    """Writes `count` user profiles and their user_id index entries directly into the store."""
+    db = backend.client
+    user_ids = []
+    batch = db.batch()
+    for i in range(count):
+        uid, user_id = f'{prefix.lower()}-uid-{i}', f'{prefix}USER{i:06d}'
+        batch.set(db.collection('users').document(uid), {
+            'user_id': user_id,
+            'email': f'{prefix.lower()}{i}@example.com',
+            'full_name': f'Seed User {i}',
+            'phone_number': '5125550100',
+            'role': 'user',
+        })
+        batch.set(db.collection('user_ids').document(user_id), {'uid': uid})
+        user_ids.append((uid, user_id))
+        if len(batch) >= 500:
+            batch.commit()
+            batch = db.batch()
+    if len(batch):
+        batch.commit()
+    return user_ids
+
+
+def seed_garment(backend, garment_id='GARMBENCH', collection='garments'):
+    backend.client.collection(collection).document(garment_id).set({
+        'garment_id': garment_id, 'name': 'shirt', 'price': 5.0, 'quantity': 1, 'status': 'available', 'total_price': 5.0,
+    })
+    return garment_id
+
+
+def bearer_headers(backend, client, register_path, email, extra=None):
+    """Registers an account through the API and returns headers carrying its ID token."""
+    data = {'email': email, 'password': 'secret123', 'full_name': 'Bench', 'phone_number': '5125550100'}
+    data.update(extra or {})
+    uid = client.post(register_path, json=data).get_json()['uid']
+    return {'Authorization': f'Bearer {backend.auth.create_id_token(uid)}'}
+
+
+def token_headers(backend, uid):
+    """Headers carrying an ID token for uid, creating its Auth account first for seeded profiles."""
+    try:
+        backend.auth.get_user(uid)
+    except Exception:
+        backend.auth.create_user(uid=uid)
+    return {'Authorization': f'Bearer {backend.auth.create_id_token(uid)}'}
+
+
+def admin_headers_for(backend, email):
+    """Creates an admin the way `flask create-admin` does and returns headers carrying its ID token."""
+    from models.user import AdminUser
+
+    uid, _ = AdminUser.register(email, 'secret123', 'Bench Admin', '5125550100')
+    return {'Authorization': f'Bearer {backend.auth.create_id_token(uid)}'}
+
+
+def ensure_zip_centroids():
+    """Points Config at a synthetic table of the 787xx ZIPs when the real one has not been built."""
+    import tempfile
+    import numpy as np
+    from config import Config
+    from utils.zip_centroids import CENTROID_DTYPE, centroids_available
+
+    if centroids_available():
+        return
+    path = os.path.join(tempfile.mkdtemp(prefix='bench-centroids-'), 'zip_centroids.npy')
+    np.save(path, np.array([(78700 + i, 30.2 + (i % 10) * 0.02, -97.8 + (i // 10) * 0.02) for i in range(100)],
+                           dtype=CENTROID_DTYPE))
+    Config.ZIP_CENTROIDS_PATH = path
+
+
+def build_scenarios(backend, client, include_scale=True):
+    admin_headers = admin_headers_for(backend, 'bench-root-admin@example.com')
+    user_headers = bearer_headers(backend, client, '/api/user_register', 'bench-token-user@example.com')
+
+    def post_json(path, body, headers=None):
+        return lambda i, ctx: ('POST', path, body(i, ctx) if callable(body) else body, headers)
+
+    def register(path, email_prefix, extra=None, headers=None):
+        def body(i, ctx):
+            data = {'email': f'{email_prefix}{i}@example.com', 'password': 'secret123',
+                    'full_name': 'Bench User', 'phone_number': '5125550100'}
+            data.update(extra or {})
+            return data
+        return post_json(path, body, headers)
+
+    def with_account(register_path, email, extra=None, headers=None):
+        def setup(ctx):
+            data = {'email': email, 'password': 'secret123', 'full_name': 'Bench', 'phone_number': '5125550100'}
+            data.update(extra or {})
+            ctx['registration'] = client.post(register_path, json=data, headers=headers or {}).get_json()
+            ctx['headers'] = token_headers(backend, ctx['registration']['uid'])
+        return setup
+
+    def with_seeded_user(ctx):
+        ctx['uid'], ctx['user_id'] = seed_users(backend, 1, prefix='CTX')[0]
+        ctx['headers'] = token_headers(backend, ctx['uid'])
+
+    def with_batch_users(ctx):
+        ctx['user_ids'] = [user_id for _, user_id in seed_users(backend, 100, prefix='BATCH')]
+
+    def with_batch_drivers(ctx):
+        drivers = backend.client.collection('drivers')
+        ctx['driver_ids'] = [f'batch-driver-{i}' for i in range(100)]
+        for i, uid in enumerate(ctx['driver_ids']):
+            drivers.document(uid).set({'driver_id': f'BATCHDRIVER{i}', 'full_name': 'Batch Driver', 'vehicle_type': 'van'})
+
+    def with_batch_garments(ctx):
+        ctx['garment_ids'] = [seed_garment(backend, f'BATCHGARMENT{i}') for i in range(100)]
+
+    def with_cart(ctx):
+        with_seeded_user(ctx)
+        cart = backend.client.collection('users').document(ctx['uid']).collection('cart_items')
+        for i in range(-10, 5000):
+            cart.document(f'ITEM{i}').set({'name': 'shirt', 'price': 5.0, 'quantity': 1})
+
+    def with_carts(count):
+        # One filled cart per request: checkout empties it. Warmups use negative i, i.e. the last entries.
+        def setup(ctx):
+            ctx['carts'] = []
+            for uid, user_id in seed_users(backend, count, prefix='CART'):
+                cart = backend.client.collection('users').document(uid).collection('cart_items')
+                for item in range(3):
+                    cart.document(f'ITEM{item}').set({'name': 'shirt', 'price': 5.0, 'quantity': 2})
+                ctx['carts'].append((user_id, token_headers(backend, uid)))
+        return setup
+
+    def with_dispatch_backlog(ctx):
+        # Customer hampers across 20 ZIPs, unowned inventory hampers and one van driver per ZIP
+        db = backend.client
+        batch = db.batch()
+        for i, (uid, user_id) in enumerate(seed_users(backend, 200, prefix='DISPATCH')):
+            zip_code = f'787{i % 20:02d}'
+            batch.update(db.collection('users').document(uid), {'address_details': {'zip_code': zip_code}})
+            batch.set(db.collection('hampers').document(f'DISPATCHHAMPER{i}'), {'customer_id': user_id, 'status': 'pending'})
+            batch.set(db.collection('hampers').document(f'INVENTORYHAMPER{i}'), {'status': 'pending'})
+            if i < 20:
+                batch.set(db.collection('drivers').document(f'dispatch-driver-{i}'), {
+                    'driver_id': f'DISPATCHDRIVER{i}', 'vehicle_type': 'van', 'zip_code': zip_code})
+        batch.commit()
+
+    def with_order_history(ctx):
+        with_seeded_user(ctx)
+        orders = backend.client.collection('orders')
+        for i in range(500):
+            orders.document(f"HIST-{ctx['user_id']}-{i}").set({
+                'customer_id': ctx['user_id'], 'status': 'completed', 'total': 10.0, 'created_at': datetime(2024, 1, 1) + timedelta(minutes=i)})
+
+    def with_driver_history(ctx):
+        with_account('/api/driver_register', 'bench-history-driver@example.com', driver_extra, admin_headers)(ctx)
+        driver_id = ctx['registration']['driver_id']
+        deliveries = backend.client.collection('deliveries')
+        for i in range(500):
+            deliveries.document(f'HIST-{driver_id}-{i}').set({
+                'driver_id': driver_id, 'status': 'delivered', 'zip_code': '78701', 'created_at': datetime(2024, 1, 1) + timedelta(minutes=i)})
+
+    def with_active_deliveries(email):
+        # 25 active deliveries across 25 ZIPs for a new driver based in 78701
+        def setup(ctx):
+            ensure_zip_centroids()
+            with_account('/api/driver_register', email, driver_extra, admin_headers)(ctx)
+            driver_id = ctx['registration']['driver_id']
+            backend.client.collection('drivers').document(ctx['registration']['uid']).update({'zip_code': '78701'})
+            deliveries = backend.client.collection('deliveries')
+            for i in range(25):
+                deliveries.document(f'ROUTE-{driver_id}-{i}').set({
+                    'driver_id': driver_id, 'status': 'assigned', 'zip_code': f'787{(i * 37) % 100:02d}'})
+        return setup
+
+    def with_short_streams(setup):
+        # Streams then end right after their opening snapshot, which is what the scenario times
+        def wrapped(ctx):
+            from config import Config
+            Config.STREAM_MAX_SECONDS = 0
+            setup(ctx)
+        return wrapped
+
+    def with_scale_users(ctx):
+        if not backend.client.collection('users').document('scale-uid-0').get().exists:
+            seed_users(backend, SCALE_USERS, prefix='SCALE')
+        ctx['user_id'] = f'SCALEUSER{SCALE_USERS - 1:06d}'
+
+    driver_extra = {'vehicle_type': 'van', 'license_plate': 'BENCH1'}
+    ndjson_headers = dict(admin_headers, **{'Content-Type': 'application/x-ndjson'})
+
+    def import_rows(i, ctx):
+        # 50 new customers per request
+        return ''.join(json.dumps({'email': f'import{i}-{row}@example.com', 'password': 'secret123',
+                                   'full_name': 'Imported User', 'phone_number': '5125550100'}) + '\n'
+                       for row in range(50))
+
+    scenarios = [
+        Scenario('main.home', lambda i, ctx: ('GET', '/', None, None)),
+        Scenario('main.apispec', lambda i, ctx: ('GET', '/apispec_1.json', None, None)),
+        Scenario('main.apispec_not_modified', lambda i, ctx: ('GET', '/apispec_1.json', None, {'If-None-Match': ctx['etag']}),
+                 setup=lambda ctx: ctx.update(etag=client.get('/apispec_1.json').headers['ETag'])),
+        Scenario('admin.admin_register', register('/api/admin_register', 'admin', headers=admin_headers)),
+        Scenario('admin.admin_login', post_json('/api/admin_login', {'email': 'bench-admin@example.com'}),
+                 setup=with_account('/api/admin_register', 'bench-admin@example.com', headers=admin_headers)),
+        Scenario('user.user_register', register('/api/user_register', 'user')),
+        Scenario('user.user_login', post_json('/api/user_login', {'email': 'bench-user@example.com', 'password': 'secret123'}),
+                 setup=with_account('/api/user_register', 'bench-user@example.com')),
+        Scenario('user.user_login_id_token', lambda i, ctx: ('POST', '/api/user_login', None, user_headers)),
+        Scenario('user.get_all_users', lambda i, ctx: ('GET', '/api/get_all_users?page_size=100', None, admin_headers)),
+        Scenario('user.get_user', lambda i, ctx: ('GET', f"/api/get_user/{ctx['user_id']}", None, ctx['headers']),
+                 setup=with_seeded_user),
+        Scenario('user.get_users_100', lambda i, ctx: ('POST', '/api/get_users', {'user_ids': ctx['user_ids']}, admin_headers),
+                 setup=with_batch_users),
+        Scenario('driver.get_drivers_100', lambda i, ctx: ('POST', '/api/get_drivers', {'driver_ids': ctx['driver_ids']}, admin_headers),
+                 setup=with_batch_drivers),
+        Scenario('garment.get_garments_100', lambda i, ctx: ('POST', '/api/get_garments', {'garment_ids': ctx['garment_ids']},
+                                                             admin_headers), setup=with_batch_garments),
+        Scenario('user.update_user_info', lambda i, ctx: ('PUT', '/api/update_user_info', {
+            'user_id': ctx['user_id'], 'full_name': 'Updated', 'phone_number': '5125550101',
+            'address': '1 Main St', 'city': 'Austin', 'state': 'TX', 'zip_code': '78701'}, ctx['headers']), setup=with_seeded_user),
+        Scenario('user.add_credit_card', lambda i, ctx: ('POST', '/api/add_credit_card', {
+            'user_id': ctx['user_id'], 'cardholder_name': 'Bench User', 'card_number': '4111111111111111',
+            'expiration_date': '12/30', 'billing_address': '1 Main St'}, ctx['headers']), setup=with_seeded_user),
+        Scenario('driver.driver_register', register('/api/driver_register', 'driver', driver_extra, admin_headers)),
+        Scenario('driver.driver_login', post_json('/api/driver_login', {'email': 'bench-driver@example.com', 'password': 'secret123'}),
+                 setup=with_account('/api/driver_register', 'bench-driver@example.com', driver_extra, admin_headers)),
+        Scenario('driver.get_driver_profile',
+                 lambda i, ctx: ('GET', f"/api/driver/{ctx['registration']['uid']}", None, ctx['headers']),
+                 setup=with_account('/api/driver_register', 'bench-profile-driver@example.com', driver_extra, admin_headers)),
+        Scenario('driver.list_deliveries',
+                 lambda i, ctx: ('GET', f"/api/driver/{ctx['registration']['driver_id']}/deliveries?page_size=50", None, ctx['headers']),
+                 setup=with_driver_history),
+        Scenario('driver.get_driver_route',
+                 lambda i, ctx: ('GET', f"/api/driver/{ctx['registration']['driver_id']}/route", None, ctx['headers']),
+                 setup=with_active_deliveries('bench-route-driver@example.com')),
+        Scenario('driver.stream_deliveries',
+                 lambda i, ctx: ('GET', f"/api/driver/{ctx['registration']['driver_id']}/stream", None, ctx['headers']),
+                 setup=with_short_streams(with_active_deliveries('bench-stream-driver@example.com'))),
+        Scenario('garment.create_dry_cleaning_garment',
+                 post_json('/api/create_dry_cleaning_garment', {'name': 'shirt'}, admin_headers)),
+        Scenario('order.order_garment', lambda i, ctx: ('POST', '/api/order_garment', {
+            'user_id': ctx['user_id'], 'garment_id': ctx['garment_id'], 'quantity': 2}, ctx['headers']),
+            setup=lambda ctx: (with_seeded_user(ctx), ctx.update(garment_id=seed_garment(backend)))),
+        Scenario('order.get_cart', lambda i, ctx: ('GET', f"/api/cart/{ctx['user_id']}", None, ctx['headers']), setup=with_cart),
+        Scenario('order.remove_garment_order', lambda i, ctx: ('DELETE', '/api/remove_garment_order', {
+            'user_id': ctx['user_id'], 'garment_id': f'ITEM{i}'}, ctx['headers']), setup=with_cart),
+        Scenario('order.remove_hamper_order', lambda i, ctx: ('DELETE', '/api/remove_hamper_order', {
+            'user_id': ctx['user_id'], 'hamper_id': f'ITEM{i}'}, ctx['headers']), setup=with_cart),
+        Scenario('order.checkout', lambda i, ctx: ('POST', '/api/checkout', {'user_id': ctx['carts'][i][0]}, ctx['carts'][i][1]),
+                 setup=with_carts(105), iterations=100),
+        Scenario('order.list_orders', lambda i, ctx: ('GET', f"/api/orders/{ctx['user_id']}?page_size=50", None, ctx['headers']),
+                 setup=with_order_history),
+        Scenario('order.list_cart_items', lambda i, ctx: ('GET', f"/api/cart/{ctx['user_id']}/items?page_size=50", None, ctx['headers']),
+                 setup=with_cart),
+        Scenario('async.order_garment', lambda i, ctx: ('POST', '/api/async/order_garment', {
+            'user_id': ctx['user_id'], 'garment_id': ctx['garment_id'], 'quantity': 2}, ctx['headers']),
+            setup=lambda ctx: (with_seeded_user(ctx), ctx.update(garment_id=seed_garment(backend)))),
+        Scenario('async.user_register', register('/api/async/user_register', 'async-user')),
+        Scenario('async.driver_register', register('/api/async/driver_register', 'async-driver', driver_extra, admin_headers)),
+        Scenario('order.stream_orders', lambda i, ctx: ('GET', f"/api/orders/{ctx['user_id']}/stream", None, ctx['headers']),
+                 setup=with_short_streams(with_seeded_user)),
+        Scenario('order.quote', post_json('/api/quote', {
+            'items': [{'name': 'shirt', 'quantity': 2}, {'name': 'suit', 'quantity': 1}], 'hamper_weights': [14]})),
+        Scenario('admin.dispatch_dry_run', post_json('/api/dispatch', {'dry_run': True}, admin_headers),
+                 setup=with_dispatch_backlog, iterations=20, warmup=1),
+        Scenario('admin.import_accounts_50', lambda i, ctx: ('POST', '/api/import_accounts?role=user', import_rows(i, ctx),
+                                                             ndjson_headers), iterations=20, warmup=1),
+        Scenario('hamper.create_hamper', post_json('/api/create_hamper', {'quantity': 1}, admin_headers)),
+        Scenario('hamper.order_hamper', post_json('/api/order_hamper', {'customer_id': 'USER0001', 'quantity': 1}, admin_headers)),
+        Scenario('hamper.update_hamper_price', lambda i, ctx: ('PUT', '/api/update_hamper_price', {
+            'hamper_id': ctx['hamper_id'], 'weight': 14}, admin_headers),
+            setup=lambda ctx: ctx.update(hamper_id=seed_garment(backend, 'HAMPERBENCH'))),
+        # Last, so the page carries a row set for every route exercised above
+        Scenario('main.metrics', lambda i, ctx: ('GET', '/metrics', None, None)),
+    ]
+
+    if include_scale:
+        scenarios += [
+            Scenario('scale.get_all_users_page_10k', lambda i, ctx: ('GET', '/api/get_all_users?page_size=100', None, admin_headers),
+                     setup=with_scale_users, iterations=50),
+            Scenario('scale.get_all_users_ndjson_10k', lambda i, ctx: ('GET', '/api/get_all_users?format=ndjson', None, admin_headers),
+                     setup=with_scale_users, iterations=5, warmup=1),
+            Scenario('scale.get_user_10k', lambda i, ctx: ('GET', f"/api/get_user/{ctx['user_id']}", None, admin_headers),
+                     setup=with_scale_users),
+            Scenario('scale.order_hamper_qty500', post_json('/api/order_hamper', {'customer_id': 'USER0001', 'quantity': 500}, admin_headers),
+                     iterations=10, warmup=1),
+            Scenario('scale.quote_5000_lines', post_json('/api/quote', {
+                'items': [{'name': name, 'quantity': 1 + i % 3} for i, name in enumerate(['shirt', 'pants', 'jacket', 'dress'] * 1000)],
+                'hamper_weights': [8 + i % 12 for i in range(1000)]}), iterations=20, warmup=1),
+            Scenario('scale.create_hamper_qty500', post_json('/api/create_hamper', {'quantity': 500}, admin_headers),
+                     iterations=10, warmup=1),
+        ]
+
+    return scenarios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200, help='requests per scenario (default 200)')
+    parser.add_argument('--only', default='', help='run scenarios whose name contains this substring')
+    parser.add_argument('--no-scale', action='store_true', help='skip the 10k-user and quantity=500 scenarios')
+    parser.add_argument('--output', default='bench_results.json', help='where to write machine-readable results')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    args = parser.parse_args(argv)
+
+    backend = set_backend(MemoryBackend())
+    from app import app
+
+    client = app.test_client()
+    scenarios = [s for s in build_scenarios(backend, client, not args.no_scale) if args.only in s.name]
+    results = [run_scenario(client, backend, scenario, args.iterations) for scenario in scenarios]
+
+    print_table(results)
+    if not args.only:
+        uncovered = uncovered_endpoints(app, results, UNBENCHMARKED_ENDPOINTS)
+        if uncovered:
+            print(f"\nRoutes without a scenario: {', '.join(uncovered)}")
+    write_results(args.output, results, {'iterations': args.iterations, 'only': args.only, 'scale': not args.no_scale})
+    print(f'\nResults written to {args.output}')
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Synthetic benchmark for route sequencing.
+
+Scatters stops over a metro-sized area and times utils.routing.sequence()
+(nearest neighbour + 2-opt) on their distance matrix, comparing the route length
+with the nearest-neighbour tour alone and with the order the stops arrived in.
+No centroid table is needed: coordinates are generated directly.
+
+    python -m benchmarks.routing --stops 40 --runs 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stops', type=int, default=40, help='stops per route (default 40)')
+    parser.add_argument('--runs', type=int, default=50, help='routes to sequence (default 50)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    from utils.routing import _nearest_neighbour, path_length, sequence
+    from utils.zip_centroids import haversine_matrix
+
+    timings, lengths, nn_lengths, arrival_lengths = [], [], [], []
+    for _ in range(args.runs):
+        # ~50 km square around a city centre; node 0 is the driver's start
+        lat = np.array([30.27 + rng.uniform(-0.25, 0.25) for _ in range(args.stops + 1)])
+        lon = np.array([-97.74 + rng.uniform(-0.3, 0.3) for _ in range(args.stops + 1)])
+        distances = haversine_matrix(lat, lon)
+
+        started = time.perf_counter()
+        order = sequence(distances, start=0)
+        timings.append((time.perf_counter() - started) * 1000.0)
+
+        lengths.append(path_length(distances, order))
+        nn_lengths.append(path_length(distances, _nearest_neighbour(distances, 0)))
+        arrival_lengths.append(path_length(distances, np.arange(args.stops + 1)))
+
+    print(f'{args.runs} routes of {args.stops} stops')
+    print(f'  sequence()          median {statistics.median(timings):6.2f} ms   max {max(timings):6.2f} ms')
+    print(f'  route length        2-opt {statistics.mean(lengths):7.1f} km   nearest neighbour '
+          f'{statistics.mean(nn_lengths):7.1f} km   arrival order {statistics.mean(arrival_lengths):7.1f} km')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures cold-start cost: the time to `import app` in a fresh interpreter, and which
+modules dominate it (from `python -X importtime`).
+
+    python -m benchmarks.startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TIMER = 'import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)'
+
+
+def time_import(runs):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', _TIMER], cwd=ROOT)
+        timings.append(float(output.decode().strip().splitlines()[-1]) * 1000.0)
+    return timings
+
+
+def slowest_imports(limit):
+    """Returns (cumulative_ms, module) for the slowest top-level imports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative) / 1000.0, module.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list')
+    args = parser.parse_args(argv)
+
+    timings = time_import(args.runs)
+    print(f'import app: median {statistics.median(timings):.1f} ms, '
+          f'min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs')
+
+    print('\nslowest imports (cumulative ms):')
+    for cumulative_ms, module in slowest_imports(args.top):
+        print(f'{cumulative_ms:>10.1f}  {module}')
+
+
+if __name__ == '__main__':
+    main()
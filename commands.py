@@ -0,0 +1,61 @@
+import click
+
+
+def register_commands(app):
+    """Registers maintenance commands on the Flask CLI (`flask <command>`)."""
+
+    @app.cli.command('backfill-user-index')
+    def backfill_user_index_command():
+        """Builds the user_ids/<user_id> -> uid lookup index for existing users."""
+        from utils.user_index import backfill_user_index
+
+        count = backfill_user_index()
+        click.echo(f'Indexed {count} user(s).')
+
+    @app.cli.command('create-admin')
+    @click.argument('email')
+    @click.option('--password', prompt=True, hide_input=True, confirmation_prompt=True)
+    @click.option('--full-name', prompt=True)
+    @click.option('--phone-number', prompt=True)
+    def create_admin_command(email, password, full_name, phone_number):
+        """Creates an admin account; /admin_register itself requires an admin, so the first one starts here."""
+        from models.user import AdminUser
+
+        uid, admin_id = AdminUser.register(email, password, full_name, phone_number)
+        click.echo(f'Created admin {admin_id} (uid {uid}).')
+
+    @app.cli.command('export-apispec')
+    @click.argument('path', default='static/apispec_1.json')
+    def export_apispec_command(path):
+        """Writes the OpenAPI spec to PATH; point APISPEC_PATH at it to skip generation at runtime."""
+        from main.spec_cache import export_apispec
+
+        size = export_apispec(app, path)
+        click.echo(f'Wrote {size} bytes to {path}.')
+
+
+    @app.cli.command('dispatch')
+    @click.option('--max-stops', default=5000, show_default=True, help='Pending stops to consider.')
+    @click.option('--dry-run', is_flag=True, help='Plan without writing deliveries.')
+    def dispatch_command(max_stops, dry_run):
+        """Assigns pending orders and hampers to available drivers (run on a schedule)."""
+        from utils.dispatch import dispatch
+
+        summary = dispatch(max_stops=max_stops, dry_run=dry_run)
+        click.echo(f"Dispatch {summary['dispatch_id']}: {summary['assigned']} assigned, "
+                   f"{summary['unassigned']} without capacity, {summary['missing_zip']} without a ZIP code, "
+                   f"{len(summary['failed_chunks'])} failed chunk(s).")
+
+    @app.cli.command('build-zip-centroids')
+    @click.argument('gazetteer_path', required=False)
+    @click.option('--url', default=None, help='Zipped Gazetteer file to download when no path is given.')
+    @click.option('--output', default=None, help='Output file (default Config.ZIP_CENTROIDS_PATH).')
+    def build_zip_centroids_command(gazetteer_path, url, output):
+        """Builds the centroid table used for route sequencing from a Census Gazetteer ZCTA file (run at deploy)."""
+        from utils.zip_centroids import GAZETTEER_URL, build_centroids, download_gazetteer
+
+        if not gazetteer_path:
+            click.echo(f'Downloading {url or GAZETTEER_URL} ...')
+            gazetteer_path = download_gazetteer(url or GAZETTEER_URL)
+        count = build_centroids(gazetteer_path, output)
+        click.echo(f'Wrote {count} ZIP centroid(s).')
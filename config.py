@@ -3,6 +3,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Project root; relative data paths below are resolved against it, not the working directory
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -21,4 +24,55 @@ class Config:
 
     # Google OAuth 2.0 Credentials for Sign-in
     GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-    GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
\ No newline at end of file
+    GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
+
+    # Storage backend: 'firestore' (default) or 'memory' for offline runs and benchmarks
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore")
+
+    # Number of IDs each worker leases from a counter per Firestore transaction
+    ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "50"))
+
+    # Optional prebuilt OpenAPI spec (see `flask export-apispec`)
+    APISPEC_PATH = os.getenv("APISPEC_PATH")
+
+    # Record per-route latency and storage operation counts, served on /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # Development/staging only: trace every Firestore call per request and flag chatty handlers
+    FIRESTORE_TRACE_ENABLED = os.getenv("FIRESTORE_TRACE_ENABLED", "false").lower() == "true"
+    FIRESTORE_OP_BUDGET = int(os.getenv("FIRESTORE_OP_BUDGET", "5"))
+
+    # Seconds a verified account's role/profile claims are cached per worker
+    AUTH_CLAIMS_TTL = int(os.getenv("AUTH_CLAIMS_TTL", "300"))
+
+    # Buffer each request's Firestore writes and commit them as one batch after the view returns
+    UNIT_OF_WORK_ENABLED = os.getenv("UNIT_OF_WORK_ENABLED", "true").lower() == "true"
+
+    # Seconds a compiled pricing table is reused before 'pricing_rules/current' is re-read
+    PRICING_RULES_TTL = int(os.getenv("PRICING_RULES_TTL", "300"))
+
+    # Census ZCTA centroid table used for route sequencing, built at deploy time by `flask build-zip-centroids`
+    ZIP_CENTROIDS_PATH = os.path.join(BASE_DIR, os.getenv("ZIP_CENTROIDS_PATH", "data/zip_centroids.npy"))
+
+    # Per-worker garment catalog cache, kept fresh by a Firestore listener (entries, max seconds)
+    GARMENT_CACHE_SIZE = int(os.getenv("GARMENT_CACHE_SIZE", "10000"))
+    GARMENT_CACHE_TTL = int(os.getenv("GARMENT_CACHE_TTL", "3600"))
+
+    # Shared L2 cache for profiles and lookups; unset keeps each worker's L1 only
+    REDIS_URL = os.getenv("REDIS_URL")
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+    # Per-worker L1 entries and lifetimes (seconds) of the two cache tiers
+    CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", "10000"))
+    CACHE_L1_TTL = int(os.getenv("CACHE_L1_TTL", "60"))
+    CACHE_L2_TTL = int(os.getenv("CACHE_L2_TTL", "300"))
+    # L1 lifetime (seconds) without REDIS_URL, when other workers' invalidations never arrive
+    CACHE_LOCAL_TTL = int(os.getenv("CACHE_LOCAL_TTL", "5"))
+
+    # Server-Sent Events status streams per worker: connected clients, documents queued per
+    # client before it is sent a fresh snapshot, and heartbeat / maximum connection seconds
+    STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "500"))
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+    STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "600"))
+    # Reconnect delay advertised to EventSource clients, in milliseconds
+    STREAM_RETRY_MS = int(os.getenv("STREAM_RETRY_MS", "3000"))
\ No newline at end of file
@@ -1,11 +1,87 @@
-import firebase_admin
-from firebase_admin import credentials, initialize_app, firestore
+"""
+Single place where Firebase / Google clients are created.
+
+Nothing here runs at import time: each client is built on first use and cached per
+process. gRPC channels do not survive fork(), so the cache is dropped in forked
+children (e.g. gunicorn workers started with --preload) and rebuilt there on demand.
+"""
+import os
+import threading
 from config import Config
 
-# Initialize Firebase only once
-if not firebase_admin._apps:
+_clients = {}
+_pid = os.getpid()
+_lock = threading.RLock()
+
+
+def _reset_clients():
+    global _pid, _lock
+    _clients.clear()
+    _pid = os.getpid()
+    _lock = threading.RLock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_clients)
+
+
+def _get_or_create(name, factory):
+    if _pid != os.getpid():
+        _reset_clients()
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+def _create_firebase_app():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
     cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS)
-    initialize_app(cred)
+    return firebase_admin.initialize_app(cred)
+
+
+def _create_firestore_client():
+    # Built directly instead of firebase_admin.firestore.client(), which caches the
+    # client on the app object and would hand a forked child its parent's channel.
+    from google.cloud import firestore
+
+    app = init_firebase()
+    return firestore.Client(project=app.project_id, credentials=app.credential.get_credential())
+
+
+def _create_async_firestore_client():
+    from google.cloud import firestore
+
+    app = init_firebase()
+    return firestore.AsyncClient(project=app.project_id, credentials=app.credential.get_credential())
+
+
+def _create_pyrebase_auth():
+    import pyrebase
+    return pyrebase.initialize_app(Config.FIREBASE_CONFIG).auth()
+
+
+def init_firebase():
+    """Returns the default Firebase Admin app, initializing it on first use."""
+    return _get_or_create('firebase_app', _create_firebase_app)
+
+
+def get_firestore_client():
+    return _get_or_create('firestore', _create_firestore_client)
+
+
+def get_async_firestore_client():
+    """AsyncClient for the worker's shared event loop (see utils/async_runner.py)."""
+    return _get_or_create('async_firestore', _create_async_firestore_client)
+
 
-# Initialize Firestore
-db = firestore.client()
\ No newline at end of file
+def get_pyrebase_auth():
+    """Pyrebase is only needed for the Google sign-in flow, so it is imported on demand."""
+    return _get_or_create('pyrebase_auth', _create_pyrebase_auth)
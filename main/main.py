@@ -1,20 +1,6 @@
-import pyrebase
 from flask import redirect, url_for, session
-from config import Config
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# Initialize Firebase Admin SDK (for Firestore)
-if not firebase_admin._apps:
-    cred = credentials.Certificate(Config.FIREBASE_CREDENTIALS)
-    firebase_admin.initialize_app(cred)
-
-# Initialize Firestore (Admin SDK)
-db = firestore.client()
-
-# Initialize Pyrebase (for Authentication)
-firebase = pyrebase.initialize_app(Config.FIREBASE_CONFIG)
-auth = firebase.auth()
+from firebase import get_pyrebase_auth
+from storage import db
 
 def create_user_in_firestore(user_id, user_data):
     """Creates a new user document in AUthentication Firestore."""
@@ -23,7 +9,7 @@ def create_user_in_firestore(user_id, user_data):
 
 def google_callback():
     """Handles callback after Google authentication."""
-    user = auth.current_user
+    user = get_pyrebase_auth().current_user
     if user:
         user_data = {
             "email": user['email'],
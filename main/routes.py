@@ -1,10 +1,10 @@
 from flask import render_template, current_app, Blueprint, redirect, url_for
 from . import main_bp
 from .main import google_callback
+from .spec_cache import cached_response, get_cached
 from API import user_bp
 
-@main_bp.route('/')
-def home():
+def render_route_index():
     routes = []
     for rule in current_app.url_map.iter_rules():
         # Skip static routes
@@ -12,7 +12,13 @@ def home():
             routes.append({
                 'endpoint': rule.endpoint,
                 'rule': rule.rule,
-                'methods': ', '.join(rule.methods)
+                'methods': ', '.join(sorted(rule.methods))
             })
-    return render_template('index.html', routes=routes)
+    return render_template('index.html', routes=routes).encode('utf-8')
+
+@main_bp.route('/')
+def home():
+    # The URL map is fixed once the app has started, so render the index only once
+    body, etag = get_cached('route_index', render_route_index)
+    return cached_response(body, etag, 'text/html')
 
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+from flask import request, Response
+from config import Config
+
+_documents = {}   # cache key -> (body bytes, etag)
+_lock = threading.Lock()
+
+
+def _etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def get_cached(key, build):
+    """Returns (body, etag) for `key`, calling build() -> bytes only the first time."""
+    cached = _documents.get(key)
+    if cached is None:
+        with _lock:
+            cached = _documents.get(key)
+            if cached is None:
+                body = build()
+                cached = _documents[key] = (body, _etag(body))
+    return cached
+
+
+def clear_cache():
+    with _lock:
+        _documents.clear()
+
+
+def cached_response(body, etag, mimetype):
+    """Serves a cached body with a strong ETag, answering If-None-Match with 304."""
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True  # always revalidate; a 304 costs almost nothing
+    return response.make_conditional(request)
+
+
+def build_apispec(swagger, endpoint):
+    """Renders the flasgger spec for `endpoint` as compact JSON bytes (needs a request context)."""
+    return json.dumps(swagger.get_apispecs(endpoint), sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def install_spec_cache(app, swagger):
+    """
+    Replaces flasgger's spec views with ones served from memory. The spec is generated
+    on first request, or loaded from Config.APISPEC_PATH when a prebuilt file exists.
+    """
+    app.extensions.setdefault('flasgger', swagger)
+    for spec in swagger.config['specs']:
+        endpoint = spec['endpoint']
+        view_name = f'flasgger.{endpoint}'
+        if view_name not in app.view_functions:
+            continue
+
+        def view(endpoint=endpoint):
+            def build():
+                if Config.APISPEC_PATH and endpoint == 'apispec_1' and os.path.exists(Config.APISPEC_PATH):
+                    with open(Config.APISPEC_PATH, 'rb') as f:
+                        return f.read()
+                return build_apispec(swagger, endpoint)
+
+            body, etag = get_cached(f'apispec:{endpoint}', build)
+            return cached_response(body, etag, 'application/json')
+
+        app.view_functions[view_name] = view
+
+
+def export_apispec(app, path, endpoint='apispec_1'):
+    """Writes the spec to `path` (used at build time so workers can skip generating it)."""
+    swagger = app.extensions['flasgger']
+    with app.test_request_context():
+        body = build_apispec(swagger, endpoint)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(body)
+    return len(body)
@@ -1,13 +1,12 @@
-from app import db
 import uuid
-from google.cloud import firestore
-from utils.garment_prices import GARMENT_PRICE_MAP
+from storage import db
+from utils.pricing import get_pricing_engine
 
 class Garment:
-    def __init__(self, name, quantity=1):
-        self.garment_id = str(uuid.uuid4())
+    def __init__(self, name, quantity=1, garment_id=None):
+        self.garment_id = garment_id or str(uuid.uuid4())
         self.name = name.lower()
-        self.price = GARMENT_PRICE_MAP.get(self.name, 0.0)
+        self.price = get_pricing_engine().price(self.name)
         self.quantity = quantity
         self.status = 'available'
 
@@ -23,14 +22,3 @@ class Garment:
             'status': self.status,
             'total_price': self.price * self.quantity
         }
-
-class Hamper(Garment):
-    def __init__(self, customer_id, quantity=1):
-        super().__init__(customer_id, 'hamper', quantity)
-        self.price = 10.0
-        self.max_weight = 20
-
-    def to_dict(self):
-        data = super().to_dict()
-        data['max_weight'] = self.max_weight
-        return data
\ No newline at end of file
@@ -1,19 +1,55 @@
-from app import db
-import uuid
+from storage import db
 from google.cloud import firestore
 from models.garment import Garment
+from utils.bulk_writes import commit_in_chunks
+from utils.id_generator import generate_garment_ids
+from utils.pricing import get_pricing_engine
 
 class Hamper(Garment):
-    def __init__(self, customer_id, quantity=1):
-        super().__init__(customer_id, 'hamper', 10.0, quantity)  # Correct super() call
-        self.max_weight = 20
+    def __init__(self, customer_id=None, quantity=1, garment_id=None):
+        super().__init__('hamper', quantity, garment_id=garment_id)
+        self.customer_id = customer_id
+        self.max_weight = get_pricing_engine().hamper_max_weight
         self.status = 'pending'
         self.timestamp = firestore.SERVER_TIMESTAMP
 
     def save_hamper_to_db(self):
-        db.collection('hampers').document(self.garment_id).set(self.to_dict())
+        db.collection('hampers').document(self.garment_id).set(self.to_db_dict())
 
     def to_dict(self):
         data = super().to_dict()
         data['max_weight'] = self.max_weight
-        return data
\ No newline at end of file
+        if self.customer_id:
+            data['customer_id'] = self.customer_id
+        return data
+
+    def to_db_dict(self):
+        data = self.to_dict()
+        data['timestamp'] = self.timestamp
+        return data
+
+    @classmethod
+    def create_bulk(cls, quantity, customer_id=None):
+        """
+        Creates `quantity` hampers with one ID lease and one commit per 500 documents.
+        Returns (created_hampers, failed_chunks).
+        """
+        hamper_ids = generate_garment_ids(quantity)
+        hampers = [cls(customer_id=customer_id, garment_id=hamper_id) for hamper_id in hamper_ids]
+
+        writes = [(db.collection('hampers').document(h.garment_id), h.to_db_dict()) for h in hampers]
+        results = commit_in_chunks(writes)
+
+        created, failed_chunks = [], []
+        for result in results:
+            chunk = hampers[result['start']:result['start'] + result['count']]
+            if result['committed']:
+                created.extend(h.to_dict() for h in chunk)
+            else:
+                failed_chunks.append({
+                    'chunk': result['chunk'],
+                    'hamper_ids': [h.garment_id for h in chunk],
+                    'error': result['error']
+                })
+
+        return created, failed_chunks
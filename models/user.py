@@ -1,6 +1,11 @@
 from datetime import datetime
 import re
-from firebase import db
+from storage import auth, db
+from utils.authentication import set_role_claim
+from utils.id_generator import generate_admin_id
+from utils.pagination import DEFAULT_PAGE_SIZE, DESCENDING, paginate
+from utils.profiles import fetch_user_profile, invalidate_user_profile
+from utils.routing import driver_route
 
 class User:
     def __init__(self, user_id, email):
@@ -8,13 +13,11 @@ class User:
         self.email = email
 
     def get_profile(self):
-        doc = db.collection('users').document(self.user_id).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        return fetch_user_profile(self.user_id)
 
     def update_profile(self, data):
         db.collection('users').document(self.user_id).update(data)
+        invalidate_user_profile(self.user_id)
         return "Profile updated successfully."
 
 class CustomerUser(User):
@@ -22,9 +25,11 @@ class CustomerUser(User):
         super().__init__(user_id, email)
         self.role = 'customer'
 
-    def view_orders(self):
-        orders = db.collection('orders').where('customer_id', '==', self.user_id).stream()
-        return [order.to_dict() for order in orders]
+    def view_orders(self, page_size=DEFAULT_PAGE_SIZE, page_token=None):
+        """Returns (orders, next_page_token), newest first."""
+        query = db.collection('orders').where('customer_id', '==', self.user_id)
+        orders, next_page_token = paginate(query, 'created_at', page_size, page_token, direction=DESCENDING)
+        return [order.to_dict() for order in orders], next_page_token
 
     def create_order(self, order_details):
         order_data = {
@@ -54,6 +59,7 @@ class CustomerUser(User):
             'zip_code': zip_code
         }
         db.collection('users').document(self.user_id).update({'address_details': address_data})
+        invalidate_user_profile(self.user_id)
         return "Address updated successfully."
     
 class AdminUser(User):
@@ -61,12 +67,29 @@ class AdminUser(User):
         super().__init__(user_id, email)
         self.role = 'admin'
 
+    @staticmethod
+    def register(email, password, full_name, phone_number):
+        """Creates an admin's Auth account and profile with the admin role claim. Returns (uid, admin_id)."""
+        user_record = auth.create_user(email=email, password=password)
+        admin_id = generate_admin_id()  # Generate sequential AdminID
+        admin_data = {
+            'admin_id': admin_id,
+            'email': email,
+            'full_name': full_name,
+            'phone_number': phone_number,
+            'role': 'admin'
+        }
+        db.collection('admins').document(user_record.uid).set(admin_data)
+        set_role_claim(user_record.uid, 'admin', admin_id)
+        return user_record.uid, admin_id
+
     def view_all_users(self):
         users = db.collection('users').stream()
         return [user.to_dict() for user in users]
 
     def delete_user(self, target_user_id):
         db.collection('users').document(target_user_id).delete()
+        invalidate_user_profile(target_user_id)
         return f"User {target_user_id} has been deleted."
 
 class DriverUser(User):
@@ -74,16 +97,23 @@ class DriverUser(User):
         super().__init__(user_id, email)
         self.role = 'driver'
 
-    def view_assigned_deliveries(self):
-        deliveries = db.collection('deliveries').where('driver_id', '==', self.user_id).stream()
-        return [delivery.to_dict() for delivery in deliveries]
+    def view_assigned_deliveries(self, page_size=DEFAULT_PAGE_SIZE, page_token=None):
+        """Returns (deliveries, next_page_token), newest first."""
+        query = db.collection('deliveries').where('driver_id', '==', self.user_id)
+        deliveries, next_page_token = paginate(query, 'created_at', page_size, page_token, direction=DESCENDING)
+        return [delivery.to_dict() for delivery in deliveries], next_page_token
+
+    def view_route(self):
+        """Returns the active deliveries in driving order (see utils.routing), or None for an unknown driver."""
+        return driver_route(self.user_id)
 
     def update_delivery_status(self, delivery_id, status):
         db.collection('deliveries').document(delivery_id).update({'status': status})
         return f"Delivery {delivery_id} status updated to {status}."
 
 class CreditCard:
-    def __init__(self, cardholder_name, card_number, expiration_date, billing_address):
+    def __init__(self, cardholder_name, card_number, expiration_date, billing_address, credit_card_id=None):
+        self.credit_card_id = credit_card_id
         self.cardholder_name = cardholder_name
         self.card_number = self.mask_card_number(card_number)
         self.expiration_date = expiration_date
@@ -96,6 +126,7 @@ class CreditCard:
 
     def to_dict(self):
         return {
+            'credit_card_id': self.credit_card_id,
             'cardholder_name': self.cardholder_name,
             'card_number': self.card_number,
             'expiration_date': self.expiration_date,
@@ -0,0 +1,100 @@
+"""
+Storage layer shared by the routes and models.
+
+`db` and `auth` are proxies for the active backend's Firestore client and Auth
+module, so call sites keep the familiar `db.collection(...)` / `auth.create_user(...)`
+API while the backend is chosen by Config.STORAGE_BACKEND ('firestore' or 'memory')
+or swapped with set_backend() in benchmarks.
+"""
+import threading
+from config import Config
+from storage import tracing, unit_of_work
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name):
+    if name == 'memory':
+        from storage.memory_backend import MemoryBackend
+        return MemoryBackend()
+    if name == 'firestore':
+        from storage.firestore_backend import FirestoreBackend
+        return FirestoreBackend()
+    raise ValueError(f'Unknown storage backend: {name}')
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(Config.STORAGE_BACKEND)
+    return _backend
+
+
+def set_backend(backend):
+    """Replaces the active backend (e.g. with MemoryBackend() for benchmarks)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+def _get_client():
+    client = get_backend().client
+    return tracing.TracedClient(client) if tracing.enabled() else client
+
+
+def get_db():
+    client = _get_client()
+    unit = unit_of_work.current()
+    return unit_of_work.BufferedClient(client, unit) if unit is not None else client
+
+
+def begin_unit_of_work():
+    """Buffers writes made through `db` in the current context until the unit is committed."""
+    return unit_of_work.UnitOfWork(_get_client).begin()
+
+
+def get_async_db():
+    """Async Firestore client; only use it from coroutines running on utils.async_runner's loop."""
+    return get_backend().async_client
+
+
+def get_auth():
+    auth_module = get_backend().auth
+    return tracing.TracedAuth(auth_module) if tracing.enabled() else auth_module
+
+
+def run_transaction(fn, *args, **kwargs):
+    """Runs fn(transaction, *args, **kwargs) in a transaction on the active backend, retrying on contention."""
+    unit = unit_of_work.current()
+    if unit is not None:
+        # Pending writes must land before the transaction reads
+        unit.flush()
+
+    if tracing.enabled() or unit is not None:
+        wrapper = tracing.TracedTransaction if tracing.enabled() else unit_of_work.UnwrappedWrites
+        wrapped_fn = fn
+
+        def fn(transaction, *args, **kwargs):
+            return wrapped_fn(wrapper(transaction), *args, **kwargs)
+
+    return get_backend().run_transaction(fn, *args, **kwargs)
+
+
+class _BackendProxy:
+    def __init__(self, attribute, getter):
+        self._attribute = attribute
+        self._getter = getter
+
+    def __getattr__(self, name):
+        return getattr(self._getter(), name)
+
+    def __repr__(self):
+        return f'<storage.{self._attribute} proxy>'
+
+
+db = _BackendProxy('client', get_db)
+auth = _BackendProxy('auth', get_auth)
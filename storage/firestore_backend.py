@@ -0,0 +1,26 @@
+from firebase import get_async_firestore_client, get_firestore_client, init_firebase
+
+
+class FirestoreBackend:
+    """Backend that talks to the real Firestore and Firebase Auth services."""
+
+    name = 'firestore'
+
+    @property
+    def client(self):
+        # Looked up on every access so each forked worker gets its own channel
+        return get_firestore_client()
+
+    @property
+    def async_client(self):
+        return get_async_firestore_client()
+
+    @property
+    def auth(self):
+        from firebase_admin import auth
+        init_firebase()
+        return auth
+
+    def run_transaction(self, fn, *args, **kwargs):
+        from google.cloud.firestore import transactional
+        return transactional(fn)(self.client.transaction(), *args, **kwargs)
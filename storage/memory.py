@@ -0,0 +1,944 @@
+"""
+In-memory stand-in for the Firestore client and Firebase Auth.
+
+Implements the subset of the google-cloud-firestore API this app uses (documents,
+subcollections, where/order_by/limit/select/cursors, batches, transactions, get_all
+and on_snapshot listeners) so routes can run and be measured without credentials or
+network.
+"""
+import copy
+import datetime
+import enum
+import queue
+import random
+import string
+import threading
+import uuid
+from collections import Counter
+
+try:
+    from google.cloud.firestore_v1 import transforms as _transforms
+except ImportError:  # pragma: no cover - google libs are optional for the stand-in
+    _transforms = None
+
+try:
+    from google.api_core.exceptions import AlreadyExists, NotFound
+except ImportError:  # pragma: no cover
+    class NotFound(LookupError):
+        pass
+
+    class AlreadyExists(ValueError):
+        pass
+
+
+_MISSING = object()
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _auto_id():
+    return ''.join(random.choice(_AUTO_ID_CHARS) for _ in range(20))
+
+
+def _is_sentinel(value, name):
+    return _transforms is not None and value is getattr(_transforms, name, None)
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _apply_value(container, key, value, now):
+    """Stores `value` at container[key], resolving Firestore transforms."""
+    if _is_sentinel(value, 'DELETE_FIELD'):
+        container.pop(key, None)
+    elif _is_sentinel(value, 'SERVER_TIMESTAMP'):
+        container[key] = now
+    elif _transforms is not None and isinstance(value, _transforms.Increment):
+        current = container.get(key)
+        container[key] = (current if isinstance(current, (int, float)) else 0) + value.value
+    elif _transforms is not None and isinstance(value, _transforms.ArrayUnion):
+        current = list(container.get(key) or [])
+        container[key] = current + [v for v in value.values if v not in current]
+    elif _transforms is not None and isinstance(value, _transforms.ArrayRemove):
+        container[key] = [v for v in (container.get(key) or []) if v not in value.values]
+    elif isinstance(value, dict):
+        nested = {}
+        for nested_key, nested_value in value.items():
+            _apply_value(nested, nested_key, nested_value, now)
+        container[key] = nested
+    else:
+        container[key] = copy.deepcopy(value)
+
+
+def _set_field(data, field_path, value, now):
+    parts = field_path.split('.')
+    for part in parts[:-1]:
+        if not isinstance(data.get(part), dict):
+            data[part] = {}
+        data = data[part]
+    _apply_value(data, parts[-1], value, now)
+
+
+def _merge(target, source, now):
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value, now)
+        else:
+            _apply_value(target, key, value, now)
+
+
+def _sort_key(value):
+    """Orders mixed types roughly the way Firestore does."""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, datetime.datetime):
+        return (3, value.timestamp())
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, MemoryDocumentReference):
+        return (6, value.path)
+    if isinstance(value, (list, tuple)):
+        return (8, tuple(_sort_key(v) for v in value))
+    if isinstance(value, dict):
+        return (9, tuple(sorted((k, _sort_key(v)) for k, v in value.items())))
+    return (10, str(value))
+
+
+def _matches(value, op, expected):
+    if op == '==':
+        return value == expected
+    if op == '!=':
+        return value != expected
+    if op == 'in':
+        return value in expected
+    if op == 'not-in':
+        return value not in expected
+    if op == 'array_contains':
+        return isinstance(value, list) and expected in value
+    if op == 'array_contains_any':
+        return isinstance(value, list) and any(v in value for v in expected)
+    if op in ('<', '<=', '>', '>='):
+        left, right = _sort_key(value), _sort_key(expected)
+        if left[0] != right[0]:
+            return False
+        return {'<': left < right, '<=': left <= right, '>': left > right, '>=': left >= right}[op]
+    raise ValueError(f'Unsupported operator: {op}')
+
+
+class _StoredDocument:
+    __slots__ = ('data', 'create_time', 'update_time')
+
+    def __init__(self, data, create_time, update_time):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+class MemoryDocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, field_paths=None):
+        self.reference = reference
+        self._data = data
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = _now()
+        if data is not None and field_paths is not None:
+            projected = {}
+            for field_path in field_paths:
+                value = _get_field(data, field_path)
+                if value is not _MISSING:
+                    _set_field(projected, field_path, value, None)
+            self._data = projected
+
+    @property
+    def id(self):
+        return self.reference.id
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path):
+        if self._data is None:
+            return None
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class MemoryDocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        return MemoryCollectionReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def collection(self, collection_id):
+        return MemoryCollectionReference(self._client, f'{self.path}/{collection_id}')
+
+    def collections(self):
+        return self._client._subcollections(self.path)
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        return self._client._get(self, field_paths, count_op=transaction is None)
+
+    def set(self, document_data, merge=False, **kwargs):
+        return self._client._commit([('set', self, document_data, merge)], op='write')[0]
+
+    def create(self, document_data, **kwargs):
+        return self._client._commit([('create', self, document_data, None)], op='write')[0]
+
+    def update(self, field_updates, **kwargs):
+        return self._client._commit([('update', self, field_updates, None)], op='write')[0]
+
+    def delete(self, **kwargs):
+        return self._client._commit([('delete', self, None, None)], op='write')[0]
+
+    def on_snapshot(self, callback):
+        return self._client._watch(MemoryWatch(self._client, callback, self.path.rsplit('/', 1)[0], document_path=self.path))
+
+    def __eq__(self, other):
+        return isinstance(other, MemoryDocumentReference) and other.path == self.path
+
+    def __deepcopy__(self, memo):
+        # References are immutable handles; never copy the client behind them
+        return self
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def __repr__(self):
+        return f'<MemoryDocumentReference {self.path}>'
+
+
+class MemoryQuery:
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None,
+                 projection=None, start=None, end=None, offset=0, all_descendants=False):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._projection = projection
+        self._start = start  # (values, inclusive)
+        self._end = end
+        self._offset = offset
+        self._all_descendants = all_descendants
+
+    def _copy(self, **changes):
+        fields = dict(
+            filters=self._filters, orders=self._orders, limit=self._limit,
+            projection=self._projection, start=self._start, end=self._end,
+            offset=self._offset, all_descendants=self._all_descendants,
+        )
+        fields.update(changes)
+        return MemoryQuery(self._client, self._collection_path, **fields)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, str(direction).upper()),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip):
+        return self._copy(offset=num_to_skip)
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copy(start=(document_fields_or_snapshot, True))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(start=(document_fields_or_snapshot, False))
+
+    def end_at(self, document_fields_or_snapshot):
+        return self._copy(end=(document_fields_or_snapshot, True))
+
+    def end_before(self, document_fields_or_snapshot):
+        return self._copy(end=(document_fields_or_snapshot, False))
+
+    def _order_fields(self):
+        orders = list(self._orders)
+        if not any(field == '__name__' for field, _ in orders):
+            orders.append(('__name__', orders[-1][1] if orders else 'ASCENDING'))
+        return orders
+
+    def _field_value(self, path, data, field):
+        if field == '__name__':
+            return path
+        return _get_field(data, field)
+
+    def _cursor_values(self, cursor, orders):
+        if isinstance(cursor, MemoryDocumentSnapshot):
+            return [self._field_value(cursor.reference.path, cursor._data or {}, field) for field, _ in orders]
+        if isinstance(cursor, dict):
+            values = []
+            for field, _ in orders:
+                if field not in cursor:
+                    break
+                value = cursor[field]
+                if field == '__name__':
+                    if isinstance(value, MemoryDocumentReference):
+                        value = value.path
+                    elif '/' not in value:
+                        value = f'{self._collection_path}/{value}'
+                values.append(value)
+            return values
+        return list(cursor)
+
+    def _compare(self, row_values, cursor_values, orders):
+        for value, cursor_value, (_, direction) in zip(row_values, cursor_values, orders):
+            left, right = _sort_key(value), _sort_key(cursor_value)
+            if left != right:
+                result = -1 if left < right else 1
+                return -result if direction == 'DESCENDING' else result
+        return 0
+
+    def _run(self):
+        orders = self._order_fields()
+        rows = []
+        for path, stored in self._client._scan(self._collection_path, self._all_descendants):
+            data = stored.data
+            if not all(
+                (value := _get_field(data, field)) is not _MISSING and _matches(value, op, expected)
+                for field, op, expected in self._filters
+            ):
+                continue
+            values = [self._field_value(path, data, field) for field, _ in orders]
+            if any(value is _MISSING for value in values):
+                continue
+            rows.append((values, path, stored))
+
+        for index in range(len(orders) - 1, -1, -1):
+            rows.sort(key=lambda row: _sort_key(row[0][index]), reverse=orders[index][1] == 'DESCENDING')
+
+        if self._start is not None:
+            cursor_values = self._cursor_values(self._start[0], orders)
+            inclusive = self._start[1]
+            rows = [row for row in rows if (c := self._compare(row[0], cursor_values, orders)) > 0 or (inclusive and c == 0)]
+        if self._end is not None:
+            cursor_values = self._cursor_values(self._end[0], orders)
+            inclusive = self._end[1]
+            rows = [row for row in rows if (c := self._compare(row[0], cursor_values, orders)) < 0 or (inclusive and c == 0)]
+
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+
+        return [
+            MemoryDocumentSnapshot(
+                MemoryDocumentReference(self._client, path), copy.deepcopy(stored.data),
+                stored.create_time, stored.update_time, self._projection,
+            )
+            for _, path, stored in rows
+        ]
+
+    def stream(self, transaction=None, **kwargs):
+        with self._client._lock:
+            snapshots = self._run()
+            self._client._record('query', documents_read=max(len(snapshots), 1), count_op=transaction is None)
+        yield from snapshots
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction))
+
+    def on_snapshot(self, callback):
+        """Listens to documents matching the filters; order, limit and cursors are not applied."""
+        return self._client._watch(MemoryWatch(self._client, callback, self._collection_path, self._filters))
+
+
+class MemoryCollectionReference(MemoryQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.path = path
+
+    @property
+    def id(self):
+        return self.path.rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        if '/' not in self.path:
+            return None
+        return MemoryDocumentReference(self._client, self.path.rsplit('/', 1)[0])
+
+    def document(self, document_id=None):
+        return MemoryDocumentReference(self._client, f'{self.path}/{document_id or _auto_id()}')
+
+    def add(self, document_data, document_id=None, **kwargs):
+        doc_ref = self.document(document_id)
+        write_result = doc_ref.create(document_data)
+        return write_result.update_time, doc_ref
+
+    def list_documents(self, page_size=None, **kwargs):
+        with self._client._lock:
+            return [MemoryDocumentReference(self._client, path) for path, _ in self._client._scan(self.path)]
+
+
+class MemoryWriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class MemoryBulkWriteFailure:
+    def __init__(self, reference, message, attempts):
+        self.reference = reference
+        self.message = message
+        self.attempts = attempts
+
+
+class MemoryBulkWriter:
+    """Applies each write on its own, like BulkWriter; failures go to the on_write_error callback."""
+
+    def __init__(self, client):
+        self._client = client
+        self._pending = []
+        self._on_error = None
+
+    def on_write_error(self, callback):
+        self._on_error = callback
+
+    def _enqueue(self, kind, reference, data=None, merge=False):
+        self._pending.append((kind, reference, data, merge))
+
+    def set(self, reference, document_data, merge=False):
+        self._enqueue('set', reference, document_data, merge)
+
+    def create(self, reference, document_data):
+        self._enqueue('create', reference, document_data)
+
+    def update(self, reference, field_updates, option=None):
+        self._enqueue('update', reference, field_updates)
+
+    def delete(self, reference, option=None):
+        self._enqueue('delete', reference)
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        for write in pending:
+            attempts = 0
+            while True:
+                attempts += 1
+                try:
+                    self._client._commit([write], op='write')
+                    break
+                except Exception as e:
+                    failure = MemoryBulkWriteFailure(write[1], str(e), attempts)
+                    if not (self._on_error and self._on_error(failure, self)):
+                        break
+
+    def close(self):
+        self.flush()
+
+
+class MemoryWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, document_data, merge))
+        return self
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, document_data, None))
+        return self
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(('update', reference, field_updates, None))
+        return self
+
+    def delete(self, reference, option=None):
+        self._writes.append(('delete', reference, None, None))
+        return self
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes, op='batch_commit')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class MemoryTransaction(MemoryWriteBatch):
+    """Buffers writes; reads go straight to the store because the client lock is held."""
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, MemoryDocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        # Like Firestore, a bare collection is refused: a CollectionReference is not a Query there
+        if isinstance(ref_or_query, MemoryCollectionReference) or not isinstance(ref_or_query, MemoryQuery):
+            raise ValueError('Value for argument "ref_or_query" must be a DocumentReference or a Query.')
+        return ref_or_query.stream(transaction=self)
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        if not writes:
+            return []
+        return self._client._commit(writes, op=None)
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    REMOVED = 2
+    MODIFIED = 3
+
+
+class MemoryDocumentChange:
+    def __init__(self, type, document):
+        self.type = type
+        self.document = document
+        self.old_index = -1
+        self.new_index = -1
+
+
+class MemoryWatch:
+    """
+    An on_snapshot listener. Like Firestore's Watch, it first delivers every matching
+    document as ADDED, then one callback per commit that touches a match, always on
+    the client's listener thread: callback(documents, changes, read_time).
+    """
+
+    def __init__(self, client, callback, collection_path, filters=(), document_path=None):
+        self._client = client
+        self._callback = callback
+        self._collection_path = collection_path
+        self._filters = filters
+        self._document_path = document_path
+        self._documents = {}  # path -> snapshot of the current matches
+        self.is_active = True
+
+    def _includes(self, path, data):
+        if self._document_path is not None:
+            return path == self._document_path and data is not None
+        return data is not None and all(
+            (value := _get_field(data, field)) is not _MISSING and _matches(value, op, expected)
+            for field, op, expected in self._filters
+        )
+
+    def _snapshot(self, path, stored):
+        return MemoryDocumentSnapshot(
+            MemoryDocumentReference(self._client, path), copy.deepcopy(stored.data), stored.create_time, stored.update_time,
+        )
+
+    def _initial(self):
+        if self._document_path is not None:
+            collection_path, document_id = self._client._split(self._document_path)
+            stored = self._client._collections.get(collection_path, {}).get(document_id)
+            rows = [(self._document_path, stored)] if stored is not None else []
+        else:
+            rows = list(self._client._scan(self._collection_path))
+        changes = []
+        for path, stored in rows:
+            if self._includes(path, stored.data):
+                snapshot = self._documents[path] = self._snapshot(path, stored)
+                changes.append(MemoryDocumentChange(ChangeType.ADDED, snapshot))
+        return changes
+
+    def _changes(self, changed):
+        changes = []
+        for path, stored in changed:
+            if path.rsplit('/', 1)[0] != self._collection_path:
+                continue
+            if stored is not None and self._includes(path, stored.data):
+                change_type = ChangeType.MODIFIED if path in self._documents else ChangeType.ADDED
+                snapshot = self._documents[path] = self._snapshot(path, stored)
+                changes.append(MemoryDocumentChange(change_type, snapshot))
+            elif path in self._documents:
+                changes.append(MemoryDocumentChange(ChangeType.REMOVED, self._documents.pop(path)))
+        return changes
+
+    def _deliver(self, documents, changes, read_time):
+        if self.is_active:
+            self._callback(documents, changes, read_time)
+
+    def unsubscribe(self):
+        self.is_active = False
+        self._client._unwatch(self)
+
+    close = unsubscribe
+
+
+class MemoryClient:
+    """Thread-safe in-memory document store with the Firestore client interface."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._collections = {}  # collection path -> {document id: _StoredDocument}
+        self.op_counts = Counter()
+        self._watches = []
+        self._events = None  # listener queue, created with the first watch
+
+    # ---- public client API ----
+
+    def collection(self, *path):
+        return MemoryCollectionReference(self, '/'.join(path))
+
+    def collection_group(self, collection_id):
+        return MemoryQuery(self, collection_id, all_descendants=True)
+
+    def document(self, *path):
+        return MemoryDocumentReference(self, '/'.join(path))
+
+    def batch(self):
+        return MemoryWriteBatch(self)
+
+    def transaction(self, **kwargs):
+        return MemoryTransaction(self)
+
+    def bulk_writer(self, **kwargs):
+        return MemoryBulkWriter(self)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = list(references)
+        with self._lock:
+            snapshots = [self._get(ref, field_paths, count_op=False) for ref in references]
+            self._record('get_all', count_op=transaction is None)
+        yield from snapshots
+
+    def collections(self):
+        return self._subcollections(None)
+
+    def run_transaction(self, fn, *args, **kwargs):
+        """Runs fn(transaction, ...) with exclusive access, then applies its writes atomically."""
+        with self._lock:
+            transaction = self.transaction()
+            result = fn(transaction, *args, **kwargs)
+            transaction.commit()
+            self._record('transaction', documents_read=0)
+            return result
+
+    def reset_op_counts(self):
+        with self._lock:
+            self.op_counts.clear()
+
+    def clear(self):
+        with self._lock:
+            self._collections.clear()
+            self.op_counts.clear()
+
+    def wait_for_listeners(self, timeout=5.0):
+        """Memory-only helper: blocks until every queued snapshot callback has run."""
+        if self._events is not None:
+            done = threading.Event()
+            self._events.put((done.set, ()))
+            done.wait(timeout)
+
+    # ---- internals ----
+
+    def _listen(self):
+        while True:
+            function, args = self._events.get()
+            try:
+                function(*args)
+            except Exception:  # a failing callback must not stop the other listeners
+                pass
+
+    def _watch(self, watch):
+        with self._lock:
+            if self._events is None:
+                self._events = queue.Queue()
+                threading.Thread(target=self._listen, name='memory-listener', daemon=True).start()
+            changes = watch._initial()
+            self._watches.append(watch)
+            self._events.put((watch._deliver, (list(watch._documents.values()), changes, _now())))
+        return watch
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, changed, read_time):
+        for watch in self._watches:
+            changes = watch._changes(changed)
+            if changes:
+                self._events.put((watch._deliver, (list(watch._documents.values()), changes, read_time)))
+
+    def _record(self, op, documents_read=0, documents_written=0, count_op=True):
+        if count_op:
+            self.op_counts[op] += 1
+        self.op_counts['documents_read'] += documents_read
+        self.op_counts['documents_written'] += documents_written
+
+    def _split(self, path):
+        collection_path, _, document_id = path.rpartition('/')
+        return collection_path, document_id
+
+    def _scan(self, collection_path, all_descendants=False):
+        if not all_descendants:
+            for document_id, stored in list(self._collections.get(collection_path, {}).items()):
+                yield f'{collection_path}/{document_id}', stored
+            return
+        for path, documents in list(self._collections.items()):
+            if path.rsplit('/', 1)[-1] == collection_path:
+                for document_id, stored in list(documents.items()):
+                    yield f'{path}/{document_id}', stored
+
+    def _subcollections(self, document_path):
+        prefix = f'{document_path}/' if document_path else ''
+        names = set()
+        with self._lock:
+            for path, documents in self._collections.items():
+                if documents and path.startswith(prefix) and '/' not in path[len(prefix):]:
+                    names.add(path)
+        return [MemoryCollectionReference(self, name) for name in sorted(names)]
+
+    def _get(self, reference, field_paths=None, count_op=True):
+        with self._lock:
+            collection_path, document_id = self._split(reference.path)
+            stored = self._collections.get(collection_path, {}).get(document_id)
+            self._record('get', documents_read=1, count_op=count_op)
+            if stored is None:
+                return MemoryDocumentSnapshot(reference, None, field_paths=field_paths)
+            return MemoryDocumentSnapshot(
+                reference, copy.deepcopy(stored.data), stored.create_time, stored.update_time, field_paths,
+            )
+
+    def _commit(self, writes, op):
+        """Validates every write first so that a failed precondition applies nothing."""
+        with self._lock:
+            now = _now()
+            for kind, reference, _, _ in writes:
+                collection_path, document_id = self._split(reference.path)
+                exists = document_id in self._collections.get(collection_path, {})
+                if kind == 'create' and exists:
+                    raise AlreadyExists(f'Document already exists: {reference.path}')
+                if kind == 'update' and not exists:
+                    raise NotFound(f'No document to update: {reference.path}')
+
+            results, changed = [], []
+            for kind, reference, data, merge in writes:
+                collection_path, document_id = self._split(reference.path)
+                documents = self._collections.setdefault(collection_path, {})
+                stored = documents.get(document_id)
+
+                if kind == 'delete':
+                    documents.pop(document_id, None)
+                elif kind == 'update':
+                    updated = copy.deepcopy(stored.data)
+                    for field_path, value in data.items():
+                        _set_field(updated, field_path, value, now)
+                    documents[document_id] = _StoredDocument(updated, stored.create_time, now)
+                elif kind == 'set' and merge and stored is not None:
+                    merged = copy.deepcopy(stored.data)
+                    _merge(merged, data, now)
+                    documents[document_id] = _StoredDocument(merged, stored.create_time, now)
+                else:
+                    new_data = {}
+                    _merge(new_data, data, now)
+                    documents[document_id] = _StoredDocument(new_data, stored.create_time if stored else now, now)
+                results.append(MemoryWriteResult(now))
+                changed.append((reference.path, documents.get(document_id)))
+
+            if self._watches:
+                self._notify(changed, now)
+
+            if op is not None:
+                self._record(op, documents_written=len(writes))
+            else:
+                self.op_counts['documents_written'] += len(writes)
+            return results
+
+
+# ---------------------------------------------------------------- Auth ----
+
+class UserNotFoundError(LookupError):
+    pass
+
+
+class EmailAlreadyExistsError(ValueError):
+    pass
+
+
+class InvalidIdTokenError(ValueError):
+    pass
+
+
+class MemoryUserRecord:
+    def __init__(self, uid, email, display_name=None, phone_number=None, custom_claims=None, disabled=False):
+        self.uid = uid
+        self.email = email
+        self.display_name = display_name
+        self.phone_number = phone_number
+        self.custom_claims = custom_claims or {}
+        self.disabled = disabled
+
+    def to_dict(self):
+        return {
+            'uid': self.uid,
+            'email': self.email,
+            'display_name': self.display_name,
+            'phone_number': self.phone_number,
+            'custom_claims': self.custom_claims,
+            'disabled': self.disabled,
+        }
+
+
+class MemoryImportUserRecord:
+    def __init__(self, uid, email=None, display_name=None, phone_number=None, password_hash=None,
+                 password_salt=None, custom_claims=None, disabled=False, **kwargs):
+        self.uid = uid
+        self.email = email
+        self.display_name = display_name
+        self.phone_number = phone_number
+        self.password_hash = password_hash
+        self.custom_claims = custom_claims
+        self.disabled = disabled
+
+
+class MemoryUserImportHash:
+    def __init__(self, name, key=None):
+        self.name = name
+        self.key = key
+
+    @classmethod
+    def hmac_sha256(cls, key):
+        return cls('HMAC_SHA256', key)
+
+
+class MemoryErrorInfo:
+    def __init__(self, index, reason):
+        self.index = index
+        self.reason = reason
+
+
+class MemoryUserImportResult:
+    def __init__(self, total, errors):
+        self.errors = errors
+        self.failure_count = len(errors)
+        self.success_count = total - len(errors)
+
+
+class MemoryAuth:
+    """Stand-in for firebase_admin.auth covering the calls the routes make."""
+
+    UserNotFoundError = UserNotFoundError
+    EmailAlreadyExistsError = EmailAlreadyExistsError
+    InvalidIdTokenError = InvalidIdTokenError
+    ImportUserRecord = MemoryImportUserRecord
+    UserImportHash = MemoryUserImportHash
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+        self._uids_by_email = {}
+        self._tokens = {}
+        self.op_counts = Counter()
+
+    def create_user(self, email=None, password=None, uid=None, display_name=None, phone_number=None, **kwargs):
+        with self._lock:
+            self.op_counts['create_user'] += 1
+            if email and email in self._uids_by_email:
+                raise EmailAlreadyExistsError(f'The user with the provided email already exists: {email}')
+            record = MemoryUserRecord(uid or uuid.uuid4().hex[:28], email, display_name, phone_number)
+            self._users[record.uid] = record
+            if email:
+                self._uids_by_email[email] = record.uid
+            return record
+
+    def get_user(self, uid, **kwargs):
+        with self._lock:
+            self.op_counts['get_user'] += 1
+            if uid not in self._users:
+                raise UserNotFoundError(f'No user record found for the provided user ID: {uid}')
+            return self._users[uid]
+
+    def get_user_by_email(self, email, **kwargs):
+        with self._lock:
+            self.op_counts['get_user_by_email'] += 1
+            uid = self._uids_by_email.get(email)
+            if uid is None:
+                raise UserNotFoundError(f'No user record found for the provided email: {email}')
+            return self._users[uid]
+
+    def set_custom_user_claims(self, uid, custom_claims, **kwargs):
+        with self._lock:
+            self.op_counts['set_custom_user_claims'] += 1
+            self._users[uid].custom_claims = dict(custom_claims or {})
+
+    def import_users(self, users, hash_alg=None, **kwargs):
+        """Upserts accounts by uid; an email owned by another uid fails that row only."""
+        if len(users) > 1000:
+            raise ValueError('Maximum number of users to import is 1000.')
+        with self._lock:
+            self.op_counts['import_users'] += 1
+            errors = []
+            for index, user in enumerate(users):
+                owner = self._uids_by_email.get(user.email)
+                if owner is not None and owner != user.uid:
+                    errors.append(MemoryErrorInfo(index, f'The email address is already in use: {user.email}'))
+                    continue
+                self._users[user.uid] = MemoryUserRecord(
+                    user.uid, user.email, user.display_name, user.phone_number, user.custom_claims, user.disabled,
+                )
+                if user.email:
+                    self._uids_by_email[user.email] = user.uid
+            return MemoryUserImportResult(len(users), errors)
+
+    def create_id_token(self, uid):
+        """Memory-only helper: mints an opaque token that verify_id_token() accepts."""
+        with self._lock:
+            if uid not in self._users:
+                raise UserNotFoundError(f'No user record found for the provided user ID: {uid}')
+            token = f'memory-token.{uid}.{uuid.uuid4().hex}'
+            self._tokens[token] = uid
+            return token
+
+    def verify_id_token(self, id_token, check_revoked=False, **kwargs):
+        # Local check, like the real SDK: not counted as an Auth API call
+        with self._lock:
+            uid = self._tokens.get(id_token)
+            if uid is None or uid not in self._users:
+                raise InvalidIdTokenError('Invalid ID token.')
+            record = self._users[uid]
+            return dict(record.custom_claims, uid=uid, sub=uid, email=record.email)
+
+    def delete_user(self, uid, **kwargs):
+        with self._lock:
+            self.op_counts['delete_user'] += 1
+            record = self._users.pop(uid, None)
+            if record is None:
+                raise UserNotFoundError(f'No user record found for the provided user ID: {uid}')
+            self._uids_by_email.pop(record.email, None)
+
+    def reset_op_counts(self):
+        with self._lock:
+            self.op_counts.clear()
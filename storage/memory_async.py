@@ -0,0 +1,137 @@
+"""
+Async facade over MemoryClient mirroring google.cloud.firestore.AsyncClient, so async
+handlers run against the in-memory backend unchanged. The store is in-process, so
+every call completes immediately.
+"""
+
+
+class AsyncMemoryQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def _chain(self, method, *args, **kwargs):
+        return AsyncMemoryQuery(getattr(self._query, method)(*args, **kwargs))
+
+    def where(self, *args, **kwargs):
+        return self._chain('where', *args, **kwargs)
+
+    def order_by(self, *args, **kwargs):
+        return self._chain('order_by', *args, **kwargs)
+
+    def limit(self, count):
+        return self._chain('limit', count)
+
+    def offset(self, num_to_skip):
+        return self._chain('offset', num_to_skip)
+
+    def select(self, field_paths):
+        return self._chain('select', field_paths)
+
+    def start_at(self, cursor):
+        return self._chain('start_at', cursor)
+
+    def start_after(self, cursor):
+        return self._chain('start_after', cursor)
+
+    def end_at(self, cursor):
+        return self._chain('end_at', cursor)
+
+    def end_before(self, cursor):
+        return self._chain('end_before', cursor)
+
+    async def stream(self, transaction=None, **kwargs):
+        for snapshot in self._query.stream(transaction=transaction):
+            yield snapshot
+
+    async def get(self, transaction=None, **kwargs):
+        return self._query.get(transaction=transaction)
+
+
+class AsyncMemoryCollectionReference(AsyncMemoryQuery):
+    @property
+    def id(self):
+        return self._query.id
+
+    def document(self, document_id=None):
+        return AsyncMemoryDocumentReference(self._query.document(document_id))
+
+    async def add(self, document_data, document_id=None, **kwargs):
+        update_time, doc_ref = self._query.add(document_data, document_id)
+        return update_time, AsyncMemoryDocumentReference(doc_ref)
+
+
+class AsyncMemoryDocumentReference:
+    def __init__(self, reference):
+        self._reference = reference
+
+    @property
+    def id(self):
+        return self._reference.id
+
+    @property
+    def path(self):
+        return self._reference.path
+
+    def collection(self, collection_id):
+        return AsyncMemoryCollectionReference(self._reference.collection(collection_id))
+
+    async def get(self, field_paths=None, transaction=None, **kwargs):
+        return self._reference.get(field_paths, transaction=transaction)
+
+    async def set(self, document_data, merge=False, **kwargs):
+        return self._reference.set(document_data, merge=merge)
+
+    async def create(self, document_data, **kwargs):
+        return self._reference.create(document_data)
+
+    async def update(self, field_updates, **kwargs):
+        return self._reference.update(field_updates)
+
+    async def delete(self, **kwargs):
+        return self._reference.delete()
+
+
+def _sync_ref(reference):
+    return getattr(reference, '_reference', reference)
+
+
+class AsyncMemoryWriteBatch:
+    def __init__(self, batch):
+        self._batch = batch
+
+    def set(self, reference, document_data, merge=False):
+        self._batch.set(_sync_ref(reference), document_data, merge=merge)
+        return self
+
+    def create(self, reference, document_data):
+        self._batch.create(_sync_ref(reference), document_data)
+        return self
+
+    def update(self, reference, field_updates, option=None):
+        self._batch.update(_sync_ref(reference), field_updates)
+        return self
+
+    def delete(self, reference, option=None):
+        self._batch.delete(_sync_ref(reference))
+        return self
+
+    async def commit(self, **kwargs):
+        return self._batch.commit()
+
+
+class AsyncMemoryClient:
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, *path):
+        return AsyncMemoryCollectionReference(self._client.collection(*path))
+
+    def document(self, *path):
+        return AsyncMemoryDocumentReference(self._client.document(*path))
+
+    def batch(self):
+        return AsyncMemoryWriteBatch(self._client.batch())
+
+    async def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        for snapshot in self._client.get_all([_sync_ref(ref) for ref in references], field_paths, transaction):
+            yield snapshot
@@ -0,0 +1,16 @@
+from storage.memory import MemoryAuth, MemoryClient
+from storage.memory_async import AsyncMemoryClient
+
+
+class MemoryBackend:
+    """Process-local backend for offline runs, load tests and benchmarks."""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.client = MemoryClient()
+        self.auth = MemoryAuth()
+        self.async_client = AsyncMemoryClient(self.client)
+
+    def run_transaction(self, fn, *args, **kwargs):
+        return self.client.run_transaction(fn, *args, **kwargs)
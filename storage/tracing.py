@@ -0,0 +1,266 @@
+"""
+Thin wrappers around the active client and Auth module that report every storage
+operation to registered listeners.
+
+Listeners are called synchronously as listener(kind, target, count). Each 'read',
+'write', 'query' or 'auth' event is one round trip: target is a document path, query
+description or Auth method name, and count is the number of documents involved.
+Once a query has been consumed a 'query_results' event reports how many documents
+it returned; it is not a round trip of its own.
+Wrapped references are unwrapped before they reach the real client, so batches,
+transactions and get_all keep working on both backends.
+"""
+import inspect
+
+_listeners = []
+
+
+def add_listener(listener):
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def enabled():
+    return bool(_listeners)
+
+
+def emit(kind, target, count=1):
+    for listener in _listeners:
+        listener(kind, target, count)
+
+
+def unwrap(obj):
+    # Wrappers may be stacked (see storage/unit_of_work.py); peel them all off
+    while hasattr(obj, '_wrapped'):
+        obj = obj._wrapped
+    return obj
+
+
+def _unwrap_cursor(cursor):
+    if isinstance(cursor, dict):
+        return {key: unwrap(value) for key, value in cursor.items()}
+    return unwrap(cursor)
+
+
+class _Wrapper:
+    def __init__(self, wrapped):
+        self._wrapped = wrapped
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+    def __eq__(self, other):
+        return self._wrapped == unwrap(other)
+
+    def __hash__(self):
+        return hash(self._wrapped)
+
+
+class TracedQuery(_Wrapper):
+    def __init__(self, wrapped, description):
+        super().__init__(wrapped)
+        self._description = description
+
+    def _chain(self, method, suffix, *args, **kwargs):
+        return TracedQuery(getattr(self._wrapped, method)(*args, **kwargs), f'{self._description} {suffix}')
+
+    def where(self, *args, **kwargs):
+        if 'filter' in kwargs:
+            f = kwargs['filter']
+            clause = f'{f.field_path} {f.op_string} {f.value!r}'
+        else:
+            clause = ' '.join(repr(a) if i == 2 else str(a) for i, a in enumerate(args))
+        return self._chain('where', f'where {clause}', *args, **kwargs)
+
+    def order_by(self, field_path, *args, **kwargs):
+        return self._chain('order_by', f'order_by {field_path}', field_path, *args, **kwargs)
+
+    def limit(self, count):
+        return self._chain('limit', f'limit {count}', count)
+
+    def offset(self, num_to_skip):
+        return self._chain('offset', f'offset {num_to_skip}', num_to_skip)
+
+    def select(self, field_paths):
+        return self._chain('select', f'select {list(field_paths)}', field_paths)
+
+    def start_at(self, cursor):
+        return self._chain('start_at', 'start_at', _unwrap_cursor(cursor))
+
+    def start_after(self, cursor):
+        return self._chain('start_after', 'start_after', _unwrap_cursor(cursor))
+
+    def end_at(self, cursor):
+        return self._chain('end_at', 'end_at', _unwrap_cursor(cursor))
+
+    def end_before(self, cursor):
+        return self._chain('end_before', 'end_before', _unwrap_cursor(cursor))
+
+    def stream(self, transaction=None, **kwargs):
+        emit('query', self._description)
+        count = 0
+        try:
+            for snapshot in self._wrapped.stream(transaction=unwrap(transaction), **kwargs):
+                count += 1
+                yield snapshot
+        finally:
+            emit('query_results', self._description, max(count, 1))
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction, **kwargs))
+
+
+def _collection_path(collection):
+    # google-cloud-firestore keeps the path as a tuple; the memory client as a string
+    path = getattr(collection, 'path', None)
+    return path if isinstance(path, str) else '/'.join(getattr(collection, '_path', (collection.id,)))
+
+
+class TracedCollectionReference(TracedQuery):
+    def __init__(self, wrapped):
+        super().__init__(wrapped, _collection_path(wrapped))
+
+    def document(self, *args, **kwargs):
+        return TracedDocumentReference(self._wrapped.document(*args, **kwargs))
+
+    def add(self, document_data, *args, **kwargs):
+        update_time, doc_ref = self._wrapped.add(document_data, *args, **kwargs)
+        emit('write', doc_ref.path)
+        return update_time, TracedDocumentReference(doc_ref)
+
+
+class TracedDocumentReference(_Wrapper):
+    def collection(self, collection_id):
+        return TracedCollectionReference(self._wrapped.collection(collection_id))
+
+    def get(self, *args, transaction=None, **kwargs):
+        emit('read', self._wrapped.path)
+        return self._wrapped.get(*args, transaction=unwrap(transaction), **kwargs)
+
+    def set(self, *args, **kwargs):
+        emit('write', self._wrapped.path)
+        return self._wrapped.set(*args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        emit('write', self._wrapped.path)
+        return self._wrapped.create(*args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        emit('write', self._wrapped.path)
+        return self._wrapped.update(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        emit('write', self._wrapped.path)
+        return self._wrapped.delete(*args, **kwargs)
+
+
+class TracedWriteBatch(_Wrapper):
+    def __init__(self, wrapped):
+        super().__init__(wrapped)
+        self._paths = []
+
+    def _add(self, method, reference, *args, **kwargs):
+        reference = unwrap(reference)
+        self._paths.append(reference.path)
+        getattr(self._wrapped, method)(reference, *args, **kwargs)
+        return self
+
+    def set(self, reference, *args, **kwargs):
+        return self._add('set', reference, *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs):
+        return self._add('create', reference, *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        return self._add('update', reference, *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        return self._add('delete', reference, *args, **kwargs)
+
+    def __len__(self):
+        return len(self._paths)
+
+    def commit(self, *args, **kwargs):
+        paths, self._paths = self._paths, []
+        if paths:
+            emit('write', paths[0] if len(paths) == 1 else f'batch of {len(paths)}', len(paths))
+        return self._wrapped.commit(*args, **kwargs)
+
+
+class TracedBulkWriter(TracedWriteBatch):
+    """Queued writes are reported when BulkWriter is flushed or closed."""
+
+    def _report(self):
+        paths, self._paths = self._paths, []
+        if paths:
+            emit('write', paths[0] if len(paths) == 1 else f'bulk write of {len(paths)}', len(paths))
+
+    def flush(self, *args, **kwargs):
+        self._report()
+        return self._wrapped.flush(*args, **kwargs)
+
+    def close(self, *args, **kwargs):
+        self._report()
+        return self._wrapped.close(*args, **kwargs)
+
+
+class TracedTransaction(TracedWriteBatch):
+    """Writes are reported when they are buffered; the backend commits them."""
+
+    def get(self, ref_or_query, *args, **kwargs):
+        traced = ref_or_query
+        while isinstance(traced, _Wrapper) and not isinstance(traced, TracedQuery):
+            traced = traced._wrapped  # e.g. a unit-of-work reference around a traced one
+        if isinstance(traced, TracedQuery):
+            emit('query', traced._description)
+        else:
+            emit('read', unwrap(ref_or_query).path)
+        return self._wrapped.get(unwrap(ref_or_query), *args, **kwargs)
+
+    def _add(self, method, reference, *args, **kwargs):
+        reference = unwrap(reference)
+        emit('write', reference.path)
+        getattr(self._wrapped, method)(reference, *args, **kwargs)
+        return self
+
+
+class TracedClient(_Wrapper):
+    def collection(self, *args, **kwargs):
+        return TracedCollectionReference(self._wrapped.collection(*args, **kwargs))
+
+    def collection_group(self, collection_id):
+        return TracedQuery(self._wrapped.collection_group(collection_id), f'*/{collection_id}')
+
+    def document(self, *args, **kwargs):
+        return TracedDocumentReference(self._wrapped.document(*args, **kwargs))
+
+    def batch(self):
+        return TracedWriteBatch(self._wrapped.batch())
+
+    def bulk_writer(self, *args, **kwargs):
+        return TracedBulkWriter(self._wrapped.bulk_writer(*args, **kwargs))
+
+    def get_all(self, references, *args, transaction=None, **kwargs):
+        references = [unwrap(ref) for ref in references]
+        emit('read', f'get_all of {len(references)}', len(references))
+        return self._wrapped.get_all(references, *args, transaction=unwrap(transaction), **kwargs)
+
+
+class TracedAuth(_Wrapper):
+    """Reports every Auth function call; classes and constants pass through untouched."""
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wrapped, name)
+        if not (inspect.isfunction(attribute) or inspect.ismethod(attribute)):
+            return attribute
+
+        def traced(*args, **kwargs):
+            emit('auth', name)
+            return attribute(*args, **kwargs)
+
+        return traced
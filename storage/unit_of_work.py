@@ -0,0 +1,249 @@
+"""
+Request-scoped unit of work.
+
+While a UnitOfWork is active in the current context, writes made through `storage.db`
+(set/create/update/delete on document references, collection.add and db.batch()
+commits) are buffered and sent together by commit(), as a single batch when they fit
+in one. Reading a document, or running a query over a collection, that has pending
+writes flushes the buffer first, so handlers still read their own writes; a query is
+checked when it runs, not when it is built. Transactions flush before they start.
+BulkWriter, transactions and the async client always write immediately.
+"""
+import contextvars
+from storage.tracing import _Wrapper, _collection_path, unwrap
+
+BATCH_LIMIT = 500  # Firestore's per-batch write limit
+
+# Query methods that only build another query; any other call may run it
+_QUERY_BUILDERS = frozenset((
+    'where', 'order_by', 'limit', 'limit_to_last', 'offset', 'select',
+    'start_at', 'start_after', 'end_at', 'end_before', 'count', 'sum', 'avg', 'find_nearest',
+))
+
+_current = contextvars.ContextVar('storage_unit_of_work', default=None)
+
+
+def current():
+    return _current.get()
+
+
+class UnitOfWork:
+    def __init__(self, client_getter):
+        self._client_getter = client_getter
+        self._writes = []   # (method, reference, args, kwargs)
+        self._paths = set()
+        self._callbacks = []
+        self._token = None
+
+    def __len__(self):
+        return len(self._writes)
+
+    def begin(self):
+        self._token = _current.set(self)
+        return self
+
+    def end(self):
+        """Deactivates the unit; later writes in this context go straight to the client."""
+        if self._token is not None:
+            _current.reset(self._token)
+            self._token = None
+
+    def add(self, method, reference, *args, **kwargs):
+        reference = unwrap(reference)
+        self._writes.append((method, reference, args, kwargs))
+        self._paths.add(reference.path)
+        if len(self._writes) >= BATCH_LIMIT:
+            self.flush()
+
+    def after_commit(self, callback):
+        """Runs callback once the writes buffered so far are committed; never if they are discarded."""
+        self._callbacks.append(callback)
+
+    def has_pending(self, path):
+        return path in self._paths
+
+    def has_pending_under(self, collection_path):
+        prefix = collection_path + '/'
+        return any(path.startswith(prefix) for path in self._paths)
+
+    def flush(self):
+        """Commits the buffered writes as one batch, then runs the after_commit callbacks."""
+        writes, self._writes = self._writes, []
+        callbacks, self._callbacks = self._callbacks, []
+        self._paths = set()
+        results = []
+        if writes:
+            batch = self._client_getter().batch()
+            for method, reference, args, kwargs in writes:
+                getattr(batch, method)(reference, *args, **kwargs)
+            results = batch.commit()
+        for callback in callbacks:
+            callback()
+        return results
+
+    commit = flush
+
+    def discard(self):
+        self._writes = []
+        self._callbacks = []
+        self._paths = set()
+
+
+class UnwrappedWrites(_Wrapper):
+    """Hands real references to transactions and BulkWriter, which type-check their arguments."""
+
+    def get(self, ref_or_query, *args, **kwargs):
+        return self._wrapped.get(unwrap(ref_or_query), *args, **kwargs)
+
+    def set(self, reference, *args, **kwargs):
+        return self._wrapped.set(unwrap(reference), *args, **kwargs)
+
+    def create(self, reference, *args, **kwargs):
+        return self._wrapped.create(unwrap(reference), *args, **kwargs)
+
+    def update(self, reference, *args, **kwargs):
+        return self._wrapped.update(unwrap(reference), *args, **kwargs)
+
+    def delete(self, reference, *args, **kwargs):
+        return self._wrapped.delete(unwrap(reference), *args, **kwargs)
+
+
+class BufferedDocumentReference(_Wrapper):
+    def __init__(self, wrapped, unit):
+        super().__init__(wrapped)
+        self._unit = unit
+
+    def collection(self, collection_id):
+        return BufferedCollectionReference(self._wrapped.collection(collection_id), self._unit)
+
+    def get(self, *args, transaction=None, **kwargs):
+        if self._unit.has_pending(self._wrapped.path):
+            self._unit.flush()
+        return self._wrapped.get(*args, transaction=unwrap(transaction), **kwargs)
+
+    def set(self, document_data, merge=False):
+        self._unit.add('set', self._wrapped, document_data, merge=merge)
+
+    def create(self, document_data):
+        self._unit.add('create', self._wrapped, document_data)
+
+    def update(self, field_updates, option=None):
+        self._unit.add('update', self._wrapped, field_updates)
+
+    def delete(self, option=None):
+        self._unit.add('delete', self._wrapped)
+
+
+class BufferedQuery(_Wrapper):
+    """
+    Builder calls (where, order_by, limit, ...) return another BufferedQuery; any other
+    call, such as stream() or get(), first flushes the pending writes the query could
+    see. path is the collection queried, or None for a collection group.
+    """
+
+    def __init__(self, wrapped, unit, path):
+        super().__init__(wrapped)
+        self._unit = unit
+        self._path = path
+
+    def _flush_pending(self):
+        if self._unit.has_pending_under(self._path) if self._path is not None else len(self._unit):
+            self._unit.flush()
+
+    def __getattr__(self, name):
+        attribute = getattr(self._wrapped, name)
+        if not callable(attribute):
+            return attribute
+
+        if name in _QUERY_BUILDERS:
+            def building(*args, **kwargs):
+                return BufferedQuery(attribute(*args, **kwargs), self._unit, self._path)
+            return building
+
+        def running(*args, **kwargs):
+            self._flush_pending()
+            return attribute(*args, **kwargs)
+
+        return running
+
+
+class BufferedCollectionReference(BufferedQuery):
+    """document()/add() are buffered; queries flush pending writes below the collection when they run."""
+
+    def __init__(self, wrapped, unit):
+        super().__init__(wrapped, unit, _collection_path(unwrap(wrapped)))
+
+    def document(self, *args, **kwargs):
+        return BufferedDocumentReference(self._wrapped.document(*args, **kwargs), self._unit)
+
+    def add(self, document_data, document_id=None, **kwargs):
+        doc_ref = self.document(document_id) if document_id else self.document()
+        doc_ref.set(document_data)
+        return None, doc_ref
+
+
+class BufferedWriteBatch:
+    """db.batch() inside a unit of work: commit() hands the writes to the unit."""
+
+    def __init__(self, unit):
+        self._unit = unit
+        self._writes = []
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, (document_data,), {'merge': merge}))
+        return self
+
+    def create(self, reference, document_data):
+        self._writes.append(('create', reference, (document_data,), {}))
+        return self
+
+    def update(self, reference, field_updates, option=None):
+        self._writes.append(('update', reference, (field_updates,), {}))
+        return self
+
+    def delete(self, reference, option=None):
+        self._writes.append(('delete', reference, (), {}))
+        return self
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        for method, reference, args, kwargs in writes:
+            self._unit.add(method, reference, *args, **kwargs)
+        return []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+
+class BufferedClient(_Wrapper):
+    def __init__(self, wrapped, unit):
+        super().__init__(wrapped)
+        self._unit = unit
+
+    def collection(self, *args, **kwargs):
+        return BufferedCollectionReference(self._wrapped.collection(*args, **kwargs), self._unit)
+
+    def document(self, *args, **kwargs):
+        return BufferedDocumentReference(self._wrapped.document(*args, **kwargs), self._unit)
+
+    def collection_group(self, collection_id):
+        return BufferedQuery(self._wrapped.collection_group(collection_id), self._unit, None)
+
+    def batch(self):
+        return BufferedWriteBatch(self._unit)
+
+    def bulk_writer(self, *args, **kwargs):
+        return UnwrappedWrites(self._wrapped.bulk_writer(*args, **kwargs))
+
+    def get_all(self, references, *args, transaction=None, **kwargs):
+        references = [unwrap(ref) for ref in references]
+        if any(self._unit.has_pending(ref.path) for ref in references):
+            self._unit.flush()
+        return self._wrapped.get_all(references, *args, transaction=unwrap(transaction), **kwargs)
@@ -0,0 +1,41 @@
+"""
+One event loop per worker process, running in a background thread.
+
+Async handlers submit their coroutines here with run_async(), so the Firestore
+AsyncClient (bound to a single loop) is created once per worker and shared by every
+in-flight request, while independent lookups inside a request run concurrently.
+"""
+import asyncio
+import os
+import threading
+
+_loop = None
+_lock = threading.Lock()
+
+
+def _reset_loop():
+    global _loop, _lock
+    _loop = None
+    _lock = threading.Lock()
+
+
+# The loop thread does not survive fork(); the child starts its own on first use
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_loop)
+
+
+def get_loop():
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='async-runner', daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def run_async(coro, timeout=None):
+    """Runs `coro` on the worker's shared loop and blocks the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
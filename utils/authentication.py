@@ -0,0 +1,140 @@
+"""
+Bearer-token authentication for the blueprints.
+
+Firebase ID tokens are verified locally: auth.verify_id_token() checks the signature
+against Google's public signing keys, which the Admin SDK caches and refreshes per
+their Cache-Control max-age, so no Auth API call is made per request. The caller's
+role comes from the token's 'role' custom claim (set at registration) or, for older
+accounts, from their profile document, cached per uid for AUTH_CLAIMS_TTL seconds.
+require_owner() additionally limits customers and drivers to their own account's data.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import g, jsonify, request
+from config import Config
+from storage import auth, db
+
+# Profile collections checked, in order, for accounts whose token has no role claim
+ROLE_COLLECTIONS = (('admins', 'admin'), ('drivers', 'driver'), ('users', 'user'))
+_MAX_CACHED_CLAIMS = 10_000
+
+_claims = OrderedDict()   # uid -> (expires_at, claims)
+_lock = threading.Lock()
+
+
+def _cached_claims(uid):
+    with _lock:
+        entry = _claims.get(uid)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _claims[uid]
+            return None
+        _claims.move_to_end(uid)
+        return entry[1]
+
+
+def _cache_claims(uid, claims):
+    with _lock:
+        _claims[uid] = (time.monotonic() + Config.AUTH_CLAIMS_TTL, claims)
+        _claims.move_to_end(uid)
+        while len(_claims) > _MAX_CACHED_CLAIMS:
+            _claims.popitem(last=False)
+
+
+def invalidate_claims(uid):
+    """Drops cached role/profile claims, e.g. after a role change or account deletion."""
+    with _lock:
+        _claims.pop(uid, None)
+
+
+def _load_profile_claims(uid):
+    for collection, role in ROLE_COLLECTIONS:
+        doc = db.collection(collection).document(uid).get()
+        if doc.exists:
+            profile = doc.to_dict()
+            return {
+                'role': profile.get('role', role),
+                'profile_id': profile.get('admin_id') or profile.get('driver_id') or profile.get('user_id'),
+            }
+    return {'role': None, 'profile_id': None}
+
+
+def resolve_claims(decoded_token):
+    """Returns {'uid', 'email', 'role', 'profile_id'} for a verified token."""
+    uid = decoded_token['uid']
+    claims = _cached_claims(uid)
+    if claims is None:
+        if decoded_token.get('role'):
+            claims = {'role': decoded_token['role'], 'profile_id': decoded_token.get('profile_id')}
+        else:
+            claims = _load_profile_claims(uid)
+        _cache_claims(uid, claims)
+    return dict(claims, uid=uid, email=decoded_token.get('email'))
+
+
+def bearer_token():
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    return token.strip() if scheme.lower() == 'bearer' and token.strip() else None
+
+
+def authenticate():
+    """Verifies the request's bearer token. Returns claims, or None when there is no valid token."""
+    token = bearer_token()
+    if not token:
+        return None
+    try:
+        decoded_token = auth.verify_id_token(token)
+    except Exception:
+        return None
+    return resolve_claims(decoded_token)
+
+
+def require_auth(*roles):
+    """
+    Rejects requests without a valid Firebase ID token (401) or, when roles are given,
+    whose account has none of them (403). The caller's claims are stored in g.auth_user.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            claims = authenticate()
+            if claims is None:
+                return jsonify({'error': 'A valid Firebase ID token is required (Authorization: Bearer <token>).'}), 401
+            if roles and claims['role'] not in roles:
+                return jsonify({'error': f"Access denied. Requires role: {', '.join(roles)}."}), 403
+            g.auth_user = claims
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def owns(account_id):
+    """Whether the authenticated caller is an admin or the account itself (public ID or uid)."""
+    claims = g.auth_user
+    return claims['role'] == 'admin' or (account_id is not None and account_id in (claims['profile_id'], claims['uid']))
+
+
+def require_owner(field, *roles):
+    """
+    require_auth(*roles, 'admin') for views that act on one account: callers other than
+    admins get 403 unless `field` (a URL argument, else a JSON body field) is their own.
+    """
+    def decorator(view):
+        @require_auth(*roles, 'admin')
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            account_id = kwargs[field] if field in kwargs else (request.get_json(silent=True) or {}).get(field)
+            if not owns(account_id):
+                return jsonify({'error': 'Access denied. You can only access your own account.'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_role_claim(uid, role, profile_id):
+    """Stores the role on the Auth account so future tokens carry it and need no profile read."""
+    auth.set_custom_user_claims(uid, {'role': role, 'profile_id': profile_id})
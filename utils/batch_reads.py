@@ -0,0 +1,29 @@
+"""
+Helpers for the batched multi-get endpoints (/get_users, /get_drivers, /get_garments).
+
+A request carries up to MAX_BATCH_IDS IDs; the response maps every requested ID to its
+document, or to null when it does not exist, and lists the missing IDs in 'not_found'.
+"""
+MAX_BATCH_IDS = 500
+
+
+class BatchRequestError(ValueError):
+    pass
+
+
+def batch_ids(data, field):
+    """Reads the ID list from a JSON body, dropping duplicates but keeping the order."""
+    ids = (data or {}).get(field)
+    if not isinstance(ids, list) or not all(isinstance(item, str) and item for item in ids):
+        raise BatchRequestError(f'{field} must be a list of non-empty strings.')
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        raise BatchRequestError(f'{field} must not be empty.')
+    if len(ids) > MAX_BATCH_IDS:
+        raise BatchRequestError(f'At most {MAX_BATCH_IDS} {field} per request.')
+    return ids
+
+
+def batch_response(ids, found, key):
+    results = {item: found.get(item) for item in ids}
+    return {key: results, 'not_found': [item for item in ids if results[item] is None]}
@@ -0,0 +1,51 @@
+from storage import db
+
+# Firestore rejects batches with more than 500 writes
+BATCH_LIMIT = 500
+BULK_WRITE_ATTEMPTS = 3
+
+
+def commit_in_chunks(writes, chunk_size=BATCH_LIMIT):
+    """
+    Commits (doc_ref, data) pairs, or (method, doc_ref, data) triples such as
+    ('create', ref, data), through WriteBatch, `chunk_size` writes per commit.
+    Returns one result per chunk so callers can report partial failures.
+    """
+    chunk_size = min(chunk_size, BATCH_LIMIT)
+    results = []
+
+    for chunk_index, start in enumerate(range(0, len(writes), chunk_size)):
+        chunk = writes[start:start + chunk_size]
+        batch = db.batch()
+        for write in chunk:
+            method, doc_ref, data = write if len(write) == 3 else ('set',) + tuple(write)
+            getattr(batch, method)(doc_ref, data)
+
+        try:
+            batch.commit()
+            results.append({'chunk': chunk_index, 'start': start, 'count': len(chunk), 'committed': True})
+        except Exception as e:
+            results.append({'chunk': chunk_index, 'start': start, 'count': len(chunk), 'committed': False, 'error': str(e)})
+
+    return results
+
+
+def bulk_write(writes):
+    """
+    Sets (doc_ref, data) pairs through BulkWriter: non-atomic, parallel and retried.
+    Returns {document path: error message} for writes that still failed.
+    """
+    failures = {}
+    bulk_writer = db.bulk_writer()
+
+    def on_write_error(failure, _writer):
+        if failure.attempts < BULK_WRITE_ATTEMPTS:
+            return True  # retry
+        failures[failure.reference.path] = failure.message
+        return False
+
+    bulk_writer.on_write_error(on_write_error)
+    for doc_ref, data in writes:
+        bulk_writer.set(doc_ref, data)
+    bulk_writer.close()
+    return failures
@@ -0,0 +1,342 @@
+"""
+Caches.
+
+TTLCache is a bounded in-process LRU map whose entries also expire after `ttl`
+seconds. Entries can carry a version (e.g. a document's update_time) so that a slow
+read-through never overwrites a newer value already stored by a change listener.
+
+TwoTierCache puts a TTLCache (L1, per worker) in front of Redis (L2, shared by every
+worker and pod, at Config.REDIS_URL). A miss in
+both tiers calls the loader and fills both; concurrent misses on one key share that
+call (utils.singleflight). invalidate() drops the key from L2 and
+publishes it on the cache's channel, and every worker's subscriber thread drops it
+from its L1. Inside a request the shared invalidation waits until the unit of work has
+committed, so no worker can re-read the old document after the key was dropped; a
+read racing with the commit can still refill L2 with the old value, which then lives
+at most Config.CACHE_L2_TTL seconds. If Redis is unreachable, reads fall through to
+Firestore.
+
+Without REDIS_URL there is no L2 and no way to reach the other workers, so the cache
+is L1 only and its entries live Config.CACHE_LOCAL_TTL seconds: an invalidation then
+only clears this worker, and the others serve the old value for at most that long.
+
+Every cache registers itself by name; /metrics reports their counters.
+"""
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from config import Config
+from storage import unit_of_work
+from utils.singleflight import SingleFlight
+
+MISSING = object()
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def registered_caches():
+    with _registry_lock:
+        return dict(_registry)
+
+
+class TTLCache:
+    def __init__(self, name, maxsize, ttl, register=True):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, version, value)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        if register:
+            with _registry_lock:
+                _registry[name] = self
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the cached value, or MISSING when absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, version=None):
+        """Stores value unless the cache already holds a newer version of it."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and version is not None and entry[1] is not None and entry[1] > version:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'size': len(self._entries)}
+
+
+_redis = None
+_redis_lock = threading.Lock()
+
+
+def get_redis():
+    """The shared L2 client for Config.REDIS_URL, or None when it is unset."""
+    global _redis
+    if _redis is None and Config.REDIS_URL:
+        with _redis_lock:
+            if _redis is None:
+                import redis
+                _redis = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=Config.REDIS_SOCKET_TIMEOUT)
+    return _redis
+
+
+def _reset_after_fork():
+    """Drops the parent's Redis client and subscriber threads (called in the child after a fork)."""
+    global _redis, _redis_lock, _registry_lock
+    _redis = None
+    _redis_lock = threading.Lock()
+    _registry_lock = threading.Lock()
+    for cache in _registry.values():
+        if isinstance(cache, TwoTierCache):
+            cache._reset_subscriber()
+
+
+# Threads do not survive fork(): a preloading parent's subscriber would otherwise never run
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {'$ts': value.isoformat()}
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _json_hook(value):
+    return datetime.fromisoformat(value['$ts']) if len(value) == 1 and '$ts' in value else value
+
+
+class TwoTierCache:
+    def __init__(self, name, l1_size=None, l1_ttl=None, l2_ttl=None, redis=None):
+        self.name = name
+        self.channel = f'laundryless:invalidate:{name}'
+        self.l2_ttl = l2_ttl or Config.CACHE_L2_TTL
+        # L1 only without a shared server: short-lived, since other workers' invalidations never arrive
+        self.shared = redis is not None or bool(Config.REDIS_URL)
+        default_l1_ttl = Config.CACHE_L1_TTL if self.shared else Config.CACHE_LOCAL_TTL
+        self._l1 = TTLCache(name, l1_size or Config.CACHE_L1_SIZE, l1_ttl or default_l1_ttl, register=False)
+        self._redis = redis
+        self._subscriber = None
+        self._flights = SingleFlight(f'cache:{name}')
+        self._lock = threading.Lock()
+        self.l2_hits = self.l2_misses = self.l2_errors = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def __len__(self):
+        return len(self._l1)
+
+    def _key(self, key):
+        return f'laundryless:{self.name}:{key}'
+
+    def _server(self):
+        """The L2 client, or None when L1 only; the first call also starts this worker's invalidation subscriber."""
+        server = (self._redis or get_redis()) if self.shared else None
+        if server is not None and self._subscriber is None:
+            with self._lock:
+                if self._subscriber is None:
+                    self._subscriber = threading.Thread(
+                        target=self._listen, args=(server,), name=f'cache-invalidation-{self.name}', daemon=True)
+                    self._subscriber.start()
+        return server
+
+    def _reset_subscriber(self):
+        self._subscriber = None
+        self._lock = threading.Lock()
+        # Invalidations published before the new subscriber connects are lost
+        self._l1.clear()
+
+    def _listen(self, server):
+        while True:
+            try:
+                pubsub = server.pubsub()
+                pubsub.subscribe(self.channel)
+                # Messages sent while (re)connecting are lost; start from a clean L1
+                self._l1.clear()
+                while True:
+                    message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message['type'] == 'message':
+                        for key in json.loads(message['data']):
+                            self._l1.invalidate(key)
+            except Exception:
+                time.sleep(1.0)
+
+    def get_local(self, key):
+        """L1 only: never blocks on the network (for async handlers)."""
+        value = self._l1.get(key)
+        return copy.deepcopy(value) if value is not MISSING else MISSING
+
+    def set_local(self, key, value):
+        self._l1.set(key, copy.deepcopy(value))
+
+    def _load(self, key, loader):
+        server = self._server()
+        if server is None:
+            value = loader()
+            if value is not None:
+                self.set_local(key, value)
+            return value
+        try:
+            raw = server.get(self._key(key))
+        except Exception:
+            raw = None
+            self.l2_errors += 1
+        if raw is not None:
+            self.l2_hits += 1
+            value = json.loads(raw, object_hook=_json_hook)
+            self.set_local(key, value)
+            return value
+        self.l2_misses += 1
+
+        value = loader()
+        if value is not None:
+            self.set_local(key, value)
+            try:
+                server.set(self._key(key), json.dumps(value, default=_json_default), ex=self.l2_ttl)
+            except Exception:
+                self.l2_errors += 1
+        return value
+
+    def get(self, key, loader):
+        """
+        Returns the cached value for key, or loader()'s result. None results are not
+        cached. Concurrent misses on one key in this worker share a single L2/loader call.
+        """
+        value = self.get_local(key)
+        if value is not MISSING:
+            return value
+        return copy.deepcopy(self._flights.do(key, self._load, key, loader))
+
+    def get_many(self, keys, loader_many):
+        """
+        Batched get(): L1, then one L2 mget, then one loader_many(missing_keys) call that
+        returns {key: value}. Returns {key: value} with None for keys that do not exist.
+        """
+        found, missing = {}, []
+        for key in keys:
+            value = self.get_local(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if not missing:
+            return found
+
+        server = self._server()
+        if server is None:
+            loaded = loader_many(missing)
+            for key in missing:
+                value = found[key] = loaded.get(key)
+                if value is not None:
+                    self.set_local(key, value)
+            return copy.deepcopy(found)
+        try:
+            raws = server.mget([self._key(key) for key in missing])
+        except Exception:
+            raws = [None] * len(missing)
+            self.l2_errors += 1
+        unresolved = []
+        for key, raw in zip(missing, raws):
+            if raw is None:
+                self.l2_misses += 1
+                unresolved.append(key)
+            else:
+                self.l2_hits += 1
+                found[key] = json.loads(raw, object_hook=_json_hook)
+                self.set_local(key, found[key])
+        if not unresolved:
+            return found
+
+        loaded = loader_many(unresolved)
+        try:
+            pipeline = server.pipeline(transaction=False)
+            for key in unresolved:
+                value = found[key] = loaded.get(key)
+                if value is not None:
+                    self.set_local(key, value)
+                    pipeline.set(self._key(key), json.dumps(value, default=_json_default), ex=self.l2_ttl)
+            pipeline.execute()
+        except Exception:
+            self.l2_errors += 1
+        # Whatever the L2 outcome, every key has its loaded value
+        for key in unresolved:
+            found.setdefault(key, loaded.get(key))
+        return copy.deepcopy(found)
+
+    async def get_async(self, key, coroutine_fn):
+        """
+        get() for coroutines on the shared loop: L1, then coroutine_fn() (coalesced per key).
+        L2 is skipped, as a blocking Redis call would stall the loop; results fill L1 only.
+        """
+        value = self.get_local(key)
+        if value is not MISSING:
+            return value
+        value = await self._flights.do_async(key, coroutine_fn)
+        if value is not None:
+            self.set_local(key, value)
+        return copy.deepcopy(value)
+
+    def _invalidate_shared(self, keys):
+        for key in keys:
+            self._l1.invalidate(key)
+        server = self._server()
+        if server is None:
+            return
+        try:
+            server.delete(*[self._key(key) for key in keys])
+            server.publish(self.channel, json.dumps(list(keys)))
+        except Exception:
+            # Other workers' L1 entries expire after Config.CACHE_L1_TTL
+            self.l2_errors += 1
+
+    def invalidate(self, *keys):
+        """Drops keys in every worker; inside a unit of work, once its writes are committed."""
+        keys = [key for key in keys if key]
+        if not keys:
+            return
+        for key in keys:
+            self._l1.invalidate(key)
+        unit = unit_of_work.current()
+        if unit is not None:
+            unit.after_commit(lambda: self._invalidate_shared(keys))
+        else:
+            self._invalidate_shared(keys)
+
+    def stats(self):
+        return dict(self._l1.stats(), l2_hits=self.l2_hits, l2_misses=self.l2_misses, l2_errors=self.l2_errors)
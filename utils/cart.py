@@ -0,0 +1,206 @@
+"""
+Cart items live in 'users/<uid>/cart_items'; their totals are kept in one summary
+document, 'users/<uid>/cart/summary', which every add and remove updates in the same
+transaction as the item. Reading a cart's totals is therefore a single document read.
+
+Summary shape:
+    {'item_count': 3, 'line_count': 2, 'subtotals': {'shirt': 10.0, 'suit': 20.0},
+     'grand_total': 30.0, 'version': 7, 'updated_at': <server timestamp>}
+
+Carts created before the summary existed get one built from their items on first use.
+
+checkout() turns the cart into an 'orders/<order_id>' document in one transaction.
+"""
+from firebase_admin import firestore
+from storage import db, run_transaction
+from utils.id_generator import generate_order_id
+from utils.pagination import DEFAULT_PAGE_SIZE, paginate
+from utils.pricing import get_pricing_engine
+
+CART_ITEMS_COLLECTION = 'cart_items'
+CART_SUMMARY_PATH = ('cart', 'summary')
+
+
+def cart_items_ref(uid):
+    return db.collection('users').document(uid).collection(CART_ITEMS_COLLECTION)
+
+
+def cart_items_query(uid):
+    """The cart lines as a Query: Transaction.get() takes documents and queries, not collections."""
+    return cart_items_ref(uid).order_by('__name__')
+
+
+def cart_summary_ref(uid):
+    collection, document = CART_SUMMARY_PATH
+    return db.collection('users').document(uid).collection(collection).document(document)
+
+
+def _line_total(item):
+    if item.get('total_price') is not None:
+        return float(item['total_price'])
+    return float(item.get('price') or 0) * (item.get('quantity') or 1)
+
+
+def _apply(summary, item, sign):
+    """Adds (sign=1) or subtracts (sign=-1) one cart line from the summary in place."""
+    category = item.get('name') or 'other'
+    amount = sign * _line_total(item)
+    subtotal = round(summary['subtotals'].get(category, 0.0) + amount, 2)
+    if subtotal > 0:
+        summary['subtotals'][category] = subtotal
+    else:
+        summary['subtotals'].pop(category, None)
+    summary['item_count'] += sign * (item.get('quantity') or 1)
+    summary['line_count'] += sign
+    summary['grand_total'] = round(summary['grand_total'] + amount, 2)
+
+
+def _empty_summary():
+    return {'item_count': 0, 'line_count': 0, 'subtotals': {}, 'grand_total': 0.0, 'version': 0}
+
+
+def _read_summary(transaction, uid):
+    summary_doc = cart_summary_ref(uid).get(transaction=transaction)
+    if summary_doc.exists:
+        return summary_doc.to_dict()
+
+    # First touch of a cart that predates the summary: build it from the items
+    summary = _empty_summary()
+    for item in transaction.get(cart_items_query(uid)):
+        _apply(summary, item.to_dict(), 1)
+    return summary
+
+
+def _write_summary(transaction, uid, summary):
+    summary.pop('updated_at', None)
+    summary['version'] = summary.get('version', 0) + 1
+    transaction.set(cart_summary_ref(uid), dict(summary, updated_at=firestore.SERVER_TIMESTAMP))
+    return summary
+
+
+def _add_item(transaction, uid, item_id, item):
+    item_ref = cart_items_ref(uid).document(item_id)
+    existing = item_ref.get(transaction=transaction)
+    summary = _read_summary(transaction, uid)
+
+    # Adding an item that is already in the cart replaces that line
+    if existing.exists:
+        _apply(summary, existing.to_dict(), -1)
+    _apply(summary, item, 1)
+
+    transaction.set(item_ref, item)
+    return _write_summary(transaction, uid, summary)
+
+
+def _remove_item(transaction, uid, item_id):
+    item_ref = cart_items_ref(uid).document(item_id)
+    existing = item_ref.get(transaction=transaction)
+    if not existing.exists:
+        return None
+
+    summary = _read_summary(transaction, uid)
+    _apply(summary, existing.to_dict(), -1)
+
+    transaction.delete(item_ref)
+    return _write_summary(transaction, uid, summary)
+
+
+def list_cart_items(uid, page_size=DEFAULT_PAGE_SIZE, page_token=None):
+    """Returns (items, next_page_token) ordered by item ID."""
+    item_docs, next_page_token = paginate(cart_items_ref(uid), '__name__', page_size, page_token)
+    return [dict(doc.to_dict(), item_id=doc.id) for doc in item_docs], next_page_token
+
+
+def add_to_cart(uid, item_id, item):
+    """Writes the cart line and updates the summary atomically. Returns the new summary."""
+    return run_transaction(_add_item, uid, item_id, item)
+
+
+def remove_from_cart(uid, item_id):
+    """Deletes the cart line and updates the summary atomically. Returns the new summary, or None if absent."""
+    return run_transaction(_remove_item, uid, item_id)
+
+
+def _load_summary(transaction, uid):
+    summary = _read_summary(transaction, uid)
+    # A summary just built from the items has version 0 and still needs storing
+    return summary if summary.get('version') else _write_summary(transaction, uid, summary)
+
+
+def get_cart_summary(uid):
+    """Returns the cart totals: one document read once the summary exists."""
+    summary_doc = cart_summary_ref(uid).get()
+    if summary_doc.exists:
+        return summary_doc.to_dict()
+    return run_transaction(_load_summary, uid)
+
+
+class EmptyCartError(ValueError):
+    pass
+
+
+def _price_items(items, promo_code):
+    """Re-prices cart lines at current prices; lines the engine no longer knows keep their cart price."""
+    engine = get_pricing_engine()
+    names = [item.get('name') or '' for item in items]
+    quantities = [item.get('quantity') or 1 for item in items]
+    weights = [item.get('weight') or 0 for item in items]
+    quote = engine.quote(names, quantities, weights, promo_code=promo_code)
+
+    lines = []
+    for item, quantity, unit_price, discount, line_total, unknown in zip(
+            items, quantities, quote['unit_prices'].tolist(), quote['discounts'].tolist(),
+            quote['line_totals'].tolist(), quote['unknown'].tolist()):
+        if unknown:
+            unit_price = float(item.get('price') or 0)
+            line_total = round(unit_price * quantity, 2)
+        lines.append(dict(item, quantity=quantity, price=unit_price, discount=discount, total_price=line_total))
+
+    subtotal = round(sum(line['price'] * line['quantity'] for line in lines), 2)
+    discount = round(sum(line['discount'] for line in lines), 2)
+    return lines, subtotal, discount, round(subtotal - discount, 2)
+
+
+def _checkout(transaction, uid, user_id, order_id, promo_code):
+    # All reads come first: the cart lines and the summary's version
+    item_docs = list(transaction.get(cart_items_query(uid)))
+    summary_doc = cart_summary_ref(uid).get(transaction=transaction)
+    if not item_docs:
+        raise EmptyCartError('Cart is empty.')
+
+    items = [dict(doc.to_dict(), item_id=doc.id) for doc in item_docs]
+    lines, subtotal, discount, total = _price_items(items, promo_code)
+
+    order = {
+        'order_id': order_id,
+        'customer_id': user_id,
+        'uid': uid,
+        'items': lines,
+        'item_count': sum(line['quantity'] for line in lines),
+        'subtotal': subtotal,
+        'discount': discount,
+        'total': total,
+        'promo_code': promo_code,
+        'status': 'pending',
+    }
+    transaction.create(db.collection('orders').document(order_id), dict(order, created_at=firestore.SERVER_TIMESTAMP))
+
+    # Clear the cart in the same commit
+    for doc in item_docs:
+        transaction.delete(doc.reference)
+    summary = _empty_summary()
+    summary['version'] = summary_doc.to_dict().get('version', 0) if summary_doc.exists else 0
+    _write_summary(transaction, uid, summary)
+
+    return order
+
+
+def checkout(uid, user_id, promo_code=None):
+    """
+    Converts the cart into an order in one transaction: reads and re-prices the cart,
+    creates 'orders/<order_id>' and deletes the cart lines. A concurrent second checkout
+    is retried by Firestore, finds the cart empty and raises EmptyCartError.
+    """
+    # Leased outside the transaction (which may retry); a failed checkout leaves a gap in order IDs
+    order_id = generate_order_id()
+    return run_transaction(_checkout, uid, user_id, order_id, promo_code)
@@ -0,0 +1,255 @@
+"""
+Delivery dispatch.
+
+One dispatch cycle:
+  1. loads pending work: 'orders' and 'hampers' with status 'pending' and a customer;
+  2. resolves each customer's address_details.zip_code with batched get_all reads;
+  3. groups the stops by ZIP and assigns the groups to available drivers, limited by
+     each driver's remaining capacity (from vehicle_type, or a 'capacity' field);
+  4. writes one 'deliveries/<delivery_id>' document per stop and marks the order
+     'assigned', both in the same batch, 250 stops per commit.
+
+Assignment works in rounds on a (ZIP groups x drivers) cost matrix: the cost is the
+ZIP distance (see zip_distance_matrix), a small load term that spreads work and a
+penalty for splitting a group.
+Each round solves the matrix with scipy's linear_sum_assignment when SciPy is
+installed, or a vectorized greedy pass otherwise; a group larger than the chosen
+driver's remaining room is split and the rest waits for the next round.
+Delivery IDs are derived from the order, so two concurrent cycles cannot assign the
+same order twice: the second create() fails and its chunk is reported.
+"""
+import uuid
+from collections import defaultdict
+import numpy as np
+from firebase_admin import firestore
+from storage import db
+from utils.bulk_writes import commit_in_chunks
+from utils.user_index import USER_INDEX_COLLECTION
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # SciPy is optional; the greedy pass is used instead
+    linear_sum_assignment = None
+
+# Stops per dispatch cycle a driver can take, by vehicle type
+VEHICLE_CAPACITY = {'bike': 4, 'car': 10, 'suv': 14, 'van': 25, 'truck': 40}
+DEFAULT_CAPACITY = 10
+DEFAULT_MAX_STOPS = 5000
+# Weight of a driver's current load (0..1) relative to one step of ZIP distance
+LOAD_WEIGHT = 0.5
+# Extra cost, in ZIP-distance steps, of splitting a ZIP group across drivers
+SPLIT_PENALTY = 1.0
+_INFEASIBLE = 1e9
+
+PENDING_SOURCES = ('orders', 'hampers')
+
+
+def _zip_digits(zip_codes):
+    """(n, 5) array of ZIP digits; unknown or malformed ZIPs become -1s."""
+    digits = np.full((len(zip_codes), 5), -1, dtype=np.int8)
+    for i, zip_code in enumerate(zip_codes):
+        zip5 = (zip_code or '')[:5]
+        if len(zip5) == 5 and zip5.isdigit():
+            digits[i] = np.frombuffer(zip5.encode(), dtype=np.uint8) - ord('0')
+    return digits
+
+
+def zip_distance_matrix(from_zips, to_zips):
+    """
+    Distance proxy between ZIP codes: 5 minus the length of their common prefix, so
+    0 for the same ZIP, 2 for the same 3-digit sectional center and 5 when unknown.
+    """
+    a, b = _zip_digits(from_zips), _zip_digits(to_zips)
+    same = (a[:, None, :] == b[None, :, :]) & (a[:, None, :] >= 0)
+    prefix = np.cumprod(same, axis=2).sum(axis=2)
+    return (5 - prefix).astype(np.float64)
+
+
+def _greedy_assignment(cost):
+    """
+    Vectorized greedy matching: every row picks its cheapest column and, where rows
+    collide on a column, the cheapest row keeps it. Unmatched rows wait for the next round.
+    """
+    best = cost.argmin(axis=1)
+    best_cost = cost[np.arange(cost.shape[0]), best]
+    rows = np.argsort(best_cost, kind='stable')
+    rows = rows[best_cost[rows] < _INFEASIBLE]
+    _, first = np.unique(best[rows], return_index=True)
+    rows = rows[first]
+    return rows, best[rows]
+
+
+def _assignment(cost):
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    return _greedy_assignment(cost)
+
+
+def plan_assignments(stop_zips, driver_zips, capacities, loads=None, distance=zip_distance_matrix):
+    """
+    Assigns stops to drivers. Returns an array with the driver index for every stop,
+    or -1 where no driver had capacity left. Stops sharing a ZIP go to one driver
+    unless none has room for the whole group, in which case it is split.
+    """
+    capacities = np.asarray(capacities, dtype=np.int64)
+    remaining = capacities - (np.zeros_like(capacities) if loads is None else np.asarray(loads, dtype=np.int64))
+    assigned = np.full(len(stop_zips), -1, dtype=np.int64)
+    if not len(stop_zips) or not len(capacities):
+        return assigned
+
+    by_zip = defaultdict(list)
+    for stop_index, zip_code in enumerate(stop_zips):
+        by_zip[(zip_code or '')[:5]].append(stop_index)
+    base_cost = distance(list(by_zip), driver_zips)
+
+    # Pending groups as [row in base_cost, stop indices]
+    groups = [[row, stops] for row, stops in enumerate(by_zip.values())]
+    safe_capacity = np.maximum(capacities, 1)
+
+    # Each round gives every driver with room at most one group (or the part of it that fits)
+    while groups and (remaining > 0).any():
+        sizes = np.array([len(stops) for _, stops in groups])
+        load = 1.0 - remaining / safe_capacity
+        cost = (base_cost[[row for row, _ in groups]]
+                + LOAD_WEIGHT * load[None, :]
+                + SPLIT_PENALTY * (sizes[:, None] > remaining[None, :]))
+        cost = np.where(remaining[None, :] > 0, cost, _INFEASIBLE)
+
+        group_indices, driver_indices = _assignment(cost)
+        for group_index, driver_index in zip(group_indices.tolist(), driver_indices.tolist()):
+            if cost[group_index, driver_index] >= _INFEASIBLE:
+                continue
+            stops = groups[group_index][1]
+            take = min(len(stops), int(remaining[driver_index]))
+            assigned[stops[:take]] = driver_index
+            remaining[driver_index] -= take
+            groups[group_index][1] = stops[take:]
+        groups = [group for group in groups if group[1]]
+
+    return assigned
+
+
+def _driver_capacity(driver):
+    if driver.get('capacity'):
+        return int(driver['capacity'])
+    return VEHICLE_CAPACITY.get(str(driver.get('vehicle_type') or '').lower(), DEFAULT_CAPACITY)
+
+
+def load_drivers():
+    """Available drivers with their capacity and the stops already assigned to them."""
+    drivers = []
+    for doc in db.collection('drivers').stream():
+        driver = doc.to_dict()
+        if driver.get('available', True) is False or not driver.get('driver_id'):
+            continue
+        drivers.append({
+            'uid': doc.id,
+            'driver_id': driver['driver_id'],
+            'zip_code': driver.get('zip_code') or (driver.get('address_details') or {}).get('zip_code'),
+            'capacity': _driver_capacity(driver),
+        })
+
+    # Current load: deliveries assigned but not yet picked up, from one query
+    load = defaultdict(int)
+    for doc in db.collection('deliveries').where('status', '==', 'assigned').select(['driver_id']).stream():
+        load[doc.get('driver_id')] += 1
+    for driver in drivers:
+        driver['load'] = load[driver['driver_id']]
+    return drivers
+
+
+def load_pending_stops(max_stops=DEFAULT_MAX_STOPS):
+    """Pending orders and hampers with the customer's address, resolved in batched reads."""
+    stops = []
+    for source in PENDING_SOURCES:
+        remaining = max_stops - len(stops)
+        if remaining <= 0:
+            break
+        # Only stops with a customer: unowned inventory hampers (/create_hamper) are pending too.
+        # A string inequality also skips documents without the field.
+        query = (db.collection(source).where('status', '==', 'pending')
+                 .where('customer_id', '>', '').limit(remaining))
+        for doc in query.stream():
+            data = doc.to_dict()
+            stops.append({'source': source, 'id': doc.id, 'customer_id': data.get('customer_id'), 'uid': data.get('uid')})
+
+    # customer_id -> uid through the user_id index, for stops that do not carry the uid
+    missing = sorted({stop['customer_id'] for stop in stops if not stop['uid'] and stop['customer_id']})
+    index_refs = [db.collection(USER_INDEX_COLLECTION).document(customer_id) for customer_id in missing]
+    uids = {doc.id: doc.get('uid') for doc in db.get_all(index_refs) if doc.exists} if index_refs else {}
+    for stop in stops:
+        stop['uid'] = stop['uid'] or uids.get(stop['customer_id'])
+
+    user_refs = [db.collection('users').document(uid) for uid in sorted({stop['uid'] for stop in stops if stop['uid']})]
+    addresses = {}
+    if user_refs:
+        for doc in db.get_all(user_refs, field_paths=['address_details']):
+            if doc.exists:
+                addresses[doc.id] = doc.to_dict().get('address_details') or {}
+    for stop in stops:
+        stop['address_details'] = addresses.get(stop['uid']) or {}
+        stop['zip_code'] = stop['address_details'].get('zip_code')
+    return stops
+
+
+def dispatch(max_stops=DEFAULT_MAX_STOPS, dry_run=False):
+    """Runs one dispatch cycle. Returns a summary; with dry_run nothing is written."""
+    dispatch_id = uuid.uuid4().hex
+    stops = load_pending_stops(max_stops)
+    drivers = load_drivers()
+
+    routable = [stop for stop in stops if stop['zip_code']]
+    plan = plan_assignments(
+        [stop['zip_code'] for stop in routable],
+        [driver['zip_code'] for driver in drivers],
+        [driver['capacity'] for driver in drivers],
+        [driver['load'] for driver in drivers],
+    )
+
+    writes, assignments = [], []
+    for stop, driver_index in zip(routable, plan.tolist()):
+        if driver_index < 0:
+            continue
+        driver = drivers[driver_index]
+        delivery_id = f"DLV-{stop['source']}-{stop['id']}"
+        assignments.append({'delivery_id': delivery_id, 'driver_id': driver['driver_id'], 'zip_code': stop['zip_code']})
+        # The delivery and the order update go in the same batch (chunks hold whole pairs)
+        writes.append(('create', db.collection('deliveries').document(delivery_id), {
+            'delivery_id': delivery_id,
+            'dispatch_id': dispatch_id,
+            'driver_id': driver['driver_id'],
+            'driver_uid': driver['uid'],
+            'source': stop['source'],
+            'order_id': stop['id'],
+            'customer_id': stop['customer_id'],
+            'uid': stop['uid'],
+            'zip_code': stop['zip_code'],
+            'address_details': stop['address_details'],
+            'status': 'assigned',
+            'created_at': firestore.SERVER_TIMESTAMP,
+        }))
+        writes.append(('update', db.collection(stop['source']).document(stop['id']), {
+            'status': 'assigned',
+            'driver_id': driver['driver_id'],
+            'delivery_id': delivery_id,
+        }))
+
+    failed_chunks = []
+    if not dry_run:
+        for result in commit_in_chunks(writes):
+            if not result['committed']:
+                failed_chunks.append({'chunk': result['chunk'], 'stops': result['count'] // 2, 'error': result['error']})
+
+    failed_stops = sum(chunk['stops'] for chunk in failed_chunks)
+    return {
+        'dispatch_id': dispatch_id,
+        'dry_run': dry_run,
+        'pending': len(stops),
+        'assigned': len(assignments) - failed_stops,
+        'unassigned': int((plan < 0).sum()),
+        'missing_zip': len(stops) - len(routable),
+        'drivers_available': len(drivers),
+        'drivers_used': len({a['driver_id'] for a in assignments}),
+        'failed_chunks': failed_chunks,
+        'assignments': assignments if dry_run else None,
+    }
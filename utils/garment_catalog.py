@@ -0,0 +1,130 @@
+"""
+Read-through cache of the 'garments' collection.
+
+Garment prices rarely change, so add-to-cart reads them from a per-worker TTLCache
+instead of Firestore. Freshness comes from an on_snapshot listener on the collection,
+started on first use: every add, change or delete patches the cached entry as soon as
+Firestore pushes it (typically well under a second). The cache is only trusted while
+that listener is active; if it stops, reads go to Firestore and the listener is
+restarted on the next call. Config.GARMENT_CACHE_TTL bounds an entry's life regardless.
+
+Entries are versioned by the document's update_time, so a read that raced with a
+change cannot put the older price back.
+"""
+import threading
+from config import Config
+from storage import db, unit_of_work
+from utils.cache import MISSING, TTLCache
+from utils.singleflight import SingleFlight
+
+GARMENTS_COLLECTION = 'garments'
+
+_cache = TTLCache('garments', Config.GARMENT_CACHE_SIZE, Config.GARMENT_CACHE_TTL)
+_flights = SingleFlight('garments')
+_watch = None
+_watch_lock = threading.Lock()
+
+
+def _on_snapshot(documents, changes, read_time):
+    for change in changes:
+        document = change.document
+        if change.type.name == 'REMOVED':
+            _cache.set(document.id, None, read_time)
+        else:
+            _cache.set(document.id, document.to_dict(), document.update_time)
+
+
+def _listening():
+    """Starts the collection listener if it is not running. Returns whether the cache can be trusted."""
+    global _watch
+    if _watch is not None and getattr(_watch, 'is_active', True):
+        return True
+    with _watch_lock:
+        if _watch is None or not getattr(_watch, 'is_active', True):
+            # Whatever was cached while no listener ran may be stale
+            _cache.clear()
+            try:
+                _watch = db.collection(GARMENTS_COLLECTION).on_snapshot(_on_snapshot)
+            except Exception:
+                _watch = None
+                return False
+    return True
+
+
+def _store(garment_id, snapshot):
+    garment = snapshot.to_dict() if snapshot.exists else None
+    _cache.set(garment_id, garment, snapshot.update_time if snapshot.exists else snapshot.read_time)
+    # Callers get their own copy; the cached dict is shared
+    return dict(garment) if garment is not None else None
+
+
+def get_garment(garment_id):
+    """Returns the garment document as a dict, or None if it does not exist."""
+    live = _listening()
+    if live:
+        garment = _cache.get(garment_id)
+        if garment is not MISSING:
+            return dict(garment) if garment is not None else None
+
+    # Concurrent misses on one garment share a single read
+    snapshot = _flights.do(garment_id, db.collection(GARMENTS_COLLECTION).document(garment_id).get)
+    return _store(garment_id, snapshot) if live else (snapshot.to_dict() if snapshot.exists else None)
+
+
+async def get_garment_async(adb, garment_id):
+    """get_garment() for async handlers: a miss is read with the async client."""
+    live = _listening()
+    if live:
+        garment = _cache.get(garment_id)
+        if garment is not MISSING:
+            return dict(garment) if garment is not None else None
+
+    snapshot = await _flights.do_async(garment_id, adb.collection(GARMENTS_COLLECTION).document(garment_id).get)
+    return _store(garment_id, snapshot) if live else (snapshot.to_dict() if snapshot.exists else None)
+
+
+def get_garments(garment_ids):
+    """Batched get_garment(): {garment_id: garment or None}, with one get_all for the misses."""
+    live = _listening()
+    garments, missing = {}, []
+    for garment_id in garment_ids:
+        garment = _cache.get(garment_id) if live else MISSING
+        if garment is MISSING:
+            missing.append(garment_id)
+        else:
+            garments[garment_id] = dict(garment) if garment is not None else None
+
+    if missing:
+        refs = [db.collection(GARMENTS_COLLECTION).document(garment_id) for garment_id in missing]
+        for snapshot in db.get_all(refs):
+            if live:
+                garments[snapshot.id] = _store(snapshot.id, snapshot)
+            else:
+                garments[snapshot.id] = snapshot.to_dict() if snapshot.exists else None
+    return garments
+
+
+def invalidate_garment(garment_id):
+    """
+    Drops a garment this worker just wrote; the listener delivers the new version shortly.
+    Inside a unit of work it is dropped again once the write is committed, so a read
+    made while the write was still buffered cannot keep the old version cached.
+    """
+    _cache.invalidate(garment_id)
+    unit = unit_of_work.current()
+    if unit is not None:
+        unit.after_commit(lambda: _cache.invalidate(garment_id))
+
+
+def catalog_stats():
+    return dict(_cache.stats(), listening=_watch is not None and getattr(_watch, 'is_active', True))
+
+
+def stop_listener():
+    """Stops the listener (e.g. before fork or when switching storage backends); the cache is cleared."""
+    global _watch
+    with _watch_lock:
+        if _watch is not None:
+            _watch.unsubscribe()
+            _watch = None
+        _cache.clear()
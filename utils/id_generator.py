@@ -1,14 +1,72 @@
-from firebase import db
+import os
+import threading
+from storage import db, run_transaction
+from config import Config
 
-def generate_id(prefix, counter_name, padding):
-    counter_ref = db.collection('counters').document(counter_name)
-    counter_doc = counter_ref.get()
-    
-    current_id = counter_doc.to_dict().get('current_id', 0) + 1 if counter_doc.exists else 1
-    counter_ref.set({'current_id': current_id})
+# IDs are leased from 'counters/<name>' in blocks (hi/lo) so that most calls
+# are served from memory. Each worker process keeps its own block per counter;
+# unused IDs in a block are simply skipped when the process exits.
+_blocks = {}          # counter_name -> [next_id, last_id]
+_locks = {}           # counter_name -> threading.Lock
+_registry_lock = threading.Lock()
+
+
+def _reset_blocks():
+    """Drops every leased block (called in the child after a fork)."""
+    global _registry_lock
+    _blocks.clear()
+    _locks.clear()
+    _registry_lock = threading.Lock()
+
+
+# Blocks leased by a preloading parent must never be handed out twice.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_blocks)
+
+
+def _counter_lock(counter_name):
+    with _registry_lock:
+        lock = _locks.get(counter_name)
+        if lock is None:
+            lock = _locks[counter_name] = threading.Lock()
+        return lock
+
+
+def _lease_block(transaction, counter_ref, size):
+    snapshot = counter_ref.get(transaction=transaction)
+    current_id = snapshot.to_dict().get('current_id', 0) if snapshot.exists else 0
+    transaction.set(counter_ref, {'current_id': current_id + size})
+    return current_id + 1, current_id + size
 
+
+def allocate_ids(counter_name, count=1):
+    """Returns `count` unique integers from the named counter."""
+    block_size = max(Config.ID_BLOCK_SIZE, 1)
+    ids = []
+
+    with _counter_lock(counter_name):
+        while len(ids) < count:
+            block = _blocks.get(counter_name)
+            if block is None or block[0] > block[1]:
+                # Lease enough for the rest of this request in a single round trip
+                size = max(block_size, count - len(ids))
+                counter_ref = db.collection('counters').document(counter_name)
+                block = _blocks[counter_name] = list(run_transaction(_lease_block, counter_ref, size))
+
+            take = min(count - len(ids), block[1] - block[0] + 1)
+            ids.extend(range(block[0], block[0] + take))
+            block[0] += take
+
+    return ids
+
+
+def generate_id(prefix, counter_name, padding):
+    current_id = allocate_ids(counter_name)[0]
     return f"{prefix}{str(current_id).zfill(padding)}"
 
+def generate_ids(prefix, counter_name, padding, count):
+    return [f"{prefix}{str(current_id).zfill(padding)}" for current_id in allocate_ids(counter_name, count)]
+
 # Specific ID Generators
 def generate_user_id():
     return generate_id('USER', 'user_counter', 4)
@@ -25,5 +83,8 @@ def generate_order_id():
 def generate_garment_id():
     return generate_id('GARM', 'garment_counter', 5)
 
+def generate_garment_ids(count):
+    return generate_ids('GARM', 'garment_counter', 5, count)
+
 def generate_credit_card_id():
     return generate_id('CREDI_TCARD', 'garment_counter', 5)
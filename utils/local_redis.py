@@ -0,0 +1,120 @@
+"""
+Process-local stand-in for a Redis server.
+
+Implements the subset of the redis-py client that utils.cache uses (get, mget, set
+with expiry, pipelined sets, delete, publish and pubsub subscriptions), so both tiers
+of the cache can be exercised without a server, e.g. TwoTierCache(name, redis=LocalRedis()).
+Several caches sharing one LocalRedis behave like workers sharing one Redis: a publish
+reaches every subscriber. It is never used on its own: without REDIS_URL the cache is L1 only.
+"""
+import queue
+import threading
+import time
+
+
+class LocalPubSub:
+    def __init__(self, server):
+        self._server = server
+        self._messages = queue.Queue()
+        self._channels = set()
+
+    def subscribe(self, *channels):
+        for channel in channels:
+            self._channels.add(channel)
+            self._server._subscribe(channel, self)
+            self._messages.put({'type': 'subscribe', 'channel': channel.encode(), 'data': len(self._channels)})
+
+    def _deliver(self, channel, message):
+        self._messages.put({'type': 'message', 'channel': channel.encode(), 'data': message})
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        deadline = time.monotonic() + (timeout or 0.0)
+        while True:
+            try:
+                message = self._messages.get(timeout=max(deadline - time.monotonic(), 0.0)) if timeout else self._messages.get_nowait()
+            except queue.Empty:
+                return None
+            if not (ignore_subscribe_messages and message['type'] == 'subscribe'):
+                return message
+
+    def listen(self):
+        while True:
+            yield self._messages.get()
+
+    def close(self):
+        for channel in self._channels:
+            self._server._unsubscribe(channel, self)
+        self._channels.clear()
+
+
+class LocalPipeline:
+    def __init__(self, server):
+        self._server = server
+        self._commands = []
+
+    def set(self, name, value, ex=None):
+        self._commands.append((name, value, ex))
+        return self
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        return [self._server.set(name, value, ex=ex) for name, value, ex in commands]
+
+
+class LocalRedis:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}       # key -> (expires_at or None, bytes)
+        self._subscribers = {}  # channel -> [LocalPubSub]
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def get(self, name):
+        with self._lock:
+            entry = self._values.get(name)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._values[name]
+                return None
+            return entry[1]
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._values[name] = (time.monotonic() + ex if ex else None, self._encode(value))
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._values.pop(name, None) is not None for name in names)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._deliver(channel, self._encode(message))
+        return len(subscribers)
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    def pubsub(self, **kwargs):
+        return LocalPubSub(self)
+
+    def flushall(self):
+        with self._lock:
+            self._values.clear()
+
+    def _subscribe(self, channel, pubsub):
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(pubsub)
+
+    def _unsubscribe(self, channel, pubsub):
+        with self._lock:
+            if pubsub in self._subscribers.get(channel, []):
+                self._subscribers[channel].remove(pubsub)
@@ -0,0 +1,233 @@
+"""
+Request and storage metrics exposed in Prometheus text format on /metrics.
+
+Every worker thread aggregates into its own counters, so recording a request or a
+Firestore operation never takes a lock; /metrics merges the per-thread tables. When a
+thread (or greenlet) ends, its table is folded into one retired table, so the number
+of tables tracks the live threads rather than every thread ever started. The
+counters of the caches (utils.cache), of request coalescing (utils.singleflight) and
+of the status streams (utils.status_stream) are reported alongside.
+"""
+import threading
+import time
+import weakref
+from flask import Response, g, request
+from storage import tracing
+from utils.cache import registered_caches
+from utils.singleflight import registered_flights
+from utils.status_stream import status_hub
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_local = threading.local()
+_all_stats = set()
+_dead_stats = []          # tables of finished threads, folded into _retired under the lock
+_registry_lock = threading.Lock()
+
+
+class _ThreadStats:
+    def __init__(self):
+        self.requests = {}        # (endpoint, method, status) -> count
+        self.latency = {}         # endpoint -> [bucket counts..., +Inf count, sum seconds]
+        self.ops = {}             # (endpoint, kind) -> count
+        self.ops_outside = {}     # kind -> count (background work, startup)
+
+    def merge(self, other):
+        for key, count in list(other.requests.items()):
+            self.requests[key] = self.requests.get(key, 0) + count
+        for endpoint, histogram in list(other.latency.items()):
+            merged = self.latency.setdefault(endpoint, [0] * len(histogram))
+            for index, value in enumerate(list(histogram)):
+                merged[index] += value
+        for key, count in list(other.ops.items()):
+            self.ops[key] = self.ops.get(key, 0) + count
+        for kind, count in list(other.ops_outside.items()):
+            self.ops_outside[kind] = self.ops_outside.get(kind, 0) + count
+
+
+class _Owner:
+    """Held only by the thread-local, so it is collected when its thread ends."""
+
+
+_retired = _ThreadStats()
+
+
+def _fold_dead_stats():
+    # Caller holds _registry_lock
+    while _dead_stats:
+        stats = _dead_stats.pop()
+        _all_stats.discard(stats)
+        _retired.merge(stats)
+
+
+def _stats():
+    stats = getattr(_local, 'stats', None)
+    if stats is None:
+        stats = _local.stats = _ThreadStats()
+        _local.owner = _Owner()
+        # May run on any thread, at garbage collection: only queue the table here
+        weakref.finalize(_local.owner, _dead_stats.append, stats)
+        with _registry_lock:
+            _fold_dead_stats()
+            _all_stats.add(stats)
+    return stats
+
+
+def _on_storage_op(kind, target, count):
+    if kind == 'query':
+        count = 1
+    elif kind == 'query_results':
+        kind = 'read'  # documents returned by a query are billed as reads
+    ops = getattr(_local, 'request_ops', None)
+    if ops is not None:
+        ops[kind] = ops.get(kind, 0) + count
+    else:
+        outside = _stats().ops_outside
+        outside[kind] = outside.get(kind, 0) + count
+
+
+def _before_request():
+    if request.endpoint == 'metrics':
+        return
+    _local.request_ops = {}
+    g.metrics_started = time.perf_counter()
+
+
+def _record(status_code):
+    started = g.pop('metrics_started', None)
+    ops, _local.request_ops = getattr(_local, 'request_ops', None), None
+    if started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'unmatched'
+    stats = _stats()
+
+    key = (endpoint, request.method, status_code)
+    stats.requests[key] = stats.requests.get(key, 0) + 1
+
+    histogram = stats.latency.get(endpoint)
+    if histogram is None:
+        histogram = stats.latency[endpoint] = [0] * (len(LATENCY_BUCKETS) + 2)
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if elapsed <= bound:
+            histogram[index] += 1
+            break
+    else:
+        histogram[len(LATENCY_BUCKETS)] += 1
+    histogram[-1] += elapsed
+
+    for kind, count in (ops or {}).items():
+        op_key = (endpoint, kind)
+        stats.ops[op_key] = stats.ops.get(op_key, 0) + count
+
+
+def _after_request(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    # Only reached with a pending timer when the view raised before producing a response
+    if exc is not None:
+        _record(500)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics():
+    total = _ThreadStats()
+    with _registry_lock:
+        _fold_dead_stats()
+        total.merge(_retired)
+        all_stats = list(_all_stats)
+
+    for stats in all_stats:
+        total.merge(stats)
+    requests, latency, ops, outside = total.requests, total.latency, total.ops, total.ops_outside
+
+    lines = [
+        '# HELP laundryless_requests_total HTTP requests by route, method and status code.',
+        '# TYPE laundryless_requests_total counter',
+    ]
+    for (endpoint, method, status), count in sorted(requests.items()):
+        lines.append(f'laundryless_requests_total{{route="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}')
+
+    lines += [
+        '# HELP laundryless_request_duration_seconds Request latency by route.',
+        '# TYPE laundryless_request_duration_seconds histogram',
+    ]
+    for endpoint, histogram in sorted(latency.items()):
+        route = _escape(endpoint)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, histogram):
+            cumulative += count
+            lines.append(f'laundryless_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+        cumulative += histogram[len(LATENCY_BUCKETS)]
+        lines.append(f'laundryless_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {cumulative}')
+        lines.append(f'laundryless_request_duration_seconds_sum{{route="{route}"}} {histogram[-1]:.6f}')
+        lines.append(f'laundryless_request_duration_seconds_count{{route="{route}"}} {cumulative}')
+
+    lines += [
+        '# HELP laundryless_storage_ops_total Firestore documents read/written, queries and Auth API calls by route.',
+        '# TYPE laundryless_storage_ops_total counter',
+    ]
+    for (endpoint, kind), count in sorted(ops.items()):
+        lines.append(f'laundryless_storage_ops_total{{route="{_escape(endpoint)}",op="{kind}"}} {count}')
+    for kind, count in sorted(outside.items()):
+        lines.append(f'laundryless_storage_ops_total{{route="none",op="{kind}"}} {count}')
+
+    lines += [
+        '# HELP laundryless_cache_events_total In-process cache lookups and removals by cache and result.',
+        '# TYPE laundryless_cache_events_total counter',
+    ]
+    caches = sorted(registered_caches().items())
+    for name, cache in caches:
+        stats = cache.stats()
+        for event, count in stats.items():
+            if event != 'size':
+                lines.append(f'laundryless_cache_events_total{{cache="{_escape(name)}",event="{event}"}} {count}')
+    lines += [
+        '# HELP laundryless_cache_entries Entries currently held by each in-process cache.',
+        '# TYPE laundryless_cache_entries gauge',
+    ]
+    for name, cache in caches:
+        lines.append(f'laundryless_cache_entries{{cache="{_escape(name)}"}} {len(cache)}')
+
+    lines += [
+        '# HELP laundryless_singleflight_calls_total Coalesced reads: calls that ran (leader) or joined one in flight (shared).',
+        '# TYPE laundryless_singleflight_calls_total counter',
+    ]
+    for name, flight in sorted(registered_flights().items()):
+        stats = flight.stats()
+        for role, count in (('leader', stats['leaders']), ('shared', stats['shared'])):
+            lines.append(f'laundryless_singleflight_calls_total{{name="{_escape(name)}",role="{role}"}} {count}')
+
+    streams = status_hub.stats()
+    lines += [
+        '# HELP laundryless_stream_clients Server-Sent Events status streams connected to this worker.',
+        '# TYPE laundryless_stream_clients gauge',
+        f'laundryless_stream_clients {streams["clients"]}',
+        '# HELP laundryless_stream_events_total Status changes seen by the listeners and their delivery to client queues.',
+        '# TYPE laundryless_stream_events_total counter',
+    ]
+    for event in ('changes', 'queued', 'coalesced', 'overflow'):
+        lines.append(f'laundryless_stream_events_total{{event="{event}"}} {streams.get(event, 0)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    """Times every request and counts the storage operations it issues."""
+    tracing.add_listener(_on_storage_op)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
@@ -0,0 +1,109 @@
+"""
+Cursor pagination for Firestore queries.
+
+paginate() orders a query by one field plus the document ID (so ties have a stable
+order), fetches page_size + 1 documents to learn whether another page exists, and
+returns an opaque token holding the last document's sort values. The next call
+resumes with start_after() on those values, so each page costs page_size reads no
+matter how deep into the history it is.
+
+Equality filters combined with an order on another field need composite indexes;
+they are declared in firestore.indexes.json (`firebase deploy --only firestore:indexes`).
+"""
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+ASCENDING = 'ASCENDING'
+DESCENDING = 'DESCENDING'
+
+
+# Swagger parameters shared by the paginated list endpoints
+PAGE_PARAMETERS = [
+    {
+        'name': 'page_size',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': f'Items per page (default {DEFAULT_PAGE_SIZE}, max {MAX_PAGE_SIZE})'
+    },
+    {
+        'name': 'page_token',
+        'in': 'query',
+        'type': 'string',
+        'required': False,
+        'description': 'next_page_token returned by the previous page'
+    }
+]
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$ts': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$ts' in value:
+        return datetime.fromisoformat(value['$ts'])
+    return value
+
+
+def encode_page_token(order_by, value, document_id):
+    payload = json.dumps({'f': order_by, 'v': _encode_value(value), 'id': document_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_page_token(token, order_by):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        field, value, document_id = payload['f'], _decode_value(payload['v']), payload['id']
+    except (ValueError, KeyError, TypeError):
+        raise PaginationError('Invalid page_token.')
+    if field != order_by:
+        raise PaginationError('page_token belongs to a different listing.')
+    return value, document_id
+
+
+def page_args(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Reads page_size and page_token from request.args. Raises PaginationError on bad input."""
+    try:
+        page_size = int(args.get('page_size', default))
+    except ValueError:
+        raise PaginationError('page_size must be an integer.')
+    if page_size <= 0 or page_size > maximum:
+        raise PaginationError(f'page_size must be between 1 and {maximum}.')
+    return page_size, args.get('page_token') or None
+
+
+def paginate(query, order_by='__name__', page_size=DEFAULT_PAGE_SIZE, page_token=None, direction=ASCENDING):
+    """
+    Returns (documents, next_page_token) for one page of `query`.
+    next_page_token is None on the last page. Documents without the order_by field
+    are not returned (Firestore excludes them from ordered queries).
+    """
+    query = query.order_by(order_by, direction=direction)
+    if order_by != '__name__':
+        query = query.order_by('__name__', direction=direction)
+
+    if page_token:
+        value, document_id = decode_page_token(page_token, order_by)
+        cursor = {'__name__': document_id} if order_by == '__name__' else {order_by: value, '__name__': document_id}
+        query = query.start_after(cursor)
+
+    documents = list(query.limit(page_size + 1).stream())
+    if len(documents) <= page_size:
+        return documents, None
+
+    documents = documents[:page_size]
+    last = documents[-1]
+    value = last.id if order_by == '__name__' else last.get(order_by)
+    return documents, encode_page_token(order_by, value, last.id)
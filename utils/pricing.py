@@ -0,0 +1,187 @@
+"""
+Pricing engine.
+
+All pricing rules (per-garment prices, hamper weight tiers, partner overrides and
+promotions) are compiled once into NumPy arrays, so a quote for thousands of cart
+lines or hamper weights is a handful of vectorized operations instead of a Python
+loop per item.
+
+Rules come from the defaults below, merged with the optional 'pricing_rules/current'
+document:
+
+    {
+        'garment_prices': {'shirt': 5.0, ...},
+        'hamper': {'base_price': 10.0, 'max_weight': 20, 'tiers': [[10, 2.0]]},
+        'partner_overrides': {'<partner_id>': {'shirt': 4.5, 'hamper': 9.0}},
+        'promotions': {'<CODE>': {'percent_off': 10, 'items': ['shirt']}}
+    }
+
+A weight tier [start_lbs, rate] charges `rate` per lb above `start_lbs` until the next
+tier starts. A promotion without 'items' applies to every item. The compiled table
+is rebuilt at most every Config.PRICING_RULES_TTL seconds per process.
+"""
+import threading
+import time
+import numpy as np
+from config import Config
+from storage import db
+from utils.garment_prices import GARMENT_PRICE_MAP
+
+HAMPER = 'hamper'
+HAMPER_BASE_PRICE = 10.0
+HAMPER_MAX_WEIGHT = 20
+# $2 per lb over 10 lbs
+HAMPER_WEIGHT_TIERS = ((10, 2.0),)
+
+PRICING_RULES_DOCUMENT = ('pricing_rules', 'current')
+
+_engine = None
+_compiled_at = 0.0
+_lock = threading.Lock()
+
+
+class PricingError(ValueError):
+    pass
+
+
+class PricingEngine:
+    def __init__(self, garment_prices, hamper_base_price=HAMPER_BASE_PRICE, hamper_max_weight=HAMPER_MAX_WEIGHT,
+                 weight_tiers=HAMPER_WEIGHT_TIERS, partner_overrides=None, promotions=None):
+        base_prices = dict(garment_prices, **{HAMPER: hamper_base_price})
+        partner_overrides = partner_overrides or {}
+        promotions = promotions or {}
+
+        self.items = sorted(base_prices)
+        self.item_index = {name: i for i, name in enumerate(self.items)}
+        self.hamper_index = self.item_index[HAMPER]
+        self.hamper_max_weight = hamper_max_weight
+
+        # Row 0 holds the list prices; row k the prices for the k-th partner
+        self.partner_index = {partner_id: i + 1 for i, partner_id in enumerate(sorted(partner_overrides))}
+        self.prices = np.tile(np.array([base_prices[name] for name in self.items], dtype=np.float64),
+                              (len(self.partner_index) + 1, 1))
+        for partner_id, overrides in partner_overrides.items():
+            row = self.partner_index[partner_id]
+            for name, price in overrides.items():
+                if name in self.item_index:
+                    self.prices[row, self.item_index[name]] = float(price)
+
+        tiers = sorted((float(start), float(rate)) for start, rate in weight_tiers)
+        self.tier_starts = np.array([start for start, _ in tiers], dtype=np.float64)
+        self.tier_widths = np.diff(np.append(self.tier_starts, np.inf))
+        self.tier_rates = np.array([rate for _, rate in tiers], dtype=np.float64)
+
+        # Promotions: percent off per item, as a (promotions x items) matrix
+        self.promotion_index = {code.upper(): i for i, code in enumerate(sorted(promotions))}
+        self.promotion_rates = np.zeros((len(self.promotion_index), len(self.items)), dtype=np.float64)
+        for code, promotion in promotions.items():
+            row = self.promotion_index[code.upper()]
+            rate = float(promotion.get('percent_off', 0)) / 100.0
+            names = promotion.get('items')
+            if names:
+                columns = [self.item_index[name] for name in names if name in self.item_index]
+                self.promotion_rates[row, columns] = rate
+            else:
+                self.promotion_rates[row, :] = rate
+
+    @classmethod
+    def from_rules(cls, rules):
+        rules = rules or {}
+        hamper = rules.get('hamper') or {}
+        return cls(
+            garment_prices=dict(GARMENT_PRICE_MAP, **(rules.get('garment_prices') or {})),
+            hamper_base_price=hamper.get('base_price', HAMPER_BASE_PRICE),
+            hamper_max_weight=hamper.get('max_weight', HAMPER_MAX_WEIGHT),
+            weight_tiers=hamper.get('tiers') or HAMPER_WEIGHT_TIERS,
+            partner_overrides=rules.get('partner_overrides'),
+            promotions=rules.get('promotions'),
+        )
+
+    def _partner_row(self, partner_id):
+        if not partner_id:
+            return 0
+        # Partners without overrides pay list price
+        return self.partner_index.get(partner_id, 0)
+
+    def weight_surcharge(self, weights):
+        """Tiered per-lb charge for an array of hamper weights."""
+        weights = np.asarray(weights, dtype=np.float64)
+        over = np.clip(weights[:, None] - self.tier_starts[None, :], 0.0, self.tier_widths[None, :])
+        return over @ self.tier_rates
+
+    def price(self, name, partner_id=None):
+        index = self.item_index.get(name.lower())
+        return 0.0 if index is None else float(self.prices[self._partner_row(partner_id), index])
+
+    def hamper_price(self, weight, partner_id=None):
+        if weight > self.hamper_max_weight:
+            raise PricingError(f'Hamper weight exceeds the {self.hamper_max_weight:g} lb maximum.')
+        base = self.prices[self._partner_row(partner_id), self.hamper_index]
+        return round(float(base + self.weight_surcharge([weight])[0]), 2)
+
+    def quote(self, names, quantities, weights=None, partner_id=None, promo_code=None):
+        """
+        Prices parallel arrays of item names, quantities and (for hampers) weights.
+        Returns a dict of per-line arrays plus totals. Unknown items are priced at 0.
+        """
+        count = len(names)
+        index = np.fromiter((self.item_index.get(str(name).lower(), -1) for name in names), dtype=np.int64, count=count)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        weights = np.zeros(count) if weights is None else np.nan_to_num(np.asarray(weights, dtype=np.float64))
+
+        if quantities.shape != (count,) or weights.shape != (count,):
+            raise PricingError('names, quantities and weights must have the same length.')
+        if (quantities <= 0).any():
+            raise PricingError('Quantities must be positive.')
+
+        known = index >= 0
+        is_hamper = index == self.hamper_index
+        if (weights[is_hamper] > self.hamper_max_weight).any():
+            raise PricingError(f'Hamper weight exceeds the {self.hamper_max_weight:g} lb maximum.')
+
+        safe_index = np.where(known, index, 0)
+        unit_prices = np.where(known, self.prices[self._partner_row(partner_id), safe_index], 0.0)
+        unit_prices = unit_prices + np.where(is_hamper, self.weight_surcharge(weights), 0.0)
+        subtotals = unit_prices * quantities
+
+        discounts = np.zeros(count)
+        if promo_code:
+            row = self.promotion_index.get(promo_code.upper())
+            if row is None:
+                raise PricingError(f'Unknown promotion code: {promo_code}.')
+            discounts = np.where(known, subtotals * self.promotion_rates[row, safe_index], 0.0)
+
+        line_totals = np.round(subtotals - discounts, 2)
+        return {
+            'unit_prices': np.round(unit_prices, 2),
+            'discounts': np.round(discounts, 2),
+            'line_totals': line_totals,
+            'unknown': ~known,
+            'subtotal': round(float(subtotals.sum()), 2),
+            'discount': round(float(discounts.sum()), 2),
+            'total': round(float(line_totals.sum()), 2),
+        }
+
+
+def _load_rules():
+    collection, document = PRICING_RULES_DOCUMENT
+    rules_doc = db.collection(collection).document(document).get()
+    return rules_doc.to_dict() if rules_doc.exists else {}
+
+
+def get_pricing_engine():
+    """Returns the compiled engine, recompiling from 'pricing_rules/current' once the TTL has passed."""
+    global _engine, _compiled_at
+    if _engine is None or time.monotonic() - _compiled_at > Config.PRICING_RULES_TTL:
+        with _lock:
+            if _engine is None or time.monotonic() - _compiled_at > Config.PRICING_RULES_TTL:
+                _engine = PricingEngine.from_rules(_load_rules())
+                _compiled_at = time.monotonic()
+    return _engine
+
+
+def invalidate_pricing_engine():
+    """Forces the next get_pricing_engine() call to recompile, e.g. after editing the rules."""
+    global _engine
+    with _lock:
+        _engine = None
@@ -0,0 +1,59 @@
+"""
+Cached reads of user and driver profiles (see utils.cache.TwoTierCache).
+
+Every code path that writes a 'users' or 'drivers' document must call the matching
+invalidate_* function afterwards, so that other workers stop serving the old profile.
+"""
+from storage import db
+from utils.cache import TwoTierCache
+
+user_profiles = TwoTierCache('users')
+driver_profiles = TwoTierCache('drivers')
+PROFILE_CACHES = {'users': user_profiles, 'drivers': driver_profiles}
+
+
+def _load(collection, document_id):
+    doc = db.collection(collection).document(document_id).get()
+    return doc.to_dict() if doc.exists else None
+
+
+def _load_many(collection, document_ids):
+    refs = [db.collection(collection).document(document_id) for document_id in document_ids]
+    return {doc.id: doc.to_dict() if doc.exists else None for doc in db.get_all(refs)}
+
+
+def fetch_user_profile(uid):
+    """The 'users/<uid>' document as a dict, or None."""
+    if not uid:
+        return None
+    return user_profiles.get(uid, lambda: _load('users', uid))
+
+
+def fetch_driver_profile(uid):
+    """The 'drivers/<uid>' document as a dict, or None."""
+    if not uid:
+        return None
+    return driver_profiles.get(uid, lambda: _load('drivers', uid))
+
+
+def fetch_user_profiles(uids):
+    """{uid: profile or None}; everything not cached is read with one get_all."""
+    return user_profiles.get_many(uids, lambda missing: _load_many('users', missing))
+
+
+def fetch_driver_profiles(uids):
+    """{uid: profile or None}; everything not cached is read with one get_all."""
+    return driver_profiles.get_many(uids, lambda missing: _load_many('drivers', missing))
+
+
+def invalidate_user_profile(uid):
+    user_profiles.invalidate(uid)
+
+
+def invalidate_driver_profile(uid):
+    driver_profiles.invalidate(uid)
+
+
+def invalidate_profiles(collection, uids):
+    """Invalidates many profiles of one collection with a single publish (bulk imports)."""
+    PROFILE_CACHES[collection].invalidate(*uids)
@@ -0,0 +1,131 @@
+"""
+Development/staging tracer for chatty request handlers.
+
+With FIRESTORE_TRACE_ENABLED every storage round trip made while handling a request
+is recorded together with the line of app code that issued it. Requests that exceed
+FIRESTORE_OP_BUDGET round trips, or read the same document / run the same query more
+than once, are logged, and /debug/firestore_trace returns a per-route report.
+"""
+import os
+import sys
+import threading
+from collections import Counter
+from flask import current_app, jsonify, request
+from config import Config
+from storage import tracing
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_SKIP = tuple(os.path.join(_ROOT, name) for name in ('storage' + os.sep, 'utils' + os.sep + 'request_tracer.py'))
+_ROUND_TRIP_KINDS = ('read', 'write', 'query', 'auth')
+_MAX_EXAMPLES = 5
+
+_local = threading.local()
+_routes = {}
+_lock = threading.Lock()
+
+
+def _call_site():
+    """Returns 'path:line in function' for the innermost app frame outside the storage layer."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_ROOT) and not filename.startswith(_SKIP) and 'site-packages' not in filename:
+            return f'{filename[len(_ROOT):]}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _on_storage_op(kind, target, count):
+    trace = getattr(_local, 'trace', None)
+    if trace is not None and kind in _ROUND_TRIP_KINDS:
+        trace.append((kind, target, _call_site()))
+
+
+class _RouteReport:
+    def __init__(self):
+        self.requests = 0
+        self.total_ops = 0
+        self.max_ops = 0
+        self.over_budget = 0
+        self.requests_with_repeats = 0
+        self.call_sites = Counter()
+        self.repeated = Counter()
+        self.worst_trace = []
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'avg_round_trips': round(self.total_ops / self.requests, 2) if self.requests else 0,
+            'max_round_trips': self.max_ops,
+            'over_budget': self.over_budget,
+            'requests_with_repeated_ops': self.requests_with_repeats,
+            'top_call_sites': [{'call_site': site, 'ops': ops} for site, ops in self.call_sites.most_common(10)],
+            'repeated_ops': [{'op': op, 'times': times} for op, times in self.repeated.most_common(_MAX_EXAMPLES)],
+            'worst_request': [{'op': kind, 'target': target, 'call_site': site} for kind, target, site in self.worst_trace],
+        }
+
+
+def _before_request():
+    _local.trace = []
+
+
+def _after_request(response):
+    trace, _local.trace = getattr(_local, 'trace', None), None
+    if trace is None or request.endpoint in ('metrics', 'firestore_trace_report'):
+        return response
+
+    endpoint = request.endpoint or 'unmatched'
+    budget = Config.FIRESTORE_OP_BUDGET
+    repeated = {
+        f'{kind} {target}': times
+        for (kind, target), times in Counter((kind, target) for kind, target, _ in trace if kind in ('read', 'query')).items()
+        if times > 1
+    }
+
+    with _lock:
+        report = _routes.setdefault(endpoint, _RouteReport())
+        report.requests += 1
+        report.total_ops += len(trace)
+        report.call_sites.update(site for _, _, site in trace)
+        if len(trace) > report.max_ops:
+            report.max_ops, report.worst_trace = len(trace), trace
+        if len(trace) > budget:
+            report.over_budget += 1
+        if repeated:
+            report.requests_with_repeats += 1
+            report.repeated.update(repeated)
+
+    if len(trace) > budget or repeated:
+        sites = Counter(site for _, _, site in trace).most_common(3)
+        current_app.logger.warning(
+            'Chatty request %s %s: %d Firestore/Auth round trips (budget %d)%s; top call sites: %s',
+            request.method, request.path, len(trace), budget,
+            f', repeated {sorted(repeated)}' if repeated else '',
+            ', '.join(f'{site} x{ops}' for site, ops in sites),
+        )
+    return response
+
+
+def get_report():
+    with _lock:
+        return {endpoint: report.to_dict() for endpoint, report in sorted(_routes.items())}
+
+
+def reset_report():
+    with _lock:
+        _routes.clear()
+
+
+def firestore_trace_report():
+    if request.args.get('reset') == 'true':
+        reset_report()
+        return jsonify({'message': 'Trace report reset.'}), 200
+    return jsonify({'op_budget': Config.FIRESTORE_OP_BUDGET, 'routes': get_report()}), 200
+
+
+def init_request_tracer(app):
+    """Not meant for production: capturing call sites walks the stack on every operation."""
+    tracing.add_listener(_on_storage_op)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/debug/firestore_trace', 'firestore_trace_report', firestore_trace_report, methods=['GET'])
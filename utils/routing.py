@@ -0,0 +1,138 @@
+"""
+Route sequencing for a driver's assigned deliveries.
+
+Stops are collapsed to their distinct ZIP codes, a tour is built over those with a
+nearest-neighbour pass from the driver's own ZIP and then improved with 2-opt, each
+2-opt sweep evaluating every reversal from one position as a single NumPy expression.
+The route is open: it starts at the driver and ends at the last stop. Stops whose ZIP
+cannot be placed go last, in their original order.
+
+Distances come from utils.zip_centroids; for a typical route (tens of stops) the whole
+computation takes a few milliseconds, so it is simply recomputed on every read.
+"""
+import copy
+import numpy as np
+from storage import db
+from utils.singleflight import SingleFlight
+from utils.zip_centroids import distance_matrix
+
+# Deliveries still on the driver's route
+ROUTE_STATUSES = ('assigned', 'picked_up')
+_MIN_GAIN = 1e-9
+
+_flights = SingleFlight('driver_routes')
+
+
+def _nearest_neighbour(distances, start):
+    count = len(distances)
+    visited = np.zeros(count, dtype=bool)
+    order = [start]
+    visited[start] = True
+    for _ in range(count - 1):
+        candidates = np.where(visited, np.inf, distances[order[-1]])
+        nearest = int(candidates.argmin())
+        order.append(nearest)
+        visited[nearest] = True
+    return np.array(order)
+
+
+def _two_opt(distances, order):
+    """Improves an open path in place; order[0] and order[-1] stay fixed."""
+    last = len(order) - 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, last - 1):
+            # Reversing order[i..j] replaces edges (i-1, i) and (j, j+1) with (i-1, j) and (i, j+1)
+            j = np.arange(i + 1, last)
+            a, b = order[i - 1], order[i]
+            c, d = order[j], order[j + 1]
+            gain = distances[a, b] + distances[c, d] - distances[a, c] - distances[b, d]
+            best = int(gain.argmax())
+            if gain[best] > _MIN_GAIN:
+                order[i:j[best] + 1] = order[i:j[best] + 1][::-1].copy()
+                improved = True
+    return order
+
+
+def sequence(distances, start=None):
+    """
+    Orders the nodes of a distance matrix into a short open path. With `start` the path
+    begins at that node; otherwise it may begin anywhere. Returns the node order.
+    """
+    count = len(distances)
+    if count <= 1:
+        return np.arange(count)
+
+    # Zero-cost sentinels turn the open path into one with fixed ends: one after the
+    # last stop and, without a start node, one before the first
+    sentinels = 1 if start is not None else 2
+    padded = np.zeros((count + sentinels, count + sentinels))
+    padded[:count, :count] = distances
+    head = start if start is not None else count + 1
+
+    order = _nearest_neighbour(padded[:-1, :-1] if start is not None else padded, head)
+    if start is None:
+        order = order[order != count]
+    order = _two_opt(padded, np.append(order, count))
+    return order[(order != count) & (order != count + 1)]
+
+
+def path_length(distances, order):
+    order = np.asarray(order)
+    return float(distances[order[:-1], order[1:]].sum()) if len(order) > 1 else 0.0
+
+
+def plan_route(stops, origin_zip=None):
+    """
+    Sequences stops (dicts with a 'zip_code') from origin_zip. Returns
+    (ordered_stops, unlocated_stops, distance_km); distance_km excludes unlocated stops.
+    """
+    zips = list(dict.fromkeys((stop.get('zip_code') or '')[:5] for stop in stops))
+    nodes = zips + ([origin_zip[:5]] if origin_zip else [])
+    distances, located = distance_matrix(nodes)
+
+    start = None
+    if origin_zip and located[-1]:
+        start = len(nodes) - 1
+    placed = [i for i in range(len(zips)) if located[i]] + ([start] if start is not None else [])
+    sub = distances[np.ix_(placed, placed)]
+    order = [placed[i] for i in sequence(sub, len(placed) - 1 if start is not None else None).tolist()]
+
+    rank = {zips[node]: position for position, node in enumerate(n for n in order if n != start)}
+    ordered = sorted((stop for stop in stops if (stop.get('zip_code') or '')[:5] in rank),
+                     key=lambda stop: rank[(stop.get('zip_code') or '')[:5]])
+    unlocated = [stop for stop in stops if (stop.get('zip_code') or '')[:5] not in rank]
+    return ordered, unlocated, round(path_length(distances, order), 2)
+
+
+def _driver_route(driver_id):
+    driver_docs = list(db.collection('drivers').where('driver_id', '==', driver_id).limit(1).stream())
+    if not driver_docs:
+        return None
+    driver = driver_docs[0].to_dict()
+    origin_zip = driver.get('zip_code') or (driver.get('address_details') or {}).get('zip_code')
+
+    query = db.collection('deliveries').where('driver_id', '==', driver_id).where('status', 'in', list(ROUTE_STATUSES))
+    deliveries = [dict(doc.to_dict(), delivery_id=doc.id) for doc in query.stream()]
+    # Stable tie-break for stops in the same ZIP
+    deliveries.sort(key=lambda delivery: delivery['delivery_id'])
+
+    ordered, unlocated, distance_km = plan_route(deliveries, origin_zip)
+    for position, delivery in enumerate(ordered + unlocated, start=1):
+        delivery['sequence'] = position
+    return {
+        'driver_id': driver_id,
+        'origin_zip': origin_zip,
+        'stops': ordered + unlocated,
+        'unlocated': [delivery['delivery_id'] for delivery in unlocated],
+        'distance_km': distance_km,
+    }
+
+
+def driver_route(driver_id):
+    """
+    Returns the driver's active deliveries in driving order, or None for an unknown driver.
+    Concurrent requests for one driver share a single computation.
+    """
+    return copy.deepcopy(_flights.do(driver_id, _driver_route, driver_id))
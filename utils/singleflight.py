@@ -0,0 +1,85 @@
+"""
+Request coalescing ("singleflight").
+
+SingleFlight.do(key, fn) runs fn once for all concurrent callers with the same key:
+the first caller (the leader) runs it while the others wait and receive the same
+result, or the same exception. Nothing is kept once the call finishes, so a result is
+never older than the in-flight window. do_async() does the same for coroutines
+running on one event loop.
+
+Waiters share the leader's result object; callers that hand out mutable results
+should copy them (document snapshots are safe: to_dict() returns a copy).
+"""
+import asyncio
+import threading
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def registered_flights():
+    with _registry_lock:
+        return dict(_registry)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._tasks = {}  # (loop id, key) -> asyncio.Task
+        self._lock = threading.Lock()
+        self.leaders = self.shared = 0
+        with _registry_lock:
+            _registry[name] = self
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, coroutine_fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = self._tasks[task_key] = loop.create_task(coroutine_fn(*args, **kwargs))
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        # A cancelled waiter must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {'leaders': self.leaders, 'shared': self.shared, 'in_flight': len(self._calls) + len(self._tasks)}
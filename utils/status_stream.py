@@ -0,0 +1,287 @@
+"""
+Live order, hamper and delivery status for Server-Sent Events clients.
+
+Each worker runs one on_snapshot listener per collection in STREAM_COLLECTIONS, on the
+documents whose status is not final, and fans the changes out to every connected
+client in memory: the number of Firestore listeners does not grow with the number of
+clients, and a connected client causes no reads. Its opening snapshot comes from the
+listeners' own copy of the active documents, so it is always complete and current.
+
+A document that reaches a final status (or is deleted) leaves the listener's query;
+that document is read back once so that clients see how it ended.
+
+Clients subscribe to topics, ('customer_id', user_id) or ('driver_id', driver_id), and
+receive an event whenever the status of a matching document changes. Each client has
+a bounded queue keyed by document: a newer status replaces one not yet sent, and a
+client that falls STREAM_QUEUE_SIZE documents behind is sent a fresh snapshot instead
+of growing its queue. Documents missing from a snapshot have left the active set.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import partial
+from flask import Response
+from config import Config
+from storage import db
+
+STREAM_COLLECTIONS = ('orders', 'hampers', 'deliveries')
+FINAL_STATUSES = ('delivered', 'completed', 'cancelled')
+TOPIC_FIELDS = ('customer_id', 'driver_id')
+# Fields copied into each event besides collection, id and status
+EVENT_FIELDS = ('order_id', 'delivery_id', 'source', 'customer_id', 'driver_id')
+# Seconds to wait for the listeners' first snapshot before refusing a client
+READY_TIMEOUT = 10.0
+
+
+class StreamUnavailable(Exception):
+    pass
+
+
+def _summary(collection, snapshot, status=None):
+    data = snapshot.to_dict() or {}
+    summary = {'collection': collection, 'id': snapshot.id, 'status': status or data.get('status')}
+    summary.update({field: data[field] for field in EVENT_FIELDS if isinstance(data.get(field), str)})
+    return summary
+
+
+def _topics(summary):
+    return [(field, summary[field]) for field in TOPIC_FIELDS if summary.get(field)]
+
+
+class Subscriber:
+    """One connected client: a bounded queue of pending events, at most one per document."""
+
+    def __init__(self, topics, max_pending):
+        self.topics = tuple(topics)
+        self._max_pending = max_pending
+        self._pending = OrderedDict()  # document path -> latest unsent event
+        self._resync = False
+        self._condition = threading.Condition()
+
+    def push(self, path, event):
+        """Returns 'queued', 'coalesced' or 'overflow'; never blocks the listener."""
+        with self._condition:
+            if path in self._pending:
+                self._pending[path] = event
+                outcome = 'coalesced'
+            elif len(self._pending) >= self._max_pending:
+                # Too far behind: forget the backlog and send a snapshot instead
+                self._pending.clear()
+                self._resync = True
+                outcome = 'overflow'
+            else:
+                self._pending[path] = event
+                outcome = 'queued'
+            self._condition.notify()
+        return outcome
+
+    def request_resync(self):
+        with self._condition:
+            self._pending.clear()
+            self._resync = True
+            self._condition.notify()
+
+    def wait(self, timeout):
+        """Returns (events, resync) as soon as anything is pending, or ([], False) after timeout."""
+        with self._condition:
+            if not self._pending and not self._resync:
+                self._condition.wait(timeout)
+            events = list(self._pending.values())
+            self._pending.clear()
+            resync, self._resync = self._resync, False
+        return ([], True) if resync else (events, False)
+
+
+class StatusHub:
+    def __init__(self, collections=STREAM_COLLECTIONS):
+        self._collections = collections
+        self._lock = threading.RLock()
+        self._watches = {}                    # collection -> watch
+        self._ready = {}                      # collection -> Event set by its first snapshot
+        self._documents = {}                  # path -> summary of every active document
+        self._by_topic = defaultdict(set)     # topic -> paths of its active documents
+        self._subscribers = defaultdict(set)  # topic -> subscribers
+        self._clients = set()
+        self.counts = defaultdict(int)
+
+    # ---- listeners ----
+
+    def _on_snapshot(self, collection, documents, changes, read_time):
+        ready = self._ready[collection]
+        initial = not ready.is_set()
+        events, removed = [], []
+        with self._lock:
+            for change in changes:
+                path = f'{collection}/{change.document.id}'
+                if change.type.name == 'REMOVED':
+                    removed.append((path, change.document))
+                    continue
+                summary = _summary(collection, change.document)
+                previous = self._store(path, summary)
+                if not initial and (previous is None or previous['status'] != summary['status']):
+                    events.append((path, summary, previous))
+        ready.set()
+
+        # Left the query: a final status or a deletion. One read, outside the lock.
+        for path, document in removed:
+            try:
+                snapshot = document.reference.get()
+                summary = _summary(collection, snapshot) if snapshot.exists else _summary(collection, document, 'deleted')
+            except Exception:
+                summary = _summary(collection, document, 'unknown')
+            with self._lock:
+                previous = self._store(path, None)
+            events.append((path, summary, previous))
+
+        for path, summary, previous in events:
+            self._publish(path, summary, previous)
+
+    def _store(self, path, summary):
+        """Replaces the active document at path (None removes it). Returns the previous summary. Caller holds the lock."""
+        previous = self._documents.pop(path, None)
+        for topic in _topics(previous or {}):
+            self._by_topic[topic].discard(path)
+            if not self._by_topic[topic]:
+                del self._by_topic[topic]
+        if summary is not None:
+            self._documents[path] = summary
+            for topic in _topics(summary):
+                self._by_topic[topic].add(path)
+        return previous
+
+    def _publish(self, path, summary, previous):
+        with self._lock:
+            # The previous topics too, e.g. a driver whose delivery was reassigned
+            subscribers = set()
+            for topic in _topics(summary) + _topics(previous or {}):
+                subscribers.update(self._subscribers.get(topic, ()))
+            self.counts['changes'] += 1
+        for subscriber in subscribers:
+            self.counts[subscriber.push(path, summary)] += 1
+
+    def _listening(self):
+        """Starts any listener that is not running. Returns True if one had to be started."""
+        started = False
+        with self._lock:
+            for collection in self._collections:
+                watch = self._watches.get(collection)
+                if watch is not None and getattr(watch, 'is_active', True):
+                    continue
+                # Whatever was known while no listener ran may be stale
+                for path in [path for path in self._documents if path.startswith(collection + '/')]:
+                    self._store(path, None)
+                self._ready[collection] = threading.Event()
+                try:
+                    query = db.collection(collection).where('status', 'not-in', list(FINAL_STATUSES))
+                    self._watches[collection] = query.on_snapshot(partial(self._on_snapshot, collection))
+                except Exception as e:
+                    self._watches.pop(collection, None)
+                    raise StreamUnavailable(f'Status listener unavailable: {e}')
+                started = True
+        return started
+
+    def _wait_ready(self):
+        deadline = time.monotonic() + READY_TIMEOUT
+        for collection in self._collections:
+            if not self._ready[collection].wait(max(deadline - time.monotonic(), 0)):
+                raise StreamUnavailable('Status listeners are still starting; retry shortly.')
+
+    def check(self):
+        """Restarts a stopped listener; connected clients then get a fresh snapshot."""
+        if self._listening():
+            self._wait_ready()
+            with self._lock:
+                clients = list(self._clients)
+            for subscriber in clients:
+                subscriber.request_resync()
+
+    # ---- clients ----
+
+    def subscribe(self, topics):
+        """Registers a client. Returns (subscriber, snapshot); raises StreamUnavailable."""
+        self.check()
+        self._wait_ready()
+        with self._lock:
+            if len(self._clients) >= Config.STREAM_MAX_CLIENTS:
+                raise StreamUnavailable('Too many status streams on this worker; retry shortly.')
+            subscriber = Subscriber(topics, Config.STREAM_QUEUE_SIZE)
+            self._clients.add(subscriber)
+            for topic in subscriber.topics:
+                self._subscribers[topic].add(subscriber)
+            # Taken under the same lock, so no change falls between the snapshot and the queue
+            return subscriber, self._snapshot(subscriber.topics)
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._clients.discard(subscriber)
+            for topic in subscriber.topics:
+                self._subscribers[topic].discard(subscriber)
+                if not self._subscribers[topic]:
+                    del self._subscribers[topic]
+
+    def snapshot(self, topics):
+        with self._lock:
+            return self._snapshot(topics)
+
+    def _snapshot(self, topics):
+        paths = set().union(*(self._by_topic.get(topic, ()) for topic in topics))
+        return [dict(self._documents[path]) for path in sorted(paths)]
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, clients=len(self._clients), documents=len(self._documents),
+                        listening=sum(getattr(watch, 'is_active', True) for watch in self._watches.values()))
+
+    def stop(self):
+        """Stops the listeners (e.g. when switching storage backends); clients get a snapshot on restart."""
+        with self._lock:
+            for watch in self._watches.values():
+                watch.unsubscribe()
+            self._watches.clear()
+            for path in list(self._documents):
+                self._store(path, None)
+
+
+status_hub = StatusHub()
+
+
+def _event(name, data):
+    return f'event: {name}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+def event_stream(subscriber, snapshot, hub=status_hub):
+    """
+    Yields the SSE stream of one client: the snapshot, then a 'status' event per change,
+    a comment line every STREAM_HEARTBEAT_SECONDS of silence, and after STREAM_MAX_SECONDS
+    it ends; EventSource clients reconnect on their own after the advertised retry delay.
+    """
+    deadline = time.monotonic() + Config.STREAM_MAX_SECONDS
+    try:
+        yield f'retry: {Config.STREAM_RETRY_MS}\n\n'
+        yield _event('snapshot', {'documents': snapshot})
+        while time.monotonic() < deadline:
+            events, resync = subscriber.wait(min(Config.STREAM_HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0)))
+            if resync:
+                yield _event('snapshot', {'documents': hub.snapshot(subscriber.topics)})
+            elif events:
+                yield ''.join(_event('status', event) for event in events)
+            else:
+                yield ': heartbeat\n\n'
+                try:
+                    hub.check()
+                except StreamUnavailable:
+                    # The client reconnects and is refused or served once the listeners are back
+                    return
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+def stream_response(topics):
+    """Subscribes the caller to topics and returns the SSE response; raises StreamUnavailable."""
+    subscriber, snapshot = status_hub.subscribe(topics)
+    response = Response(event_stream(subscriber, snapshot), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Also covers a response that is closed before its first chunk is sent
+    response.call_on_close(partial(status_hub.unsubscribe, subscriber))
+    return response
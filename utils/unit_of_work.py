@@ -0,0 +1,57 @@
+"""
+Request-scoped unit of work (see storage/unit_of_work.py).
+
+Each request's writes through `storage.db` are buffered and committed after the view
+returns, as one batch: a handler's writes land together or not at all, and a request
+that ends in an error status commits nothing. Views that must write as they go, such
+as streamed responses or bulk operations that report partial success, opt out with
+@immediate_writes.
+"""
+from flask import current_app, g, jsonify, request
+from storage import begin_unit_of_work
+
+
+def immediate_writes(view):
+    """Marks a view whose writes must not be deferred to the end of the request."""
+    view.immediate_writes = True
+    return view
+
+
+def _begin():
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None or getattr(view, 'immediate_writes', False):
+        return
+    g.unit_of_work = begin_unit_of_work()
+
+
+def _commit(response):
+    unit = g.pop('unit_of_work', None)
+    if unit is None:
+        return response
+
+    # Writes made after this point (e.g. while a response streams) go straight through
+    unit.end()
+    if response.status_code >= 400:
+        unit.discard()
+        return response
+
+    try:
+        unit.commit()
+    except Exception as e:
+        response = jsonify({'error': str(e)})
+        response.status_code = 400
+    return response
+
+
+def _discard(exc):
+    # after_request is skipped when the view raised; drop its writes here
+    unit = g.pop('unit_of_work', None)
+    if unit is not None:
+        unit.end()
+        unit.discard()
+
+
+def init_unit_of_work(app):
+    app.before_request(_begin)
+    app.after_request(_commit)
+    app.teardown_request(_discard)
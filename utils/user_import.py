@@ -0,0 +1,240 @@
+"""
+Bulk account import for partner onboarding.
+
+Rows are processed in batches of IMPORT_BATCH_SIZE (the auth.import_users limit):
+public IDs are leased as one block, the Auth accounts are created with a single
+import_users call (role claims included, passwords pre-hashed with HMAC-SHA256),
+and the profiles are written through BulkWriter. Progress is checkpointed in
+'import_jobs/<job_id>' after every batch; re-sending the same file with that
+job_id skips the rows already committed. UIDs are derived from the job and the
+email, so a replayed batch overwrites its own partial work instead of duplicating it.
+"""
+import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import uuid
+from firebase_admin import firestore
+from storage import auth, db
+from utils.bulk_writes import bulk_write
+from utils.id_generator import generate_ids
+from utils.user_index import user_index_ref
+from utils.profiles import invalidate_profiles
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_JOBS_COLLECTION = 'import_jobs'
+MIN_PASSWORD_LENGTH = 6  # Firebase Auth rejects shorter passwords
+
+# Mirrors the /user_register and /driver_register profile shapes
+ACCOUNT_TYPES = {
+    'user': {
+        'collection': 'users',
+        'id_field': 'user_id',
+        'id_prefix': 'USER',
+        'counter': 'user_counter',
+        'fields': ('full_name', 'phone_number'),
+    },
+    'driver': {
+        'collection': 'drivers',
+        'id_field': 'driver_id',
+        'id_prefix': 'DRIVER',
+        'counter': 'driver_counter',
+        'fields': ('full_name', 'phone_number', 'vehicle_type', 'license_plate'),
+    },
+}
+
+
+class ImportJobError(ValueError):
+    pass
+
+
+def parse_rows(payload, data_format):
+    """Yields (row_number, row dict or None, parse error or None) from CSV or NDJSON text."""
+    if data_format == 'csv':
+        for row_number, row in enumerate(csv.DictReader(io.StringIO(payload)), start=1):
+            yield row_number, {k.strip(): (v or '').strip() for k, v in row.items() if k}, None
+        return
+
+    row_number = 0
+    for line in payload.splitlines():
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, 'Each line must be a JSON object.'
+            continue
+        yield row_number, row, None
+
+
+def _import_uid(job_id, email):
+    return hashlib.sha256(f'{job_id}:{email}'.encode()).hexdigest()[:28]
+
+
+def _validate(row, account_type):
+    email = str(row.get('email') or '').strip().lower()
+    password = str(row.get('password') or '')
+    if not email or '@' not in email:
+        return 'A valid email is required.'
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return f'password must be at least {MIN_PASSWORD_LENGTH} characters.'
+    missing = [field for field in account_type['fields'] if not row.get(field)]
+    if missing:
+        return f"Missing required field(s): {', '.join(missing)}."
+    return None
+
+
+def _existing_ids(account_type, uids):
+    """Public IDs already written for these uids (by an interrupted run of the same batch)."""
+    refs = [db.collection(account_type['collection']).document(uid) for uid in uids]
+    return {
+        doc.id: doc.to_dict().get(account_type['id_field'])
+        for doc in db.get_all(refs) if doc.exists
+    }
+
+
+def _import_batch(job_id, role, rows, replay):
+    """Imports one batch of validated rows. Returns per-row results; raises if profiles cannot be written."""
+    account_type = ACCOUNT_TYPES[role]
+    id_field = account_type['id_field']
+    for row in rows:
+        row['uid'] = _import_uid(job_id, row['email'])
+
+    # Only a batch that may have been half-written needs its earlier IDs back
+    public_ids = _existing_ids(account_type, [row['uid'] for row in rows]) if replay else {}
+    new_ids = iter(generate_ids(account_type['id_prefix'], account_type['counter'], 4,
+                                sum(1 for row in rows if not public_ids.get(row['uid']))))
+    for row in rows:
+        row[id_field] = public_ids.get(row['uid']) or next(new_ids)
+
+    key = os.urandom(32)
+    records = [
+        auth.ImportUserRecord(
+            uid=row['uid'],
+            email=row['email'],
+            display_name=row.get('full_name') or None,
+            password_hash=hmac.new(key, row['password'].encode(), hashlib.sha256).digest(),
+            custom_claims={'role': role, 'profile_id': row[id_field]},
+        )
+        for row in rows
+    ]
+    result = auth.import_users(records, hash_alg=auth.UserImportHash.hmac_sha256(key=key))
+    auth_errors = {error.index: error.reason for error in result.errors}
+
+    writes = []
+    for index, row in enumerate(rows):
+        if index in auth_errors:
+            continue
+        profile = {field: row.get(field) for field in account_type['fields']}
+        profile.update({id_field: row[id_field], 'email': row['email'], 'role': role})
+        writes.append((db.collection(account_type['collection']).document(row['uid']), profile))
+        if role == 'user':
+            writes.append((user_index_ref(row[id_field]), {'uid': row['uid']}))
+
+    failures = bulk_write(writes)
+    if failures:
+        path, message = next(iter(failures.items()))
+        raise RuntimeError(f'{len(failures)} profile write(s) failed, e.g. {path}: {message}')
+    # Re-imported accounts may already be cached by other workers
+    invalidate_profiles(account_type['collection'], [row['uid'] for index, row in enumerate(rows) if index not in auth_errors])
+
+    results = []
+    for index, row in enumerate(rows):
+        if index in auth_errors:
+            results.append({'row': row['row'], 'email': row['email'], 'status': 'error', 'error': auth_errors[index]})
+        else:
+            results.append({'row': row['row'], 'email': row['email'], 'status': 'created',
+                            'uid': row['uid'], id_field: row[id_field]})
+    return results
+
+
+def start_or_resume_job(job_id, role):
+    """Returns (job_id, job data). Raises ImportJobError for an unknown job or a role mismatch."""
+    if role not in ACCOUNT_TYPES:
+        raise ImportJobError(f"role must be one of: {', '.join(ACCOUNT_TYPES)}.")
+
+    if job_id:
+        job_doc = db.collection(IMPORT_JOBS_COLLECTION).document(job_id).get()
+        if not job_doc.exists:
+            raise ImportJobError(f'Import job {job_id} not found.')
+        job = job_doc.to_dict()
+        if job['role'] != role:
+            raise ImportJobError(f"Import job {job_id} imports {job['role']} accounts, not {role}.")
+        return job_id, job
+
+    job_id = uuid.uuid4().hex
+    job = {'role': role, 'status': 'running', 'rows_done': 0, 'created': 0, 'failed': 0,
+           'created_at': firestore.SERVER_TIMESTAMP}
+    db.collection(IMPORT_JOBS_COLLECTION).document(job_id).set(job)
+    return job_id, job
+
+
+def run_import(job_id, job, rows, resumed=False):
+    """
+    Imports parsed rows for a job and yields one result dict per row, then a summary.
+    Rows up to the job's checkpoint are skipped. On an infrastructure failure the job
+    is marked 'failed' at the last committed batch and the summary says where to resume.
+    """
+    job_ref = db.collection(IMPORT_JOBS_COLLECTION).document(job_id)
+    role = job['role']
+    account_type = ACCOUNT_TYPES[role]
+    rows_done, created, failed = job['rows_done'], job['created'], job['failed']
+    replay = resumed
+    seen_emails = set()
+
+    def checkpoint(status, **extra):
+        job_ref.set(dict(extra, status=status, rows_done=rows_done, created=created, failed=failed,
+                         updated_at=firestore.SERVER_TIMESTAMP), merge=True)
+
+    def flush(batch):
+        nonlocal rows_done, created, failed, replay
+        valid = [row for row in batch if 'error' not in row]
+        results = {result['row']: result for result in (_import_batch(job_id, role, valid, replay) if valid else [])}
+        replay = False
+        for row in batch:
+            result = results.get(row['row']) or {'row': row['row'], 'email': row.get('email'),
+                                                  'status': 'error', 'error': row['error']}
+            if result['status'] == 'created':
+                created += 1
+            else:
+                failed += 1
+            yield result
+        rows_done = batch[-1]['row']
+        checkpoint('running')
+
+    batch = []
+    try:
+        for row_number, row, error in rows:
+            if row_number <= rows_done:
+                continue
+            if error is None:
+                error = _validate(row, account_type)
+            if error is None:
+                row = dict(row, email=str(row['email']).strip().lower(), password=str(row['password']))
+                if row['email'] in seen_emails:
+                    error = 'Duplicate email in this upload.'
+                seen_emails.add(row['email'])
+            entry = dict(row or {}, row=row_number)
+            if error is not None:
+                entry['error'] = error
+            batch.append(entry)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                yield from flush(batch)
+                batch = []
+        if batch:
+            yield from flush(batch)
+    except Exception as e:
+        checkpoint('failed', error=str(e))
+        yield {'job_id': job_id, 'status': 'failed', 'error': str(e), 'rows_done': rows_done,
+               'created': created, 'failed': failed,
+               'resume': f'Re-send the same file with job_id={job_id} to continue after row {rows_done}.'}
+        return
+
+    checkpoint('completed', error=None)
+    yield {'job_id': job_id, 'status': 'completed', 'rows_done': rows_done, 'created': created, 'failed': failed}
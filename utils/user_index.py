@@ -0,0 +1,99 @@
+from config import Config
+from storage import db, get_async_db
+from utils.cache import TwoTierCache
+
+# 'user_ids/<USER0001>' -> {'uid': <Firestore document ID in 'users'>}
+USER_INDEX_COLLECTION = 'user_ids'
+FIRESTORE_IN_LIMIT = 30
+
+# Entries never go stale, so they keep the full L1 lifetime even without a shared L2
+user_uids = TwoTierCache('user_ids', l1_ttl=Config.CACHE_L1_TTL)
+
+
+def user_index_ref(user_id):
+    return db.collection(USER_INDEX_COLLECTION).document(user_id)
+
+
+def _lookup_user_uid(user_id):
+    index_doc = user_index_ref(user_id).get()
+    if index_doc.exists:
+        return index_doc.to_dict().get('uid')
+
+    # Users registered before the index existed: fall back to a query and repair the entry
+    user_doc = next(db.collection('users').where('user_id', '==', user_id).limit(1).stream(), None)
+    if not user_doc:
+        return None
+
+    user_index_ref(user_id).set({'uid': user_doc.id})
+    return user_doc.id
+
+
+def resolve_user_uid(user_id):
+    """Returns the 'users' document ID for a public user_id, or None."""
+    if not user_id:
+        return None
+    # A user_id never moves to another uid, so found entries are cached and never invalidated
+    return user_uids.get(user_id, lambda: _lookup_user_uid(user_id))
+
+
+def _lookup_user_uids(user_ids):
+    refs = [user_index_ref(user_id) for user_id in user_ids]
+    uids = {doc.id: doc.to_dict().get('uid') for doc in db.get_all(refs) if doc.exists}
+
+    # Users registered before the index existed: one 'in' query per 30 IDs, then repair the entries
+    unindexed = [user_id for user_id in user_ids if not uids.get(user_id)]
+    repairs = []
+    for start in range(0, len(unindexed), FIRESTORE_IN_LIMIT):
+        query = db.collection('users').where('user_id', 'in', unindexed[start:start + FIRESTORE_IN_LIMIT])
+        for user_doc in query.select(['user_id']).stream():
+            user_id = user_doc.get('user_id')
+            uids[user_id] = user_doc.id
+            repairs.append((user_index_ref(user_id), {'uid': user_doc.id}))
+    if repairs:
+        from utils.bulk_writes import commit_in_chunks
+        commit_in_chunks(repairs)
+    return uids
+
+
+def resolve_user_uids(user_ids):
+    """Batched resolve_user_uid(): {user_id: uid or None}, with one get_all for the uncached IDs."""
+    user_ids = [user_id for user_id in user_ids if user_id]
+    return user_uids.get_many(user_ids, _lookup_user_uids)
+
+
+async def _lookup_user_uid_async(user_id):
+    adb = get_async_db()
+    index_doc = await adb.collection(USER_INDEX_COLLECTION).document(user_id).get()
+    if index_doc.exists:
+        return index_doc.to_dict().get('uid')
+
+    user_docs = await adb.collection('users').where('user_id', '==', user_id).limit(1).get()
+    if not user_docs:
+        return None
+
+    await adb.collection(USER_INDEX_COLLECTION).document(user_id).set({'uid': user_docs[0].id})
+    return user_docs[0].id
+
+
+async def resolve_user_uid_async(user_id):
+    """resolve_user_uid() for coroutines running on the shared async loop."""
+    if not user_id:
+        return None
+    return await user_uids.get_async(user_id, lambda: _lookup_user_uid_async(user_id))
+
+
+def backfill_user_index():
+    """Writes an index entry for every user that has a user_id. Returns the number indexed."""
+    from utils.bulk_writes import commit_in_chunks
+
+    writes = []
+    for user_doc in db.collection('users').select(['user_id']).stream():
+        user_id = (user_doc.to_dict() or {}).get('user_id')
+        if user_id:
+            writes.append((user_index_ref(user_id), {'uid': user_doc.id}))
+
+    results = commit_in_chunks(writes)
+    failed = [r for r in results if not r['committed']]
+    if failed:
+        raise RuntimeError(f"{len(failed)} chunk(s) failed: {failed[0]['error']}")
+    return len(writes)
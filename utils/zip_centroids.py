@@ -0,0 +1,145 @@
+"""
+ZIP code centroids and distances.
+
+Centroids come from the U.S. Census Gazetteer ZCTA file (ZIP Code Tabulation Areas,
+https://www.census.gov/geographies/reference-files/time-series/geo/gazetteer-files.html),
+converted into a small NumPy file as part of the deploy step:
+
+    flask build-zip-centroids                                  # downloads GAZETTEER_URL
+    flask build-zip-centroids 2023_Gaz_zcta_national.txt      # or from a local copy
+
+The result (Config.ZIP_CENTROIDS_PATH, ~33k rows) is a structured array sorted by ZIP,
+memory-mapped on first use and shared by every request in the worker. ZIPs that have
+no ZCTA (PO boxes, unique ZIPs) fall back to the mean centroid of their 3-digit prefix.
+
+Distances are great-circle kilometres. The matrix for a given set of ZIPs is cached,
+so re-sequencing a driver's route after a status change does no trigonometry at all.
+"""
+import csv
+import io
+import os
+import tempfile
+import threading
+import urllib.request
+import zipfile
+from functools import lru_cache
+import numpy as np
+from config import Config
+
+EARTH_RADIUS_KM = 6371.0088
+CENTROID_DTYPE = np.dtype([('zip', '<u4'), ('lat', '<f8'), ('lon', '<f8')])
+# Public-domain Census Gazetteer ZCTA file (zipped, ~1 MB)
+GAZETTEER_URL = 'https://www2.census.gov/geo/docs/maps-data/data/gazetteer/2023_Gazetteer/2023_Gaz_zcta_national.zip'
+
+_table = None
+_prefixes = None
+_lock = threading.Lock()
+
+
+class CentroidsUnavailable(RuntimeError):
+    pass
+
+
+def build_centroids(gazetteer_path, output_path=None):
+    """Converts a Census Gazetteer ZCTA file into the centroid table. Returns the row count."""
+    output_path = output_path or Config.ZIP_CENTROIDS_PATH
+    rows = []
+    with open(gazetteer_path, newline='', encoding='utf-8-sig') as gazetteer:
+        reader = csv.reader(gazetteer, delimiter='\t')
+        # Header names carry trailing spaces in some vintages
+        header = [name.strip().upper() for name in next(reader)]
+        geoid, lat, lon = header.index('GEOID'), header.index('INTPTLAT'), header.index('INTPTLONG')
+        for row in reader:
+            if len(row) > max(geoid, lat, lon) and row[geoid].strip().isdigit():
+                rows.append((int(row[geoid]), float(row[lat]), float(row[lon])))
+
+    table = np.array(sorted(rows), dtype=CENTROID_DTYPE)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    np.save(output_path, table)
+    return len(table)
+
+
+def download_gazetteer(url=GAZETTEER_URL, directory=None):
+    """Downloads a zipped Gazetteer ZCTA file and extracts it. Returns the path of the .txt file."""
+    with urllib.request.urlopen(url, timeout=60) as response:
+        archive = zipfile.ZipFile(io.BytesIO(response.read()))
+    name = next(name for name in archive.namelist() if name.endswith('.txt'))
+    return archive.extract(name, directory or tempfile.mkdtemp(prefix='gazetteer-'))
+
+
+def _load():
+    global _table, _prefixes
+    if _table is None:
+        with _lock:
+            if _table is None:
+                if not os.path.exists(Config.ZIP_CENTROIDS_PATH):
+                    raise CentroidsUnavailable(
+                        f'ZIP centroid table not found at {Config.ZIP_CENTROIDS_PATH}; '
+                        'build it with `flask build-zip-centroids`.')
+                table = np.load(Config.ZIP_CENTROIDS_PATH, mmap_mode='r')
+                # Mean centroid per 3-digit prefix, for ZIPs without a ZCTA of their own
+                prefix, inverse = np.unique(table['zip'] // 100, return_inverse=True)
+                counts = np.bincount(inverse)
+                _prefixes = (prefix,
+                             np.bincount(inverse, weights=table['lat']) / counts,
+                             np.bincount(inverse, weights=table['lon']) / counts)
+                _table = table
+    return _table, _prefixes
+
+
+def centroids_available():
+    try:
+        _load()
+    except CentroidsUnavailable:
+        return False
+    return True
+
+
+def _lookup(sorted_keys, keys):
+    positions = np.clip(np.searchsorted(sorted_keys, keys), 0, len(sorted_keys) - 1)
+    return positions, sorted_keys[positions] == keys
+
+
+def locate(zip_codes):
+    """Returns (lat, lon, located) arrays for the given ZIP codes; ZIP+4 is accepted."""
+    table, (prefixes, prefix_lat, prefix_lon) = _load()
+    zip5 = [(zip_code or '')[:5] for zip_code in zip_codes]
+    keys = np.array([int(z) if len(z) == 5 and z.isdigit() else 0 for z in zip5], dtype=np.uint32)
+    valid = keys > 0
+
+    lat, lon = np.full(len(keys), np.nan), np.full(len(keys), np.nan)
+    positions, found = _lookup(table['zip'], keys)
+    found &= valid
+    lat[found], lon[found] = table['lat'][positions[found]], table['lon'][positions[found]]
+
+    prefix_positions, prefix_found = _lookup(prefixes, keys // 100)
+    fallback = valid & ~found & prefix_found
+    lat[fallback], lon[fallback] = prefix_lat[prefix_positions[fallback]], prefix_lon[prefix_positions[fallback]]
+    return lat, lon, found | fallback
+
+
+def haversine_matrix(lat, lon):
+    """(n, n) great-circle distances in km between the given points."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+@lru_cache(maxsize=4096)
+def _cached_matrix(zip_codes):
+    lat, lon, located = locate(zip_codes)
+    matrix = haversine_matrix(lat, lon)
+    matrix.flags.writeable = False
+    located.flags.writeable = False
+    return matrix, located
+
+
+def distance_matrix(zip_codes):
+    """
+    Returns (matrix, located) for a sequence of 5-digit ZIP codes: pairwise distances in
+    km and a mask of the ZIPs that could be placed (rows of the others are NaN).
+    Both arrays are shared through the cache and read-only.
+    """
+    return _cached_matrix(tuple(zip_codes))